@@ -1,6 +1,6 @@
 # app.py
 import streamlit as st
-from utils.state_manager import init_session_state
+from utils.state_manager import init_session_state, jobs_sidebar, perf_sidebar
 
 st.set_page_config(
     page_title="Customer Churn – Logistic Regression Demo",
@@ -52,3 +52,5 @@ def main():
 
 if __name__ == "__main__":
     main()
+    jobs_sidebar()
+    perf_sidebar()
@@ -0,0 +1,12 @@
+# benchmarks/__init__.py
+"""
+Benchmark harness for the pipeline stages (see benchmarks/run.py):
+
+    python -m benchmarks.run                          # 10K / 100K / 1M rows
+    python -m benchmarks.run --rows 10K 100K 1M 10M
+    python -m benchmarks.run --save-baseline          # store the reference numbers
+
+and for the app's cold start (benchmarks/startup.py):
+
+    python -m benchmarks.startup                      # first render of every page vs a 1 s budget
+"""
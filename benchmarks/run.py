@@ -0,0 +1,219 @@
+# benchmarks/run.py
+"""
+Benchmark the pipeline stages on synthetic Churn_Modelling-schema data and
+compare against a stored baseline.
+
+    python -m benchmarks.run                                   # 10K, 100K, 1M rows
+    python -m benchmarks.run --rows 10K 100K 1M 10M --repeat 3
+    python -m benchmarks.run --save-baseline                   # on the reference machine
+    python -m benchmarks.run --output results.json             # exits 1 on a regression
+
+Every dataset size runs in a fresh process, so the peak RSS of one size is
+not inflated by the previous one. A stage regresses when it is more than
+--tolerance slower (or its peak memory grows by more than --tolerance) than
+the baseline and the difference exceeds the noise floor (--min-seconds /
+--min-mb). Baselines are only comparable on the same machine: the
+environment (machine and library versions) is stored with the numbers and
+a different machine is reported.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+DEFAULT_ROWS = ["10K", "100K", "1M"]
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+_SUFFIXES = {"K": 1_000, "M": 1_000_000}
+
+
+def rows_arg(value: str) -> int:
+    """
+    Row counts such as 10000, 10K or 1M.
+    """
+    text = value.strip().upper().replace("_", "")
+    try:
+        if text[-1:] in _SUFFIXES:
+            return int(float(text[:-1]) * _SUFFIXES[text[-1]])
+        return int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a row count such as 10000, 10K or 1M, got '{value}'")
+
+
+def environment() -> dict:
+    import numpy as np
+    import pandas as pd
+    import sklearn
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def _benchmark_size(path: str, n_rows: int, repeat: int, single_calls: int) -> list:
+    # Runs in a child process (see run_benchmarks)
+    from benchmarks.stages import run_stages
+
+    records = run_stages(path, repeat=repeat, single_calls=single_calls)
+    return [{"dataset_rows": n_rows, **record} for record in records]
+
+
+def run_benchmarks(sizes, seed: int = 42, repeat: int = 1, single_calls: int = 200,
+                   data_dir: str = None, progress=None) -> dict:
+    """
+    Benchmark every size (each in its own spawned process) and return the
+    results document: {"generated_at", "seed", "repeat", "environment", "results"}.
+    The synthetic files are generated here, outside the measured processes.
+    """
+    from benchmarks.synthetic import DATA_DIR, synthetic_csv
+
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for n_rows in sizes:
+        path = synthetic_csv(n_rows, seed=seed, data_dir=data_dir or DATA_DIR)
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            records = pool.submit(_benchmark_size, path, n_rows, repeat, single_calls).result()
+        results.extend(records)
+        if progress is not None:
+            progress(n_rows, records)
+
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "seed": seed,
+        "repeat": repeat,
+        "environment": environment(),
+        "results": results,
+    }
+
+
+def _mb(value):
+    return value / 1024 ** 2 if value is not None else None
+
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.25, min_seconds: float = 0.01,
+            min_mb: float = 16.0):
+    """
+    Per (dataset_rows, stage) comparison of seconds and peak RSS with the baseline.
+    Returns a DataFrame with the ratios and a `status` column (ok / REGRESSION / faster / new).
+    """
+    import pandas as pd
+
+    reference = {(r["dataset_rows"], r["stage"]): r for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        base = reference.get((r["dataset_rows"], r["stage"]))
+        seconds, peak_mb = r["seconds"], _mb(r.get("peak_rss"))
+        row = {"rows": r["dataset_rows"], "stage": r["stage"], "seconds": seconds, "peak_mb": peak_mb}
+        if base is None:
+            rows.append({**row, "status": "new"})
+            continue
+
+        base_seconds, base_peak_mb = base["seconds"], _mb(base.get("peak_rss"))
+        row.update({
+            "base_seconds": base_seconds,
+            "time_ratio": seconds / base_seconds if base_seconds > 0 else None,
+            "base_peak_mb": base_peak_mb,
+        })
+        slower = seconds > base_seconds * (1 + tolerance) and seconds - base_seconds > min_seconds
+        larger = (peak_mb is not None and base_peak_mb is not None
+                  and peak_mb > base_peak_mb * (1 + tolerance) and peak_mb - base_peak_mb > min_mb)
+        faster = seconds < base_seconds / (1 + tolerance) and base_seconds - seconds > min_seconds
+        row["status"] = "REGRESSION" if slower or larger else "faster" if faster else "ok"
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def results_table(document: dict):
+    import pandas as pd
+
+    table = pd.DataFrame([{
+        "rows": r["dataset_rows"],
+        "stage": r["stage"],
+        "seconds": r["seconds"],
+        "rows_per_sec": r.get("rows_per_sec"),
+        "peak_mb": _mb(r.get("peak_rss")),
+        "peak_delta_mb": _mb(r.get("peak_delta")),
+        "p95_ms": r.get("p95_ms"),
+    } for r in document["results"]])
+    return table
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="benchmarks.run", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", nargs="+", type=rows_arg, default=[rows_arg(r) for r in DEFAULT_ROWS],
+                        help="Dataset sizes, e.g. 10K 100K 1M 10M (default: 10K 100K 1M).")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per stage; the fastest is kept (default: 1).")
+    parser.add_argument("--single-calls", type=int, default=200,
+                        help="Single-customer predictions per score_single run (default: 200).")
+    parser.add_argument("--seed", type=int, default=42, help="Synthetic data seed (default: 42).")
+    parser.add_argument("--data-dir", help="Where the synthetic CSVs are cached (default: a temp directory).")
+    parser.add_argument("--output", help="Write the results (with the comparison) to this JSON file.")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON (default: benchmarks/baseline.json).")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown / memory growth before a regression (default: 0.25 = 25%%).")
+    parser.add_argument("--min-seconds", type=float, default=0.01, help="Ignore time differences below this.")
+    parser.add_argument("--min-mb", type=float, default=16.0, help="Ignore peak memory differences below this.")
+    return parser
+
+
+def main(argv=None):
+    import pandas as pd
+
+    args = build_parser().parse_args(argv)
+
+    def progress(n_rows, records):
+        total = sum(r["seconds"] for r in records)
+        print(f"{n_rows:>12,} rows: {total:.2f}s over {len(records)} stages", file=sys.stderr)
+
+    document = run_benchmarks(args.rows, seed=args.seed, repeat=args.repeat, single_calls=args.single_calls,
+                              data_dir=args.data_dir, progress=progress)
+
+    with pd.option_context("display.width", 160, "display.max_columns", 20, "display.float_format", "{:,.4g}".format):
+        print(results_table(document).to_string(index=False))
+
+        regressions = 0
+        if not args.save_baseline and os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+            comparison = compare(document, baseline, args.tolerance, args.min_seconds, args.min_mb)
+            regressions = int((comparison["status"] == "REGRESSION").sum())
+            document["comparison"] = {
+                "baseline": args.baseline,
+                "baseline_generated_at": baseline.get("generated_at"),
+                "tolerance": args.tolerance,
+                "regressions": regressions,
+                "stages": comparison.to_dict("records"),
+            }
+            print(f"\nCompared with {args.baseline} ({baseline.get('generated_at')}):")
+            machine = ("platform", "machine", "cpu_count")
+            if any(baseline.get("environment", {}).get(k) != document["environment"][k] for k in machine):
+                print("Note: the baseline was recorded on a different machine; timings may not be comparable.")
+            print(comparison.to_string(index=False))
+            print(f"\n{regressions} regression(s)")
+        elif not args.save_baseline:
+            print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one.")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2, default=str)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(document, f, indent=2, default=str)
+        print(f"\nBaseline saved to {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+# benchmarks/startup.py
+"""
+Cold-start budget of the Streamlit app.
+
+Every page script (and app.py) is rendered once in a fresh interpreter
+with Streamlit's AppTest, the way the first request on a new replica runs
+it: the time to import streamlit (paid once when the server starts), the
+first run of the script (its imports plus the first render) and a second
+session in the same process (module imports and st.cache_resource entries
+already warm) are measured separately, and the heavy libraries the page
+pulled in are listed.
+
+    python -m benchmarks.startup                        # all pages, 1 s budget
+    python -m benchmarks.startup --budget 0.8 --output startup.json
+    python -m benchmarks.startup --pages app.py pages/6_Predict_New_Customer.py
+
+Exits 1 when the first render of a page exceeds the budget.
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET = 1.0
+
+# Libraries whose import dominates start-up; reported when a page loads them
+HEAVY_MODULES = ("pandas", "scipy.sparse", "sklearn", "matplotlib", "pyarrow", "joblib")
+
+
+def app_pages() -> list:
+    return ["app.py"] + sorted(os.path.relpath(p, ROOT) for p in glob.glob(os.path.join(ROOT, "pages", "*.py")))
+
+
+def _first_render(page: str) -> dict:
+    # Runs in a fresh spawned process (see measure_startup)
+    start = time.perf_counter()
+    import streamlit  # noqa: F401
+    streamlit_seconds = time.perf_counter() - start
+
+    from streamlit.testing.v1 import AppTest
+
+    def render() -> tuple:
+        app = AppTest.from_file(os.path.join(ROOT, page), default_timeout=120)
+        start = time.perf_counter()
+        app.run()
+        return time.perf_counter() - start, [e.value for e in app.exception]
+
+    first_seconds, exceptions = render()
+    heavy = [m for m in HEAVY_MODULES if m in sys.modules]
+    second_seconds, second_exceptions = render()
+    return {
+        "page": page,
+        "streamlit_import_s": streamlit_seconds,
+        "first_render_s": first_seconds,
+        "second_session_s": second_seconds,
+        "heavy_modules": heavy,
+        "exceptions": exceptions + second_exceptions,
+    }
+
+
+def measure_startup(pages, budget: float = DEFAULT_BUDGET) -> dict:
+    """
+    First-render timings of every page, each in its own fresh process,
+    with `within_budget` per page and overall.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for page in pages:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            record = pool.submit(_first_render, page).result()
+        record["within_budget"] = record["first_render_s"] <= budget and not record["exceptions"]
+        results.append(record)
+    return {
+        "budget_s": budget,
+        "within_budget": all(r["within_budget"] for r in results),
+        "results": results,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="benchmarks.startup", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", nargs="+", help="Page scripts relative to the repository (default: all).")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET,
+                        help="Allowed first-render seconds per page (default: 1.0).")
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    os.chdir(ROOT)  # the pages use paths relative to the repository (data/, models/, ...)
+    document = measure_startup(args.pages or app_pages(), budget=args.budget)
+
+    print(f"{'page':<36} {'streamlit':>9} {'first run':>9} {'2nd session':>11}  heavy modules")
+    for r in document["results"]:
+        flag = "" if r["within_budget"] else "  OVER BUDGET" if not r["exceptions"] else "  ERROR"
+        print(f"{r['page']:<36} {r['streamlit_import_s']:>8.2f}s {r['first_render_s']:>8.2f}s "
+              f"{r['second_session_s']:>10.2f}s  "
+              f"{', '.join(r['heavy_modules']) or '-'}{flag}")
+    print(f"\nBudget {document['budget_s']:.2f}s per first render: "
+          + ("all pages within budget" if document["within_budget"] else "exceeded"))
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2)
+    return 0 if document["within_budget"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+# benchmarks/synthetic.py
+"""
+Synthetic customers with the Churn_Modelling.csv schema.
+
+Column ranges and category mixes follow the public dataset (about 20%
+churners, a third of the balances at zero, France/Germany/Spain at
+50/25/25); churn depends on age, country, gender, activity, balance and
+product count through a logistic model, so the fitted model has real
+signal to find. Generation is vectorized and chunked: memory is bounded by
+`chunk_rows` however many rows are written, and the same (rows, seed)
+always gives the same file.
+"""
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = [
+    "RowNumber", "CustomerId", "Surname", "CreditScore", "Geography", "Gender", "Age", "Tenure",
+    "Balance", "NumOfProducts", "HasCrCard", "IsActiveMember", "EstimatedSalary", "Exited",
+]
+TARGET_COLUMN = "Exited"
+
+# Default location of the generated files (outside the repository)
+DATA_DIR = os.path.join(tempfile.gettempdir(), "churn_benchmarks")
+
+_SYLLABLES = ["ab", "ar", "bel", "chi", "da", "el", "fer", "go", "han", "ig", "jo", "ka", "li", "mo",
+              "nu", "ok", "pa", "qui", "ro", "sa", "ta", "ul", "vi", "wen", "xu", "ya", "zo"]
+
+
+def _surnames(n: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    parts = rng.choice(_SYLLABLES, size=(n, 3))
+    return np.array(["".join(p).capitalize() for p in parts])
+
+
+def make_customers(n_rows: int, start: int = 0, seed: int = 42) -> pd.DataFrame:
+    """
+    Rows start .. start + n_rows of the synthetic population. Each chunk
+    has its own random stream (derived from seed and start), so chunks can
+    be generated independently.
+    """
+    rng = np.random.default_rng([seed, start])
+    surnames = _surnames(2_000, seed)
+    row_number = np.arange(start + 1, start + n_rows + 1)
+
+    geography = rng.choice(np.array(["France", "Germany", "Spain"]), size=n_rows, p=[0.5, 0.25, 0.25])
+    gender = rng.choice(np.array(["Male", "Female"]), size=n_rows, p=[0.55, 0.45])
+    age = np.clip(np.round(rng.gamma(9.0, 4.3, size=n_rows) + 0.5), 18, 92).astype(np.int64)
+    balance = np.where(rng.random(n_rows) < 0.36, 0.0,
+                       np.clip(rng.normal(119_800, 30_000, size=n_rows), 3_000, 251_000)).round(2)
+    products = rng.choice(np.arange(1, 5), size=n_rows, p=[0.508, 0.46, 0.026, 0.006])
+    active = (rng.random(n_rows) < 0.515).astype(np.int64)
+
+    logit = (
+        -1.65
+        + 0.075 * (age - 38)
+        + 0.75 * (geography == "Germany")
+        + 0.5 * (gender == "Female")
+        - 1.0 * active
+        + 0.0000025 * balance
+        - 0.9 * (products == 2)
+        + 2.5 * (products >= 3)
+    )
+    exited = (rng.random(n_rows) < 1.0 / (1.0 + np.exp(-logit))).astype(np.int64)
+
+    return pd.DataFrame({
+        "RowNumber": row_number,
+        "CustomerId": 15_565_700 + row_number,
+        "Surname": surnames[rng.zipf(1.3, size=n_rows) % len(surnames)],
+        "CreditScore": np.clip(np.round(rng.normal(650, 96, size=n_rows)), 350, 850).astype(np.int64),
+        "Geography": geography,
+        "Gender": gender,
+        "Age": age,
+        "Tenure": rng.integers(0, 11, size=n_rows),
+        "Balance": balance,
+        "NumOfProducts": products,
+        "HasCrCard": (rng.random(n_rows) < 0.7).astype(np.int64),
+        "IsActiveMember": active,
+        "EstimatedSalary": rng.uniform(11.58, 199_992.48, size=n_rows).round(2),
+        "Exited": exited,
+    }, columns=COLUMNS)
+
+
+def write_customers_csv(path: str, n_rows: int, seed: int = 42, chunk_rows: int = 1_000_000):
+    """
+    Write n_rows synthetic customers to a CSV file, one chunk at a time (atomically).
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    for start in range(0, n_rows, chunk_rows):
+        chunk = make_customers(min(chunk_rows, n_rows - start), start=start, seed=seed)
+        chunk.to_csv(tmp_path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+    os.replace(tmp_path, path)
+
+
+def synthetic_csv(n_rows: int, seed: int = 42, data_dir: str = DATA_DIR) -> str:
+    """
+    Path of the synthetic CSV for (n_rows, seed), generated on first use.
+    """
+    path = os.path.join(data_dir, f"churn_{n_rows}_{seed}.csv")
+    if not os.path.exists(path):
+        write_customers_csv(path, n_rows, seed=seed)
+    return path
@@ -0,0 +1,407 @@
+# churnmodel.py
+"""
+Headless command line for the churn model (no Streamlit, no matplotlib).
+
+    python churnmodel.py train    --data data/Churn_Modelling.csv --drop RowNumber CustomerId Surname --encode Geography Gender
+    python churnmodel.py train    --data data/Churn_Modelling.csv --drop RowNumber CustomerId Surname --encode Geography Gender --threshold f1
+    python churnmodel.py train    --data history.parquet --incremental --drop RowNumber CustomerId Surname --encode Geography Gender
+    python churnmodel.py evaluate --data holdout.csv
+    python churnmodel.py score    --input customers.parquet --output scores.parquet --keep CustomerId
+    python churnmodel.py score    --input customers.parquet --output scores.parquet --keep CustomerId --reasons 5
+    python churnmodel.py score    --input customers.parquet --output scores.parquet --drift
+    python churnmodel.py serve    --port 8080
+    python churnmodel.py models   list | promote VERSION | rollback
+    python churnmodel.py --metrics stages.prom score --input customers.parquet --output scores.parquet
+
+Trained models are registered as new versions in models/registry and
+promoted to current (utils.registry); --model accepts an artifact file or
+a version id and defaults to the current version.
+
+Heavy libraries are imported inside the commands so `--help` and argument
+errors return immediately.
+"""
+import argparse
+import json
+import sys
+
+
+# --threshold values that pick the threshold on the test rows (utils.evaluation.best_threshold)
+THRESHOLD_METRICS = ("f1", "youden")
+
+
+def probability_arg(value: str) -> float:
+    try:
+        threshold = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a probability, got '{value}'")
+    if not 0.0 <= threshold <= 1.0:
+        raise argparse.ArgumentTypeError(f"threshold must be between 0 and 1, got {threshold}")
+    return threshold
+
+
+def threshold_arg(value: str):
+    if value in THRESHOLD_METRICS:
+        return value
+    try:
+        float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a probability or one of {THRESHOLD_METRICS}, got '{value}'")
+    return probability_arg(value)
+
+
+def steps_from_args(args):
+    """
+    The --drop / --encode options as recorded lineage steps (see utils.lineage).
+    """
+    from utils.lineage import make_step
+
+    steps = []
+    if args.drop:
+        steps.append(make_step("drop", args.drop))
+    if args.encode:
+        params = {"mode": args.encoding}
+        if args.encoding in ("onehot", "onehot_sparse"):
+            params["drop_first"] = not args.keep_first
+        elif args.encoding == "hashing":
+            params["n_features"] = args.hash_buckets
+        elif args.encoding == "target":
+            params["target"] = args.target
+        steps.append(make_step("encode", args.encode, **params))
+    return steps
+
+
+def threshold_report(choice, y_true, y_proba):
+    """
+    Resolve --threshold on the test rows; returns (threshold, report) where
+    report holds the ranking metrics and the metrics at that threshold.
+    """
+    from utils.evaluation import best_threshold, evaluate_scores, metrics_at
+
+    evaluation = evaluate_scores(y_true, y_proba)
+    counts = evaluation["counts"]
+    threshold = best_threshold(counts, choice) if choice in THRESHOLD_METRICS else float(choice)
+    report = {
+        "threshold": threshold,
+        "roc_auc": evaluation["roc_auc"],
+        "average_precision": evaluation["average_precision"],
+        "top_decile_lift": float(evaluation["lift"]["lift"].iloc[0]) if counts["rows"] else None,
+        **metrics_at(counts, threshold),
+    }
+    return threshold, report
+
+
+def cmd_train(args):
+    if args.incremental:
+        return cmd_train_incremental(args)
+
+    from utils.data_loader import content_hash, read_csv_optimized
+    from utils.instrumentation import measure
+    from utils.drift import build_reference
+    from utils.modeling import fit_summary, prepare_training_data, train_model
+    from utils.splits import take
+
+    with measure("load_csv") as record:
+        with open(args.data, "rb") as f:
+            data_bytes = f.read()
+        raw_df, _ = read_csv_optimized(data_bytes)
+        record["rows"] = len(raw_df)
+
+    # Split first: target encodings are fitted on the training rows only
+    with measure("build_features", rows=len(raw_df)):
+        data = prepare_training_data(raw_df, steps_from_args(args), args.target,
+                                     split_params={"train_size": args.train_size})
+    if data["dropped_columns"]:
+        print(f"Dropping non-numeric columns: {data['dropped_columns']}", file=sys.stderr)
+
+    X, y, split = data["X"], data["y"].to_numpy(), data["split"]
+    with measure("fit", rows=len(split["train"])) as fit_record:
+        model = train_model(take(X, split["train"]), take(y, split["train"]), C=args.C,
+                            scale=not args.no_scale, solver=args.solver)
+    training_seconds = fit_record["seconds"]
+    fit = {**fit_summary(model), "scale": not args.no_scale}
+    if not fit["converged"]:
+        print(f"Warning: {fit['solver']} stopped at its iteration limit before converging.", file=sys.stderr)
+    with measure("evaluate", rows=len(split["test"])):
+        y_test = take(y, split["test"])
+        threshold, report = threshold_report(args.threshold, y_test, model.predict_proba(take(X, split["test"]))[:, 1])
+
+    summary = {"train_rows": len(split["train"]), "test_rows": len(split["test"]), "training_seconds": training_seconds,
+               "iterations": fit["iterations"]}
+    metadata = {
+        "params": {"C": args.C, "penalty": "l2", "encoding": args.encoding, **fit},
+        "data_hash": content_hash(data_bytes),
+        "source": args.data,
+        "split_method": split["method"],
+        **summary,
+    }
+    with measure("drift_reference"):
+        reference = build_reference(X, model, data["feature_columns"], rows=split["train"])
+    saved = register_and_export(args, data, model, threshold, report, metadata, reference=reference)
+    print(json.dumps({**saved, **summary, **report}, indent=2))
+
+
+def register_and_export(args, data, model, threshold, report, metadata, reference=None) -> dict:
+    """
+    Register the trained pipeline as a new version (promoted unless
+    --no-promote) and also write it to --model when given.
+    """
+    from utils.artifacts import build_artifact, save_artifact
+    from utils.instrumentation import measure
+    from utils.registry import register_model
+
+    artifact = build_artifact(
+        preprocessor=data["preprocessor"],
+        model=model,
+        feature_columns=data["feature_columns"],
+        target_column=args.target,
+        input_schema=data["input_schema"],
+        threshold=threshold,
+        reference=reference
+    )
+    metrics = {k: v for k, v in report.items() if k != "threshold"}
+    with measure("register_model"):
+        version = register_model(artifact, {**metadata, "metrics": metrics}, promote=not args.no_promote)
+        if args.model:
+            save_artifact({**artifact, "version": version}, args.model)
+    return {"version": version, "promoted": not args.no_promote, "model": args.model}
+
+
+def cmd_train_incremental(args):
+    from utils.data_loader import file_format, partitions_hash
+    from utils.incremental import train_incremental
+    from utils.instrumentation import measure
+
+    with measure("train_incremental") as record:
+        result = train_incremental(
+            args.data,
+            file_format(args.data),
+            steps_from_args(args),
+            args.target,
+            chunksize=args.chunksize,
+            test_size=1 - args.train_size,
+            epochs=args.epochs,
+            alpha=args.alpha
+        )
+        record["rows"] = (result["train_rows"] + result["test_rows"]) * args.epochs
+    if result["dropped_columns"]:
+        print(f"Dropping non-numeric columns: {result['dropped_columns']}", file=sys.stderr)
+    threshold, report = threshold_report(args.threshold, result["y_true"], result["y_proba"])
+    report["log_loss"] = result["metrics"]["log_loss"]
+
+    summary = {k: result[k] for k in ("chunks", "train_rows", "test_rows", "train_seconds",
+                                      "train_rows_per_sec", "eval_seconds", "eval_rows_per_sec")}
+    metadata = {
+        "params": {"alpha": args.alpha, "epochs": args.epochs, "chunksize": args.chunksize,
+                   "solver": "sgd", "encoding": args.encoding},
+        # File path, size and mtime: the file is too large to hash its bytes
+        "data_hash": partitions_hash([args.data]),
+        "source": args.data,
+        "training_seconds": result["train_seconds"],
+        "train_rows": result["train_rows"],
+        "test_rows": result["test_rows"],
+    }
+    saved = register_and_export(args, result, result["model"], threshold, report, metadata)
+    print(json.dumps({**saved, **summary, **report}, indent=2))
+
+
+def cmd_evaluate(args):
+    import numpy as np
+    from utils.artifacts import artifact_threshold
+    from utils.data_loader import file_format, iter_chunks
+    from utils.instrumentation import measure
+    from utils.modeling import numeric_target
+    from utils.registry import MODEL_CACHE, resolve_model
+    from utils.scoring import scoring_inputs
+
+    model_path = resolve_model(args.model)
+    artifact = MODEL_CACHE.get(model_path)
+    target = args.target or artifact["target_column"]
+    estimator, input_columns = scoring_inputs(artifact, None, None)
+
+    # Only the labels (int8) and probabilities (float32) are kept, 5 bytes per row
+    y_parts, proba_parts = [], []
+    with measure("score_batch") as record:
+        for chunk in iter_chunks(args.data, file_format(args.data), chunksize=args.chunksize,
+                                 columns=list(dict.fromkeys(input_columns + [target]))):
+            y_true, _ = numeric_target(chunk[target])
+            y_parts.append(np.asarray(y_true, dtype=np.int8))
+            proba_parts.append(estimator.predict_proba(chunk[input_columns])[:, 1].astype(np.float32))
+        record["rows"] = sum(len(part) for part in y_parts)
+
+    y_true, y_proba = np.concatenate(y_parts), np.concatenate(proba_parts)
+    with measure("threshold_analysis", rows=len(y_true)):
+        _, report = threshold_report(
+            artifact_threshold(artifact) if args.threshold is None else args.threshold, y_true, y_proba
+        )
+    print(json.dumps({"model": model_path, "version": artifact.get("version"), "rows": len(y_true), **report}, indent=2))
+
+
+def cmd_score(args):
+    from utils.artifacts import artifact_threshold
+    from utils.data_loader import file_format, iter_chunks
+    from utils.instrumentation import measure
+    from utils.registry import MODEL_CACHE, resolve_model
+    from utils.scoring import score_chunks, scoring_inputs
+
+    artifact = MODEL_CACHE.get(resolve_model(args.model))
+    estimator, input_columns = scoring_inputs(artifact, None, None)
+    threshold = artifact_threshold(artifact) if args.threshold is None else args.threshold
+
+    monitor = None
+    if args.drift:
+        from utils.drift import DriftMonitor
+
+        if artifact.get("reference") is None:
+            print("Warning: the model has no training reference (trained before drift monitoring "
+                  "or out of core); skipping the drift report.", file=sys.stderr)
+        else:
+            monitor = DriftMonitor(artifact["reference"])
+
+    with measure("score_batch") as record:
+        summary = score_chunks(
+            estimator,
+            input_columns,
+            iter_chunks(args.input, file_format(args.input), chunksize=args.chunksize,
+                        columns=list(dict.fromkeys(input_columns + args.keep))),
+            args.output,
+            threshold=threshold,
+            keep_columns=args.keep,
+            reasons=args.reasons,
+            monitor=monitor
+        )
+        record["rows"] = summary["rows"]
+    if monitor is not None:
+        summary["drift"] = monitor.report()
+        if summary["drift"]["retrain"]:
+            print("Warning: significant drift against the training data; consider retraining.", file=sys.stderr)
+    print(json.dumps({"version": artifact.get("version"), **summary}, indent=2))
+
+
+def cmd_serve(args):
+    from utils.scoring_server import serve
+
+    serve(args.model, host=args.host, port=args.port,
+          max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+
+
+def cmd_models(args):
+    from utils.registry import current_version, list_versions, promote_version, rollback
+
+    try:
+        if args.action == "promote":
+            if not args.version:
+                raise ValueError("a VERSION is required")
+            promote_version(args.version)
+        elif args.action == "rollback":
+            rollback()
+    except ValueError as e:
+        raise SystemExit(f"churnmodel models {args.action}: {e}")
+
+    current = current_version()
+    summary = {"current": current}
+    if args.action == "list":
+        summary["versions"] = [
+            {
+                "version": m["version"],
+                "current": m["version"] == current,
+                "created_at": m["created_at"],
+                "params": m.get("params"),
+                "threshold": m.get("threshold"),
+                "accuracy": (m.get("metrics") or {}).get("accuracy"),
+                "roc_auc": (m.get("metrics") or {}).get("roc_auc"),
+            }
+            for m in list_versions()
+        ]
+    print(json.dumps(summary, indent=2))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="churnmodel", description="Train, evaluate and score the churn model.")
+    parser.add_argument("--metrics", help="Write stage timings and memory to this file when done "
+                                          "(Prometheus text for .prom / .txt, JSON otherwise).")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train = sub.add_parser("train", help="Fit the preprocessing + logistic regression pipeline on a CSV file.")
+    train.add_argument("--data", required=True, help="Training CSV (Churn_Modelling.csv schema); CSV or Parquet with --incremental.")
+    train.add_argument("--target", default="Exited", help="Target column (default: Exited).")
+    train.add_argument("--drop", nargs="*", default=[], help="Columns to drop before training.")
+    train.add_argument("--encode", nargs="*", default=[], help="Categorical columns to encode.")
+    train.add_argument("--encoding", default="onehot",
+                       choices=["onehot", "onehot_sparse", "hashing", "frequency", "target"])
+    train.add_argument("--keep-first", action="store_true", help="Keep the first dummy (one-hot only).")
+    train.add_argument("--hash-buckets", type=int, default=64, help="Buckets per column (hashing only).")
+    train.add_argument("--train-size", type=float, default=0.7, help="Training fraction (default: 0.7).")
+    train.add_argument("--C", type=float, default=1.0, help="Inverse regularization strength (default: 1.0).")
+    train.add_argument("--solver", default="auto", choices=["auto", "lbfgs", "liblinear", "saga"],
+                       help="auto: liblinear for small training sets, lbfgs for larger ones (default: auto).")
+    train.add_argument("--no-scale", action="store_true",
+                       help="Fit on raw features instead of standardized ones (the scaling is otherwise "
+                            "folded into the saved coefficients).")
+    train.add_argument("--model", help="Also write the artifact to this file (it is always registered).")
+    train.add_argument("--no-promote", action="store_true",
+                       help="Register the new version without making it the current model.")
+    train.add_argument("--threshold", type=threshold_arg, default=0.5,
+                       help="Operating threshold saved with the model: a probability, or 'f1' / 'youden' "
+                            "to pick the best one on the test rows (default: 0.5).")
+    train.add_argument("--incremental", action="store_true",
+                       help="Stream the file (CSV/Parquet) in chunks and train an SGD logistic model "
+                            "out of core; --C is ignored.")
+    train.add_argument("--chunksize", type=int, default=100_000, help="Rows per chunk (--incremental).")
+    train.add_argument("--epochs", type=int, default=1, help="Passes over the file (--incremental).")
+    train.add_argument("--alpha", type=float, default=1e-4,
+                       help="SGD regularization strength (--incremental, default: 1e-4).")
+    train.set_defaults(func=cmd_train)
+
+    evaluate = sub.add_parser("evaluate", help="Evaluate a saved model on a labelled CSV/Parquet file.")
+    evaluate.add_argument("--data", required=True)
+    evaluate.add_argument("--model", help="Artifact file or registry version (default: current version).")
+    evaluate.add_argument("--target", help="Target column (default: the one used for training).")
+    evaluate.add_argument("--threshold", type=threshold_arg,
+                          help="Threshold for the reported metrics (default: the one saved with the model).")
+    evaluate.add_argument("--chunksize", type=int, default=100_000)
+    evaluate.set_defaults(func=cmd_evaluate)
+
+    score = sub.add_parser("score", help="Score a CSV/Parquet file in chunks.")
+    score.add_argument("--input", required=True)
+    score.add_argument("--output", required=True, help="Output .csv or .parquet file.")
+    score.add_argument("--model", help="Artifact file or registry version (default: current version).")
+    score.add_argument("--keep", nargs="*", default=[], help="Input columns to copy to the output (e.g. CustomerId).")
+    # f1 / youden need labels, which a scoring input does not have
+    score.add_argument("--threshold", type=probability_arg,
+                       help="Churn prediction threshold (default: the one saved with the model).")
+    score.add_argument("--chunksize", type=int, default=100_000)
+    score.add_argument("--reasons", type=int, default=0, metavar="K",
+                       help="Add each customer's top K churn reasons (reason_1 .. reason_K columns).")
+    score.add_argument("--drift", action="store_true",
+                       help="Report feature / score drift (PSI, KS) against the model's training data.")
+    score.set_defaults(func=cmd_score)
+
+    serve = sub.add_parser("serve", help="Run the HTTP scoring service with micro-batching.")
+    serve.add_argument("--model", help="Artifact file or registry version (default: current version).")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8080)
+    serve.add_argument("--max-batch-size", type=int, default=512, help="Max rows per scored batch.")
+    serve.add_argument("--max-wait-ms", type=float, default=1.0,
+                       help="How long to wait for more requests before scoring a batch.")
+    serve.set_defaults(func=cmd_serve)
+
+    models = sub.add_parser("models", help="List registered model versions, promote one, or roll back.")
+    models.add_argument("action", choices=["list", "promote", "rollback"])
+    models.add_argument("version", nargs="?", help="Version to promote.")
+    models.set_defaults(func=cmd_models)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        args.func(args)
+    finally:
+        if args.metrics:
+            from utils.instrumentation import write_metrics
+            write_metrics(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
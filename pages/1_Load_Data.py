@@ -1,9 +1,135 @@
 # pages/1_📥_Load_Data.py
 import os
+import time
 import streamlit as st
-import pandas as pd
 
-from utils.state_manager import init_session_state, set_dataframes
+from utils.data_loader import (
+    content_hash, count_matching, file_format, parse_filter, partition_summary, partitions_hash,
+    preview_partitions, read_columns, read_csv_optimized, read_partitions, resolve_partitions
+)
+from utils.state_manager import (
+    init_session_state, get_profile, jobs_sidebar, perf_sidebar, resume_session_snapshot, set_raw_df, track
+)
+
+@st.cache_resource(show_spinner="Parsing CSV…", max_entries=4)
+def _parse_csv(data_hash: str, _data: bytes):
+    """
+    Parse each distinct file exactly once per server process.
+    Keyed on the content hash only (`_data` is excluded from hashing),
+    and returned by reference - callers must not mutate the frame in place.
+    """
+    return read_csv_optimized(_data)
+
+def load_csv_bytes(data: bytes):
+    """
+    Returns (df, memory_report, data_hash) for raw CSV bytes.
+    """
+    with track("load_csv") as record:
+        data_hash = content_hash(data)
+        df, report = _parse_csv(data_hash, data)
+        record["rows"] = len(df)
+    return df, report, data_hash
+
+@st.cache_resource(show_spinner="Reading partitions…", max_entries=4)
+def _read_partitions(key: str, _paths, _columns, _filters):
+    """
+    Stream a partitioned dataset once per server process, keyed on
+    partitions_hash (files, sizes, mtimes, projection, filters); same
+    sharing rules as _parse_csv.
+    """
+    return read_partitions(_paths, columns=_columns, filters=_filters)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _partition_summary(key: str, _paths):
+    return partition_summary(_paths)
+
+def model_input_columns():
+    """
+    Raw columns the current registry model reads, plus its target
+    (None when nothing has been promoted yet).
+    """
+    from utils.registry import load_model_version
+
+    try:
+        artifact = load_model_version()
+    except (OSError, ValueError):
+        return None
+    return [f["column"] for f in artifact["input_schema"]] + [artifact["target_column"]]
+
+def load_partitions():
+    """
+    Directory or glob of (daily) CSV / Parquet partitions, read lazily in
+    chunks with column projection and row filters. Preview and counts read
+    only what they need. Returns (df, report, data_hash) when
+    'Load Partitions' is clicked, otherwise (None, None, None).
+    """
+    nothing = None, None, None
+    with st.expander("📂 Load partitioned files (directory or glob)"):
+        spec = st.text_input("Directory or glob pattern", placeholder="data/daily/  or  data/daily/*.parquet")
+        if not spec:
+            return nothing
+        try:
+            paths = resolve_partitions(spec)
+        except FileNotFoundError as e:
+            st.warning(str(e))
+            return nothing
+
+        summary = _partition_summary(partitions_hash(paths), paths)
+        total_rows = int(summary["rows"].sum())
+        st.write(f"**{len(paths)} files** · {total_rows:,} rows · {summary['size_mb'].sum():.1f} MB on disk")
+        st.dataframe(summary, hide_index=True)
+
+        all_columns = read_columns(paths[0], file_format(paths[0]))
+        default = all_columns
+        model_columns = model_input_columns()
+        if model_columns and set(model_columns) <= set(all_columns):
+            if st.checkbox("Only the columns the current model needs", value=True):
+                default = [c for c in all_columns if c in model_columns]
+        columns = st.multiselect("Columns to read", all_columns, default=default)
+        filter_text = st.text_area("Row filters (one per line)", placeholder="Age >= 30\nGeography in France, Spain")
+
+        try:
+            filters = tuple(parse_filter(line) for line in filter_text.splitlines() if line.strip())
+        except ValueError as e:
+            st.error(str(e))
+            return nothing
+        unknown = [f[0] for f in filters if f[0] not in all_columns]
+        if unknown:
+            st.error(f"Unknown filter columns: {unknown}")
+            return nothing
+        if not columns:
+            st.warning("Select at least one column to read.")
+            return nothing
+
+        # None reads every column (no usecols / projection overhead)
+        projection = tuple(columns) if len(columns) < len(all_columns) else None
+
+        c1, c2, c3 = st.columns(3)
+        preview = c1.button("Preview")
+        count = c2.button("Count Matching Rows", disabled=not filters)
+        load = c3.button("Load Partitions", type="primary")
+
+        try:
+            if preview:
+                with track("preview_partitions"):
+                    st.dataframe(preview_partitions(paths, 20, projection, filters))
+                st.caption("First 20 matching rows; reading stopped as soon as they were found.")
+            if count:
+                with track("count_partitions", rows=total_rows):
+                    matching = count_matching(paths, filters)
+                st.info(f"{matching:,} of {total_rows:,} rows match the filters.")
+            if load:
+                key = partitions_hash(paths, projection, filters)
+                with track("load_partitions") as record:
+                    df, report = _read_partitions(key, paths, projection, filters)
+                    record["rows"] = len(df)
+                st.success(
+                    f"✅ Read {report['rows']:,} rows × {df.shape[1]} columns from {report['files']} files."
+                )
+                return df, report, key
+        except (KeyError, TypeError, ValueError) as e:
+            st.error(f"Could not read the partitions: {e}")
+    return nothing
 
 def load_default_data():
     """
@@ -12,20 +138,72 @@ def load_default_data():
     """
     data_path = os.path.join("data", "Churn_Modelling.csv")
     if os.path.exists(data_path):
-        return pd.read_csv(data_path)
+        with open(data_path, "rb") as f:
+            return load_csv_bytes(f.read())
     else:
         st.error(f"Default dataset not found at: {data_path}")
-        return None
+        return None, None, None
+
+def show_memory_report(report):
+    before_mb = report["before_bytes"] / 1024 ** 2
+    after_mb = report["after_bytes"] / 1024 ** 2
+    saved = 1 - report["after_bytes"] / report["before_bytes"] if report["before_bytes"] else 0.0
+
+    with st.expander("Memory usage (dtype optimization)"):
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Before", f"{before_mb:.2f} MB")
+        m2.metric("After", f"{after_mb:.2f} MB", delta=f"-{saved:.0%}", delta_color="inverse")
+        m3.metric("Parser", report["engine"])
+        st.caption(
+            "`Geography`/`Gender` are stored as `category`, integer flags and counts are "
+            "downcast (e.g. `int8`), and floats use `float32`."
+        )
+
+def resume_snapshot():
+    """
+    Resume a session snapshot saved after a train/test split (Step 4), from
+    this or another app instance sharing the snapshot folder.
+    """
+    from utils.snapshots import list_snapshots
+
+    snapshots = list_snapshots()
+    if not snapshots:
+        return
+
+    with st.expander(f"Resume a saved session ({len(snapshots)} snapshots)"):
+        labels = {
+            m["snapshot_id"]: (
+                f"{m['created_at']} · {m['rows']:,} rows · {m['steps']} steps"
+                + (f" · split on {m['target_column']} ({m['train_rows']:,} train rows)" if m["split_id"] else "")
+            )
+            for m in snapshots
+        }
+        snapshot_id = st.selectbox("Snapshot", list(labels), format_func=labels.get)
+        if st.button("Resume Session"):
+            start = time.perf_counter()
+            try:
+                manifest = resume_session_snapshot(snapshot_id)
+            except (OSError, ValueError) as e:
+                st.error(f"Could not load snapshot: {e}")
+                return
+            st.success(
+                f"✅ Resumed snapshot `{snapshot_id[:12]}` in {(time.perf_counter() - start) * 1000:.0f} ms "
+                f"({manifest['rows']:,} rows, {manifest['steps']} steps"
+                + (", train/test split restored)." if manifest["split_id"] else ").")
+            )
 
 def main():
     init_session_state()
 
     st.title("📥 Step 1 – Load Churn Dataset")
 
+    resume_snapshot()
+
     st.markdown("""
     You can either:
-    - **Upload a CSV file**, or  
-    - Use the **default demo file**: `data/Churn_Modelling.csv`
+    - **Upload a CSV file**,  
+    - Use the **default demo file**: `data/Churn_Modelling.csv`, or  
+    - **Load partitioned files**: a directory or glob of daily CSV / Parquet files
     """)
 
     # Option 1: Upload CSV
@@ -36,15 +214,21 @@ def main():
     with col1:
         use_default = st.button("Use Default Demo Dataset")
 
+    partitions = load_partitions()
+
     df = None
+    report = None
+    data_hash = None
 
     if uploaded_file is not None:
-        df = pd.read_csv(uploaded_file)
+        df, report, data_hash = load_csv_bytes(uploaded_file.getvalue())
         st.success("✅ File uploaded successfully!")
     elif use_default:
-        df = load_default_data()
+        df, report, data_hash = load_default_data()
         if df is not None:
             st.success("✅ Loaded default dataset from data/Churn_Modelling.csv")
+    elif partitions[0] is not None:
+        df, report, data_hash = partitions
 
     # If we already have data in session_state, show info and allow reuse
     if df is None and st.session_state["raw_df"] is not None:
@@ -52,25 +236,31 @@ def main():
         df = st.session_state["raw_df"]
 
     if df is not None:
-        # Update session_state
-        set_dataframes(raw_df=df, processed_df=df.copy())
+        # Update session_state (transformation steps from later pages are kept for the same dataset)
+        set_raw_df(df, data_hash=data_hash)
 
         st.subheader("📊 Dataset Preview")
         st.dataframe(df.head())
 
         st.write("**Shape:** ", df.shape)
 
+        if report is not None:
+            show_memory_report(report)
+
+        from utils.profiling import profile_table
+
+        # Profile once here; later pages read the profile instead of rescanning the data
+        profile = get_profile(processed=False)
         with st.expander("Column Info"):
-            dtypes_df = pd.DataFrame({
-                "column": df.columns,
-                "dtype": df.dtypes.astype(str)
-            })
-            st.dataframe(dtypes_df)
+            st.dataframe(profile_table(profile))
+            st.caption(f"Column profile built in {profile['seconds'] * 1000:.0f} ms and reused by the next steps.")
 
         st.success("✅ Data stored in session and ready for the next steps.")
         st.markdown("➡️ Now go to **Page 2 – Visualize Data** from the sidebar.")
     else:
-        st.warning("Please upload a CSV file or click **Use Default Demo Dataset** to proceed.")
+        st.warning("Please upload a CSV file, click **Use Default Demo Dataset** or load partitioned files to proceed.")
 
 if __name__ == "__main__":
     main()
+    jobs_sidebar()
+    perf_sidebar()
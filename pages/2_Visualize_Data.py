@@ -1,9 +1,24 @@
 # pages/2_📊_Visualize_Data.py
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
 
-from utils.state_manager import init_session_state, get_processed_df
+from utils.state_manager import (
+    init_session_state, get_processed_df, get_processed_key, get_profile, jobs_sidebar, perf_sidebar, track
+)
+
+# Row count above which plotting from a sample is offered by default
+SAMPLE_DEFAULT_ROWS = 1_000_000
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def cached_summary(processed_key: str, col_name: str, bins: int, sample_size, _col_data) -> dict:
+    """
+    Column counts are cached per (dataset hash + lineage, column, bins, sample),
+    so switching back and forth between columns does not rescan the data.
+    """
+    from utils.column_stats import column_summary
+
+    return column_summary(_col_data, bins=bins, sample_size=sample_size)
+
 
 def main():
     init_session_state()
@@ -14,6 +29,12 @@ def main():
         st.warning("No data found. Please go to **Step 1 – Load Data** first.")
         return
 
+    # Plotting and column statistics are only imported once there is data to show
+    import matplotlib.pyplot as plt
+
+    from utils.column_stats import top_categories
+    from utils.profiling import PROFILE_BINS
+
     st.write("Select a column to visualize:")
 
     col_name = st.selectbox("Column", df.columns)
@@ -21,31 +42,71 @@ def main():
     if not col_name:
         return
 
-    col_data = df[col_name]
+    profile = get_profile()
+    col_profile = profile["columns"][col_name]
+    if col_profile["kind"] == "other":
+        st.info(f"`{col_name}` ({col_profile['dtype']}) is neither numeric nor categorical; nothing to plot.")
+        return
 
-    # Detect type
-    if col_data.dtype == "object" or str(col_data.dtype) == "category":
+    use_sample = st.checkbox(
+        "Plot from a random sample",
+        value=len(df) > SAMPLE_DEFAULT_ROWS,
+        help="Counts are computed from a uniform random sample of the rows instead of the full column."
+    )
+    sample_size = None
+    if use_sample:
+        sample_size = int(st.number_input("Sample size (rows)", min_value=1_000, max_value=10_000_000,
+                                          value=min(100_000, max(len(df), 1_000)), step=10_000))
+
+    # Categorical summaries do not depend on the bin count
+    bins = 0 if col_profile["kind"] == "categorical" else st.slider("Bins", min_value=5, max_value=200, value=PROFILE_BINS)
+
+    if sample_size is None and bins in (0, PROFILE_BINS):
+        summary = {**col_profile, "rows": profile["rows"]}  # computed once at load time
+    else:
+        with track("column_summary", rows=sample_size or len(df)):
+            summary = cached_summary(get_processed_key(), col_name, bins, sample_size, df[col_name])
+
+    if summary["kind"] == "categorical":
         # Categorical → Count plot
         st.subheader(f"Count Plot – {col_name}")
-        value_counts = col_data.value_counts().sort_index()
+        labels, counts, other = top_categories(summary["labels"], summary["counts"])
+        other += summary.get("other_count", 0)
 
         fig, ax = plt.subplots()
-        value_counts.plot(kind="bar", ax=ax)
+        ax.bar(range(len(labels)), counts)
+        ax.set_xticks(range(len(labels)), labels, rotation=45, ha="right")
         ax.set_xlabel(col_name)
         ax.set_ylabel("Count")
-        plt.xticks(rotation=45)
         st.pyplot(fig)
+        plt.close(fig)
+
+        if other:
+            st.caption(f"Showing the {len(labels)} most frequent of {summary['cardinality']:,} values; "
+                       f"{other:,} rows have other values.")
 
     else:
         # Numeric → Histogram
         st.subheader(f"Histogram – {col_name}")
         fig, ax = plt.subplots()
-        ax.hist(col_data.dropna(), bins=30)
+        ax.stairs(summary["counts"], summary["edges"], fill=True)
         ax.set_xlabel(col_name)
         ax.set_ylabel("Frequency")
         st.pyplot(fig)
+        plt.close(fig)
+
+    stats = f"{col_profile['nulls']:,} missing · {col_profile['cardinality']:,} distinct values"
+    if col_profile["kind"] == "numeric" and col_profile["min"] is not None:
+        stats += (f" · min {col_profile['min']:,.4g} · median {col_profile['quantiles'][0.5]:,.4g}"
+                  f" · max {col_profile['max']:,.4g}")
+    st.caption(stats)
+
+    if sample_size is not None and summary["rows"] < len(df):
+        st.caption(f"Computed from a random sample of {summary['rows']:,} of {len(df):,} rows.")
 
     st.info("For categorical columns you get a **count plot**, for numeric columns you get a **histogram**.")
 
 if __name__ == "__main__":
     main()
+    jobs_sidebar()
+    perf_sidebar()
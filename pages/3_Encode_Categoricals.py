@@ -1,8 +1,51 @@
 # pages/3_🧮_Encode_Categoricals.py
 import streamlit as st
-import pandas as pd
 
-from utils.state_manager import init_session_state, get_processed_df
+from utils.state_manager import (
+    init_session_state,
+    get_processed_df,
+    get_profile,
+    get_lineage,
+    add_step,
+    undo_last_step,
+    reset_lineage,
+    get_memory_report,
+    jobs_sidebar,
+    perf_sidebar
+)
+
+def show_lineage():
+    """
+    Show the recorded transformation steps with undo/reset controls.
+    """
+    from utils.lineage import describe_step
+
+    steps = get_lineage()
+    with st.expander(f"Applied transformation steps ({len(steps)})", expanded=bool(steps)):
+        if not steps:
+            st.write("No transformations yet – the working data is the loaded dataset.")
+            return
+
+        for i, step in enumerate(steps, start=1):
+            st.write(f"{i}. `{describe_step(step)}`")
+
+        col1, col2 = st.columns(2)
+        if col1.button("Undo last step"):
+            undo_last_step()
+            st.rerun()
+        if col2.button("Reset to loaded data"):
+            reset_lineage()
+            st.rerun()
+
+def show_memory_usage():
+    report = get_memory_report()
+    with st.expander("Session memory usage"):
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("Base data", f"{report['base'] / 1024 ** 2:.2f} MB")
+        m2.metric("Derived columns", f"{report['derived'] / 1024 ** 2:.2f} MB")
+        m3.metric("Features + split", f"{(report['features'] + report['split']) / 1024 ** 2:.2f} MB")
+        m4.metric("Total", f"{report['total'] / 1024 ** 2:.2f} MB")
+        st.caption("Unchanged columns are shared with the loaded data, so only new dummy columns cost extra memory.")
 
 def main():
     init_session_state()
@@ -13,31 +56,89 @@ def main():
         st.warning("No data found. Please go to **Step 1 – Load Data** first.")
         return
 
+    # The encoders (scikit-learn) are only imported once there is data to encode
+    from utils.encoding import ENCODING_MODES, SPARSE_MODES
+    from utils.profiling import columns_of_kind, profile_table
+
+    # Column metadata comes from the profile built at load time - no rescan of the data
+    profile = get_profile()
+
     st.subheader("Current Columns & Data Types")
-    dtypes_df = pd.DataFrame({
-        "column": df.columns,
-        "dtype": df.dtypes.astype(str)
-    })
-    st.dataframe(dtypes_df)
+    st.dataframe(profile_table(profile))
+
+    show_lineage()
+    show_memory_usage()
+
+    with st.expander("Drop columns (e.g. identifiers such as RowNumber, CustomerId, Surname)"):
+        drop_cols = st.multiselect("Columns to drop:", options=list(df.columns))
+        if st.button("Drop Selected Columns"):
+            if not drop_cols:
+                st.warning("Please select at least one column to drop.")
+            else:
+                add_step("drop", drop_cols)
+                st.rerun()
 
     # Detect categorical columns
-    cat_cols = [c for c in df.columns if df[c].dtype == "object" or str(df[c].dtype) == "category"]
+    cat_cols = columns_of_kind(profile, "categorical")
 
     if not cat_cols:
-        st.info("No categorical (object/category) columns detected. Nothing to encode.")
-        return
+        st.info(
+            "No categorical (object/category) columns detected. Numeric identifier columns "
+            "can still be hashed or frequency/target encoded."
+        )
 
-    selected_cols = st.multiselect(
-        "Select categorical columns to encode using pd.get_dummies:",
-        options=cat_cols,
-        default=cat_cols  # you can change this if you want
+    mode = st.selectbox(
+        "Encoding method:",
+        options=list(ENCODING_MODES),
+        format_func=ENCODING_MODES.get,
+        help="For high-cardinality columns (e.g. Surname, CustomerId) prefer hashing, "
+             "frequency or target encoding, or keep one-hot output sparse."
     )
 
-    drop_first = st.checkbox(
-        "Drop first dummy for each selected column (helps with multicollinearity)",
-        value=True
+    # High-cardinality identifiers such as CustomerId are numeric but can be hashed/frequency-encoded too.
+    # The churn label is never offered: encoding it would replace the target before Step 4
+    label = st.session_state.get("target_column") or "Exited"
+    options = [c for c in (cat_cols if mode in ("onehot", "onehot_sparse") else df.columns) if c != label]
+
+    selected_cols = st.multiselect(
+        "Select categorical columns to encode:",
+        options=options,
+        default=[c for c in cat_cols if c != label]  # you can change this if you want
     )
 
+    drop_first = False
+    n_features = 64
+    target = None
+    smoothing = 10.0
+
+    if mode in ("onehot", "onehot_sparse"):
+        drop_first = st.checkbox(
+            "Drop first dummy for each selected column (helps with multicollinearity)",
+            value=True
+        )
+    elif mode == "hashing":
+        n_features = st.number_input(
+            "Hash buckets per column", min_value=4, max_value=4096, value=64, step=4
+        )
+    elif mode == "target":
+        other_cols = [c for c in df.columns if c not in selected_cols]
+        target = st.selectbox(
+            "Target column (churn flag) used to compute category churn rates:",
+            options=other_cols,
+            index=other_cols.index("Exited") if "Exited" in other_cols else 0
+        )
+        smoothing = st.number_input("Smoothing (pseudo-count)", min_value=0.0, value=10.0, step=1.0)
+        st.caption("Encodings are computed out-of-fold, so each row never sees its own target value. "
+                   "Step 4 refits them on the training rows only and must model the same target.")
+
+    if selected_cols and mode == "onehot":
+        n_categories = sum(profile["columns"][c]["cardinality"] for c in selected_cols)
+        if n_categories > 100:
+            st.warning(
+                f"Dense one-hot encoding will create about **{n_categories}** columns. "
+                "Consider a sparse, hashing or frequency encoding instead."
+            )
+
     if st.button("Apply Encoding"):
         if not selected_cols:
             st.warning("Please select at least one column to encode.")
@@ -45,26 +146,34 @@ def main():
 
         before_cols = list(df.columns)
 
-        encoded_df = pd.get_dummies(
-            df,
-            columns=selected_cols,
-            drop_first=drop_first,
-            dtype=int   # ensures integer 0/1 for dummy columns
-        )
+        params = {"mode": mode}
+        if mode in ("onehot", "onehot_sparse"):
+            params["drop_first"] = drop_first
+        elif mode == "hashing":
+            params["n_features"] = int(n_features)
+        elif mode == "target":
+            params["target"] = target
+            params["smoothing"] = float(smoothing)
 
-        # Update only the processed_df in session_state
-        st.session_state["processed_df"] = encoded_df
+        # Record the step; the encoded frame is materialized lazily from the loaded data
+        add_step("encode", selected_cols, **params)
+        encoded_df = get_processed_df()
 
         st.success("✅ Encoding applied and stored in the current session.")
 
         st.write("Number of columns **before** encoding:", len(before_cols))
         st.write("Number of columns **after** encoding:", encoded_df.shape[1])
 
-        with st.expander("Show new dummy columns"):
-            new_cols = [c for c in encoded_df.columns if c not in before_cols]
+        if mode in SPARSE_MODES:
+            st.info("Encoded columns are stored as sparse `uint8` columns and stay sparse through training.")
+
+        with st.expander("Show new encoded columns"):
+            new_cols = [c for c in encoded_df.columns if c not in before_cols or c in selected_cols]
             st.write(new_cols)
 
         st.markdown("➡️ Next: Go to **Step 4 – Train/Test Split** from the sidebar.")
 
 if __name__ == "__main__":
     main()
+    jobs_sidebar()
+    perf_sidebar()
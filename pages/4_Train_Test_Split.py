@@ -1,9 +1,21 @@
 # pages/4_✂️_Train_Test_Split.py
 import streamlit as st
-import pandas as pd
-from sklearn.model_selection import train_test_split
 
-from utils.state_manager import init_session_state, get_processed_df
+from utils.jobs import BACKGROUND_ROWS, features_job
+from utils.state_manager import (
+    init_session_state,
+    get_processed_df,
+    get_processed_key,
+    get_profile,
+    get_raw_df,
+    get_lineage,
+    save_session_snapshot,
+    nbytes,
+    jobs_sidebar,
+    perf_sidebar,
+    submit_job,
+    track
+)
 
 def main():
     init_session_state()
@@ -14,6 +26,17 @@ def main():
         st.warning("No data found. Please go to **Step 1 – Load Data** first.")
         return
 
+    # scikit-learn and the feature builders are only imported once there is data to split
+    import numpy as np
+    import pandas as pd
+    import scipy.sparse as sp
+
+    from utils.modeling import check_target_encoding, fit_preprocessor, numeric_target
+    from utils.profiling import columns_of_kind
+    from utils.splits import SPLIT_METHODS, make_split, split_nbytes, take
+
+    profile = get_profile()
+
     st.write("Shape of current processed data:", df.shape)
 
     # Try to default to 'Exited' if present
@@ -28,13 +51,47 @@ def main():
         index=default_index
     )
 
-    train_size_percent = st.slider(
-        "Training data percentage",
-        min_value=50,
-        max_value=90,
-        value=70,
-        step=5,
-        help="Example: 70% train / 30% test"
+    raw_df = get_raw_df()
+    split_method = st.selectbox("Split method", list(SPLIT_METHODS), format_func=SPLIT_METHODS.get)
+
+    # Ordering / grouping columns come from the loaded data, so identifiers dropped in Step 3 still work
+    order_col = group_col = None
+    n_splits = 5
+    if split_method == "time":
+        order_col = st.selectbox(
+            "Order rows by (earliest rows are used for training):",
+            options=list(raw_df.columns),
+            index=raw_df.columns.get_loc("RowNumber") if "RowNumber" in raw_df.columns else 0
+        )
+    elif split_method in ("group", "kfold"):
+        group_options = ([] if split_method == "group" else ["(none)"]) + list(raw_df.columns)
+        default_group = "CustomerId" if split_method == "group" and "CustomerId" in raw_df.columns else group_options[0]
+        group_col = st.selectbox(
+            "Group column (all rows of a group stay on the same side):",
+            options=group_options,
+            index=group_options.index(default_group)
+        )
+        if group_col == "(none)":
+            group_col = None
+
+    if split_method == "kfold":
+        n_splits = st.slider("Number of folds", min_value=2, max_value=10, value=5)
+        train_size_percent = 100
+    else:
+        train_size_percent = st.slider(
+            "Training data percentage",
+            min_value=50,
+            max_value=90,
+            value=70,
+            step=5,
+            help="Example: 70% train / 30% test"
+        )
+
+    background = st.toggle(
+        "Build features in the background",
+        value=len(raw_df) >= BACKGROUND_ROWS,
+        help="Encode as a job (progress in the sidebar) so the app stays responsive. "
+             "Splitting, and re-splitting already encoded features, always runs here."
     )
 
     if st.button("Split into Train and Test"):
@@ -42,57 +99,119 @@ def main():
             st.warning("Please select a target column.")
             return
 
-        # 1️⃣ Separate X and y
-        X_full = df.drop(columns=[target_col])
-        y = df[target_col]
+        split_params = {
+            "method": split_method,
+            "train_size": train_size_percent / 100.0,
+            "order": raw_df[order_col].to_numpy() if order_col else None,
+            "groups": raw_df[group_col].to_numpy() if group_col else None,
+            "n_splits": n_splits,
+            "stratify": profile["columns"][target_col]["cardinality"] > 1,
+        }
+
+        try:
+            target_encoded = check_target_encoding(get_lineage(), target_col)
+        except ValueError as e:
+            st.error(str(e))
+            return
 
-        # 2️⃣ Ensure target is numeric
-        if y.dtype == "object":
-            y = y.astype("category").cat.codes
+        # 1️⃣ Separate y and ensure it is numeric
+        y, converted = numeric_target(df[target_col])
+        if converted:
             st.info("Target column was non-numeric; converted to category codes for modelling.")
 
-        # 3️⃣ Keep ONLY numeric/bool columns for X
-        numeric_cols = X_full.select_dtypes(include=["number", "bool"]).columns.tolist()
-        non_numeric_cols = [c for c in X_full.columns if c not in numeric_cols]
-
-        if non_numeric_cols:
-            st.warning(
-                "The following non-numeric columns will be **dropped** from the model input, "
-                "because Logistic Regression requires numeric features.\n\n"
-                f"👉 {non_numeric_cols}\n\n"
-                "If you want to use them, please encode them in **Step 3 – Encode Categorical Variables**."
-            )
-
-        X = X_full[numeric_cols]
-
-        train_size = train_size_percent / 100.0
+        # 2️⃣ Split first: the split is just int32 row positions, and target encodings
+        #    must be fitted on the training rows only
+        try:
+            with track("split", rows=len(y)):
+                split = make_split(y.to_numpy(), **split_params)
+        except ValueError as e:
+            st.error(f"Could not split the data: {e}")
+            return
 
-        X_train, X_test, y_train, y_test = train_test_split(
-            X,
-            y,
-            train_size=train_size,
-            random_state=42,
-            stratify=y if len(y.unique()) > 1 else None
-        )
+        # Same data, lineage and target reuse the encoded matrix; with a target
+        # encoding it also depends on the training rows
+        features_key = (get_processed_key(), target_col)
+        cached = st.session_state.get("_features")
+        if (cached is not None and cached["key"] == features_key
+                and (not target_encoded or np.array_equal(cached["train"], split["train"]))):
+            X, y, feature_columns = cached["X"], cached["y"], cached["feature_columns"]
+        else:
+            # 3️⃣ Keep ONLY numeric/bool columns for X (column kinds come from the load-time profile)
+            numeric_cols = columns_of_kind(profile, "numeric", exclude=[target_col])
+            non_numeric_cols = [c for c in df.columns if c != target_col and c not in numeric_cols]
+
+            if non_numeric_cols:
+                st.warning(
+                    "The following non-numeric columns will be **dropped** from the model input, "
+                    "because Logistic Regression requires numeric features.\n\n"
+                    f"👉 {non_numeric_cols}\n\n"
+                    "If you want to use them, please encode them in **Step 3 – Encode Categorical Variables**."
+                )
+
+            # 4️⃣ Capture Step 3's encoding + this column selection as one fitted preprocessor.
+            #    Its output is the model input: one contiguous float32 matrix (or CSR for sparse
+            #    encodings), so training and scoring share the exact same transform.
+            feature_columns = numeric_cols
+            if background:
+                submit_job(
+                    features_job, raw_df, get_lineage(), feature_columns, y, split,
+                    kind="features",
+                    label=f"Features + {split_method} split ({len(raw_df):,} rows)",
+                    context={"target_column": target_col, "feature_columns": feature_columns}
+                )
+                st.info("⚙️ Encoding submitted – follow the job in the sidebar. "
+                        "The split is stored in this session when it finishes.")
+                return
+            train_rows = split["train"] if target_encoded else None
+            try:
+                with track("build_features", rows=len(raw_df)):
+                    preprocessor, X, schema = fit_preprocessor(raw_df, get_lineage(), feature_columns, y, train_rows)
+            except ValueError as e:
+                st.error(f"Could not rebuild the Step 3 encoding as a pipeline: {e}")
+                return
+            y = y.to_numpy()
+
+            st.session_state["_features"] = {
+                "key": features_key, "X": X, "y": y, "feature_columns": feature_columns, "train": split["train"]
+            }
+            st.session_state["preprocessor"] = preprocessor
+            st.session_state["input_schema"] = schema
 
         # Save in session_state
         st.session_state["target_column"] = target_col
-        st.session_state["X_train"] = X_train
-        st.session_state["X_test"] = X_test
-        st.session_state["y_train"] = y_train
-        st.session_state["y_test"] = y_test
+        st.session_state["X"] = X
+        st.session_state["y"] = y
+        st.session_state["split"] = split
+        st.session_state["feature_columns"] = feature_columns
 
         st.success("✅ Train/Test split completed and saved in session.")
-        st.write(f"X_train shape: {X_train.shape}")
-        st.write(f"X_test shape: {X_test.shape}")
+        try:
+            snapshot_id = save_session_snapshot()
+            st.caption(f"Session snapshot `{snapshot_id[:12]}` saved – resume it from **Step 1** after a restart.")
+        except OSError as e:
+            st.caption(f"Session snapshot not saved: {e}")
+
+        if split["folds"]:
+            st.write(f"{len(split['folds'])} folds over {X.shape[0]:,} rows × {X.shape[1]} features")
+        else:
+            st.write(f"Train rows: {len(split['train']):,} · Test rows: {len(split['test']):,} · Features: {X.shape[1]}")
+        st.caption(
+            f"Feature matrix {nbytes(X) / 1024 ** 2:.2f} MB (stored once); "
+            f"split indices {split_nbytes(split) / 1024:.1f} KB."
+        )
+        if sp.issparse(X):
+            density = X.nnz / (X.shape[0] * X.shape[1]) if X.shape[1] else 0.0
+            st.info(f"Features kept as a sparse CSR matrix (density {density:.2%}).")
 
         with st.expander("y_train distribution (normalized)"):
-            st.write(y_train.value_counts(normalize=True).round(3))
+            st.write(pd.Series(take(y, split["train"])).value_counts(normalize=True).round(3))
 
         with st.expander("Final feature columns used for the model"):
-            st.write(numeric_cols)
+            st.write(feature_columns)
 
         st.markdown("➡️ Next: Go to **Step 5 – Train & Evaluate Model**.")
 
 if __name__ == "__main__":
     main()
+    jobs_sidebar()
+    perf_sidebar()
@@ -1,104 +1,631 @@
 # pages/5_🧠_Train_Evaluate_Model.py
 import os
-import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
+import time
+from functools import partial
 
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import (
-    accuracy_score,
-    confusion_matrix,
-    precision_score,
-    recall_score,
-    f1_score
-)
-import joblib
+import streamlit as st
 
-from utils.state_manager import init_session_state
+# Only light modules at the top: scikit-learn, matplotlib and the model
+# registry are imported by the functions that need them, so the page opens
+# instantly before Step 4 has produced any features
+from utils.jobs import BACKGROUND_ROWS, train_job
+from utils.state_manager import get_lineage, init_session_state, jobs_sidebar, perf_sidebar, submit_job, track
 
 def main():
     init_session_state()
     st.title("🧠 Step 5 – Train & Evaluate Logistic Regression Model")
 
-    X_train = st.session_state.get("X_train")
-    X_test = st.session_state.get("X_test")
-    y_train = st.session_state.get("y_train")
-    y_test = st.session_state.get("y_test")
+    mode = st.radio(
+        "Training mode",
+        ["Single fit", "Regularization path (CV search)", "Out-of-core (stream a file)"],
+        horizontal=True
+    )
+
+    if mode == "Out-of-core (stream a file)":
+        incremental_training()
+        threshold_analysis()
+        model_registry()
+        return
+
+    X = st.session_state.get("X")
+    y = st.session_state.get("y")
+    split = st.session_state.get("split")
+    feature_columns = st.session_state.get("feature_columns")
 
-    if X_train is None or X_test is None or y_train is None or y_test is None:
+    if X is None or y is None or split is None:
         st.warning("Train/Test data not found. Please complete **Step 4 – Train/Test Split** first.")
         return
 
-    st.write("Training features shape:", X_train.shape)
-    st.write("Test features shape:", X_test.shape)
+    from utils.lineage import describe_step
+    from utils.modeling import SOLVERS, cross_validated_metrics, evaluate_model, fit_summary, train_model
+    from utils.splits import take
+
+    # Rows are gathered from the single Step 4 matrix only for the fit / evaluation below
+    if split["folds"]:
+        st.write(f"**{len(split['folds'])}-fold cross-validation** over {X.shape[0]:,} rows × {X.shape[1]} features. "
+                 "Metrics are computed on the pooled out-of-fold predictions; the saved model is fitted on all rows.")
+    else:
+        st.write("Training features shape:", (len(split["train"]), X.shape[1]))
+        st.write("Test features shape:", (len(split["test"]), X.shape[1]))
 
     with st.expander("Feature columns used for training"):
-        st.write(list(X_train.columns))
-
-    C_value = st.slider(
-        "Regularization strength (C) for Logistic Regression",
-        min_value=0.01,
-        max_value=10.0,
-        value=1.0,
-        step=0.01
-    )
+        st.write(feature_columns)
+
+    if mode == "Single fit":
+        C_value = st.slider(
+            "Regularization strength (C) for Logistic Regression",
+            min_value=0.01,
+            max_value=10.0,
+            value=1.0,
+            step=0.01
+        )
+        col1, col2 = st.columns(2)
+        with col1:
+            scale = st.checkbox(
+                "Standardize features", value=True,
+                help="Fit on standardized features (much faster, reliable convergence); the scaling is folded "
+                     "into the saved coefficients, so Step 6 still scores raw inputs."
+            )
+        with col2:
+            solver = st.selectbox(
+                "Solver", SOLVERS,
+                help="auto: liblinear for small training sets, lbfgs for larger ones."
+            )
 
-    if st.button("Train Logistic Regression Model"):
-        model = LogisticRegression(
-            C=C_value,
-            max_iter=1000,
-            solver="lbfgs"
+        background = st.toggle(
+            "Train in the background",
+            value=X.shape[0] >= BACKGROUND_ROWS,
+            help="Run the fit as a job (progress in the sidebar) so the app stays responsive; "
+                 "the model is registered even if you leave this page."
         )
 
-        model.fit(X_train, y_train)
+        params = {"C": C_value, "penalty": "l2", "solver": solver, "scale": scale}
+        fit_params = {"C": C_value, "scale": scale, "solver": solver}
+        if st.button("Train Logistic Regression Model"):
+            if background:
+                submit_job(
+                    train_job, X, y, split, C_value,
+                    st.session_state.get("preprocessor"),
+                    feature_columns,
+                    st.session_state.get("target_column"),
+                    st.session_state.get("input_schema"),
+                    {**training_metadata(params), "lineage": [describe_step(step) for step in get_lineage()]},
+                    scale=scale,
+                    solver=solver,
+                    kind="train",
+                    label=f"Logistic regression (C={C_value:g})"
+                )
+                st.info("⚙️ Training job submitted – follow it in the sidebar. "
+                        "The model is registered and loaded into this session when it finishes.")
+            else:
+                start = time.perf_counter()
+                if split["folds"]:
+                    with track("cross_validate", rows=X.shape[0]):
+                        metrics = cross_validated_metrics(partial(train_model, **fit_params), X, y, split["folds"])
+                    with track("fit", rows=X.shape[0]) as fit_record:
+                        model = train_model(X, y, **fit_params)
+                else:
+                    with track("fit", rows=len(split["train"])) as fit_record:
+                        model = train_model(take(X, split["train"]), take(y, split["train"]), **fit_params)
+                    with track("evaluate", rows=len(split["test"])):
+                        metrics = evaluate_model(model, take(X, split["test"]), take(y, split["test"]))
+                fit = {**fit_summary(model), "fit_seconds": fit_record["seconds"], "scale": scale}
+                params.update(fit)
+                show_fit(fit)
+                evaluate_and_save(model, metrics, feature_columns, take(y, split["test"]),
+                                  params=params, training_seconds=time.perf_counter() - start)
+        else:
+            background_result()
+    else:
+        regularization_search(X, y, split, feature_columns)
 
-        y_pred = model.predict(X_test)
-        y_proba = model.predict_proba(X_test)[:, 1]
+    threshold_analysis()
+    model_registry()
 
-        acc = accuracy_score(y_test, y_pred)
-        prec = precision_score(y_test, y_pred, zero_division=0)
-        rec = recall_score(y_test, y_pred, zero_division=0)
-        f1 = f1_score(y_test, y_pred, zero_division=0)
-        cm = confusion_matrix(y_test, y_pred)
 
-        st.subheader("📈 Evaluation Metrics")
-        st.write(f"**Accuracy:** {acc:.4f}")
-        st.write(f"**Precision:** {prec:.4f}")
-        st.write(f"**Recall:** {rec:.4f}")
-        st.write(f"**F1 Score:** {f1:.4f}")
+def show_fit(fit: dict):
+    """
+    Solver, iterations and fit time of the final fit.
+    """
+    st.caption(
+        f"Fitted with **{fit['solver']}** in {fit['iterations']} iterations ({fit['fit_seconds']:.2f}s) "
+        + ("on standardized features (scaling folded into the coefficients)." if fit["scale"] else "on raw features.")
+    )
+    if not fit["converged"]:
+        st.warning("⚠️ The solver stopped at its iteration limit before converging; "
+                   "standardizing the features usually fixes this.")
 
-        st.subheader("📊 Confusion Matrix")
-        cm_df = pd.DataFrame(
-            cm,
-            index=["Actual 0 (No Churn)", "Actual 1 (Churn)"],
-            columns=["Predicted 0", "Predicted 1"]
-        )
-        st.dataframe(cm_df)
 
-        # Confusion matrix heatmap
+def regularization_search(X, y, split, feature_columns):
+    """
+    Cross-validated sweep over a log-spaced C grid on the training rows
+    (or over the Step 4 folds); the best model is then evaluated on the
+    test rows (or out-of-fold) and saved.
+    """
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    from utils.modeling import (
+        PATH_METRICS, cross_validated_metrics, evaluate_model, fit_scaled_logistic, regularization_path
+    )
+    from utils.splits import take
+
+    st.caption(
+        "Each fold fits the whole C grid with warm starts (features standardized per fold); "
+        "folds and penalties run in parallel on all CPU cores."
+    )
+    col1, col2 = st.columns(2)
+    with col1:
+        log_c_range = st.slider("log10(C) range", min_value=-4.0, max_value=4.0, value=(-3.0, 2.0), step=0.5)
+        n_points = st.slider("Number of C values", min_value=3, max_value=30, value=12)
+    with col2:
+        penalties = st.multiselect("Penalties", ["l2", "l1"], default=["l2", "l1"])
+        if split["folds"]:
+            n_splits = len(split["folds"])
+            st.caption(f"Using the {n_splits} folds from Step 4.")
+        else:
+            n_splits = st.slider("Cross-validation folds", min_value=2, max_value=10, value=5)
+    metric = st.selectbox("Selection metric", list(PATH_METRICS), index=0)
+
+    if not penalties:
+        st.info("Select at least one penalty.")
+        return
+
+    if st.button("Run Search"):
+        start = time.perf_counter()
+        Cs = np.logspace(log_c_range[0], log_c_range[1], n_points)
+        search_rows = X.shape[0] if split["folds"] else len(split["train"])
+        with st.spinner(f"Fitting {len(penalties) * n_splits} paths of {n_points} C values..."):
+            with track("regularization_path", rows=search_rows):
+                if split["folds"]:
+                    search = regularization_path(X, y, Cs, penalties=penalties, metric=metric, folds=split["folds"])
+                else:
+                    search = regularization_path(
+                        take(X, split["train"]), take(y, split["train"]), Cs,
+                        penalties=penalties,
+                        n_splits=n_splits,
+                        metric=metric
+                    )
+
+        st.subheader("📉 Regularization Path")
+        results = search["results"]
         fig, ax = plt.subplots()
-        im = ax.imshow(cm, interpolation="nearest")
-        ax.set_title("Confusion Matrix Heatmap")
-        ax.set_xlabel("Predicted label")
-        ax.set_ylabel("True label")
-        ax.set_xticks([0, 1])
-        ax.set_yticks([0, 1])
-        for i in range(cm.shape[0]):
-            for j in range(cm.shape[1]):
-                ax.text(j, i, cm[i, j], ha="center", va="center")
+        for penalty, group in results.groupby("penalty", sort=False):
+            ax.semilogx(group["C"], group["mean_score"], marker="o", label=penalty)
+            ax.fill_between(
+                group["C"],
+                group["mean_score"] - group["std_score"],
+                group["mean_score"] + group["std_score"],
+                alpha=0.2
+            )
+        ax.axvline(search["best_C"], linestyle="--", color="grey")
+        ax.set_xlabel("C (inverse regularization strength)")
+        ax.set_ylabel(f"CV {metric}")
+        ax.legend(title="Penalty")
         st.pyplot(fig)
+        plt.close(fig)
+
+        with st.expander("Cross-validation results"):
+            st.dataframe(results)
+
+        st.write(
+            f"**Best:** penalty = `{search['best_penalty']}`, C = {search['best_C']:.4g} "
+            f"(CV {metric} = {search['best_score']:.4f})"
+        )
+        with track("evaluate", rows=len(split["test"])):
+            if split["folds"]:
+                best_fit = partial(fit_scaled_logistic, C=search["best_C"], penalty=search["best_penalty"])
+                metrics = cross_validated_metrics(best_fit, X, y, split["folds"])
+            else:
+                metrics = evaluate_model(search["model"], take(X, split["test"]), take(y, split["test"]))
+        params = {"C": search["best_C"], "penalty": search["best_penalty"],
+                  "search_metric": metric, "search_score": search["best_score"], "n_candidates": len(results)}
+        evaluate_and_save(search["model"], metrics, feature_columns, take(y, split["test"]),
+                          params=params, training_seconds=time.perf_counter() - start)
+
+
+def incremental_training():
+    """
+    Train on a CSV/Parquet file that does not fit in memory: the file is
+    streamed in chunks, encoded with the Step 3 lineage and fed to an SGD
+    logistic regression; a random hold-out of every chunk is evaluated last.
+    """
+    from utils.data_loader import count_rows, file_format, partitions_hash, read_columns
+    from utils.incremental import train_incremental
+    from utils.lineage import describe_step
+    from utils.scoring import DEFAULT_CHUNKSIZE
+
+    st.markdown(
+        "Stream a file from disk chunk by chunk instead of using the in-memory split from Step 4. "
+        "The encoding recorded in **Step 3** is fitted on the first chunk and applied to every chunk; "
+        "memory use is bounded by the chunk size."
+    )
+
+    server_path = st.text_input(
+        "File path on the server (CSV or Parquet)",
+        help="The file is read in chunks from disk and never loaded whole."
+    )
+    if not server_path:
+        st.info("Enter a file path to start out-of-core training.")
+        return
+    if not os.path.exists(server_path):
+        st.error(f"File not found: {server_path}")
+        return
+
+    fmt = file_format(server_path)
+    columns = read_columns(server_path, fmt)
+    default_target = st.session_state.get("target_column") or "Exited"
+    target_col = st.selectbox(
+        "Target column",
+        columns,
+        index=columns.index(default_target) if default_target in columns else len(columns) - 1
+    )
+
+    col1, col2 = st.columns(2)
+    with col1:
+        chunksize = st.number_input("Rows per chunk", min_value=1_000, max_value=5_000_000,
+                                    value=DEFAULT_CHUNKSIZE, step=10_000)
+        test_size = st.slider("Hold-out fraction", min_value=0.05, max_value=0.5, value=0.2, step=0.05)
+    with col2:
+        epochs = st.slider("Epochs (passes over the file)", min_value=1, max_value=10, value=1)
+        alpha = st.select_slider("Regularization (alpha)", options=[1e-6, 1e-5, 1e-4, 1e-3, 1e-2], value=1e-4)
+
+    steps = get_lineage()
+    with st.expander("Encoding steps applied to each chunk"):
+        st.write([describe_step(step) for step in steps] or "None (numeric columns only)")
+
+    if not st.button("Train Out-of-Core"):
+        return
+
+    total_rows = count_rows(server_path, fmt)
+    bar = st.progress(0.0, text="Starting…")
+
+    def on_progress(phase, rows_done, elapsed):
+        rate = rows_done / elapsed if elapsed > 0 else 0.0
+        bar.progress(min(rows_done / max(total_rows, 1), 1.0),
+                     text=f"{phase}: {rows_done:,} / {total_rows:,} rows · {rate:,.0f} rows/s")
+
+    try:
+        with track("train_incremental", rows=total_rows * epochs):
+            result = train_incremental(
+                server_path,
+                fmt,
+                steps,
+                target_col,
+                chunksize=int(chunksize),
+                test_size=test_size,
+                epochs=epochs,
+                alpha=alpha,
+                progress=on_progress
+            )
+    except ValueError as e:
+        # e.g. a missing or unseen target value in a later chunk
+        st.error(f"Out-of-core training stopped: {e}")
+        return
+    finally:
+        bar.empty()
+
+    if result["dropped_columns"]:
+        st.warning(f"Dropped non-numeric columns (not encoded in Step 3): {result['dropped_columns']}")
+    st.write(
+        f"**Training:** {result['train_rows']:,} rows × {epochs} epoch(s) in {result['train_seconds']:.2f}s "
+        f"(**{result['train_rows_per_sec']:,.0f} rows/s**, {result['chunks']} chunks)  \n"
+        f"**Hold-out evaluation:** {result['test_rows']:,} rows in {result['eval_seconds']:.2f}s "
+        f"(**{result['eval_rows_per_sec']:,.0f} rows/s**) · log loss {result['metrics']['log_loss']:.4f}"
+    )
+
+    show_metrics(result["metrics"])
+    record_evaluation(result["y_true"], result["y_proba"])
+    metadata = {
+        "params": {"alpha": alpha, "epochs": epochs, "chunksize": int(chunksize), "solver": "sgd"},
+        # File path, size and mtime: the file is too large to hash its bytes
+        "data_hash": partitions_hash([server_path]),
+        "source": server_path,
+        "training_seconds": result["train_seconds"],
+        "train_rows": result["train_rows"],
+        "test_rows": result["test_rows"],
+    }
+    save_model(result["model"], result["feature_columns"], result["preprocessor"],
+               target_col, result["input_schema"], result["metrics"], metadata)
+
+
+def training_metadata(params) -> dict:
+    """
+    Registry metadata of a fit on the Step 4 split.
+    """
+    split = st.session_state.get("split")
+    return {
+        "params": params,
+        "data_hash": st.session_state.get("data_hash"),
+        "split_method": split["method"],
+        "train_rows": len(split["train"]),
+        "test_rows": len(split["test"]),
+    }
+
+
+def background_result():
+    """
+    Metrics of the last background training job, once it has been
+    delivered into the session (while its model is the session's model).
+    """
+    result = st.session_state.get("training_result")
+    artifact = st.session_state.get("artifact")
+    if not result or artifact is None or artifact.get("version") != result["version"]:
+        return
+    st.success(
+        f"✅ {result['label']} trained in the background in {result['training_seconds']:.1f} s and registered "
+        f"as version `{result['version']}` (now the current model)."
+    )
+    if result.get("fit"):
+        show_fit(result["fit"])
+    show_metrics(result["metrics"])
+
+
+def evaluate_and_save(model, metrics, feature_columns, y_true, params, training_seconds):
+    from utils.drift import build_reference
+
+    show_metrics(metrics)
+    record_evaluation(y_true, metrics["y_proba"])
+    metadata = {**training_metadata(params), "training_seconds": training_seconds}
+    # Training-data histograms for drift monitoring in Step 6 batch scoring
+    split = st.session_state.get("split")
+    with track("drift_reference"):
+        reference = build_reference(st.session_state.get("X"), model, feature_columns,
+                                    rows=None if split["folds"] else split["train"])
+    save_model(model, feature_columns,
+               st.session_state.get("preprocessor"),
+               st.session_state.get("target_column"),
+               st.session_state.get("input_schema"),
+               metrics, metadata, reference=reference)
+
+
+def record_evaluation(y_true, y_proba):
+    """
+    Rank the test probabilities once (utils.evaluation) and keep the compact
+    summary in the session, so moving the threshold slider never re-sorts.
+    """
+    from utils.evaluation import compact_evaluation, evaluate_scores
+
+    start = time.perf_counter()
+    with track("threshold_analysis", rows=len(y_proba)):
+        evaluation = compact_evaluation(evaluate_scores(y_true, y_proba))
+    evaluation["seconds"] = time.perf_counter() - start
+    st.session_state["evaluation"] = evaluation
+
+
+def threshold_analysis():
+    """
+    ROC / precision-recall curves, lift by decile and metrics vs threshold
+    for the saved model. The chosen operating threshold is stored in the
+    artifact and used by single and batch scoring in Step 6.
+    """
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    from utils.artifacts import artifact_threshold
+    from utils.evaluation import TABLE_THRESHOLDS
+    from utils.registry import read_metadata, register_model
+
+    evaluation = st.session_state.get("evaluation")
+    artifact = st.session_state.get("artifact")
+    if evaluation is None or artifact is None or not evaluation["rows"]:
+        return
+
+    st.subheader("🎯 Threshold Analysis")
+    st.caption(
+        f"{evaluation['rows']:,} test rows ({evaluation['positives']:,} churners) "
+        f"ranked in one sorted pass in {evaluation['seconds']:.2f}s."
+    )
+    lift = evaluation["lift"]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("ROC AUC", f"{evaluation['roc_auc']:.4f}")
+    col2.metric("Average precision", f"{evaluation['average_precision']:.4f}")
+    col3.metric("Top-decile lift", f"{lift['lift'].iloc[0]:.2f}×")
+
+    fig, (ax_roc, ax_pr) = plt.subplots(1, 2, figsize=(10, 4))
+    ax_roc.plot(evaluation["fpr"], evaluation["tpr"])
+    ax_roc.plot([0, 1], [0, 1], linestyle="--", color="grey")
+    ax_roc.set_title("ROC curve")
+    ax_roc.set_xlabel("False positive rate")
+    ax_roc.set_ylabel("True positive rate")
+    ax_pr.plot(evaluation["recall"], evaluation["precision"])
+    ax_pr.axhline(evaluation["positives"] / evaluation["rows"], linestyle="--", color="grey")
+    ax_pr.set_title("Precision-recall curve")
+    ax_pr.set_xlabel("Recall")
+    ax_pr.set_ylabel("Precision")
+    st.pyplot(fig)
+    plt.close(fig)
+
+    st.markdown("**Lift / gain by decile** (customers ranked by churn probability, highest first)")
+    st.dataframe(lift.style.format({
+        "churn_rate": "{:.2%}", "lift": "{:.2f}", "cumulative_gain": "{:.2%}", "cumulative_lift": "{:.2f}"
+    }))
+
+    table = evaluation["thresholds"]
+    with st.expander("Metrics vs threshold"):
+        st.dataframe(table[np.isin(table["threshold"].round(6), TABLE_THRESHOLDS)].style.format({
+            "threshold": "{:.2f}", "flagged_pct": "{:.1f}", "precision": "{:.4f}",
+            "recall": "{:.4f}", "f1": "{:.4f}", "accuracy": "{:.4f}"
+        }))
+
+    options = table["threshold"].tolist()
+    saved = artifact_threshold(artifact)
+    threshold = st.select_slider(
+        "Operating threshold (predict churn when probability ≥ threshold)",
+        options=options,
+        value=min(options, key=lambda t: abs(t - saved)),
+        format_func=lambda t: f"{t:.4g}"
+    )
+    st.caption(f"Best F1 at threshold {evaluation['best_f1_threshold']:.4g} · currently saved: {saved:.4g}")
+
+    row = table.iloc[options.index(threshold)]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Customers flagged", f"{int(row['flagged']):,}", f"{row['flagged_pct']:.1f}%", delta_color="off")
+    col2.metric("Precision", f"{row['precision']:.4f}")
+    col3.metric("Recall", f"{row['recall']:.4f}")
+    col4.metric("F1", f"{row['f1']:.4f}")
+
+    if st.button("Save Threshold with Model"):
+        # Registered versions are immutable: the new threshold becomes a new version of the same model
+        metadata = read_metadata(artifact["version"]) if artifact.get("version") else {}
+        metadata["parent_version"] = artifact.get("version")
+        artifact = {**artifact, "threshold": float(threshold)}
+        artifact["version"] = register_model(artifact, metadata)
+        st.session_state["artifact"] = artifact
+        st.success(f"✅ Operating threshold {threshold:.4g} saved as model version `{artifact['version']}` "
+                   "(now current); Step 6 scoring uses it.")
+
+
+def show_metrics(metrics):
+    import matplotlib.pyplot as plt
+    import numpy as np
+    import pandas as pd
+
+    acc = metrics["accuracy"]
+    prec = metrics["precision"]
+    rec = metrics["recall"]
+    f1 = metrics["f1"]
+    cm = np.asarray(metrics["confusion_matrix"])
+
+    st.subheader("📈 Evaluation Metrics (threshold 0.5)")
+    st.write(f"**Accuracy:** {acc:.4f}")
+    st.write(f"**Precision:** {prec:.4f}")
+    st.write(f"**Recall:** {rec:.4f}")
+    st.write(f"**F1 Score:** {f1:.4f}")
+    if "fold_accuracy" in metrics:
+        st.write("**Accuracy per fold:** " + ", ".join(f"{a:.4f}" for a in metrics["fold_accuracy"]))
+
+    st.subheader("📊 Confusion Matrix")
+    cm_df = pd.DataFrame(
+        cm,
+        index=["Actual 0 (No Churn)", "Actual 1 (Churn)"],
+        columns=["Predicted 0", "Predicted 1"]
+    )
+    st.dataframe(cm_df)
+
+    # Confusion matrix heatmap
+    fig, ax = plt.subplots()
+    im = ax.imshow(cm, interpolation="nearest")
+    ax.set_title("Confusion Matrix Heatmap")
+    ax.set_xlabel("Predicted label")
+    ax.set_ylabel("True label")
+    ax.set_xticks([0, 1])
+    ax.set_yticks([0, 1])
+    for i in range(cm.shape[0]):
+        for j in range(cm.shape[1]):
+            ax.text(j, i, cm[i, j], ha="center", va="center")
+    st.pyplot(fig)
+    plt.close(fig)
+
+
+def save_model(model, feature_columns, preprocessor, target_column, input_schema, metrics, metadata,
+               reference=None):
+    from utils.artifacts import build_artifact
+    from utils.lineage import describe_step
+    from utils.registry import register_model, registry_metrics, version_dir
+
+    # Save model and feature columns in session
+    st.session_state["model"] = model
+    st.session_state["feature_columns"] = feature_columns
+    st.session_state["preprocessor"] = preprocessor
+    st.session_state["input_schema"] = input_schema
+
+    # Bundle preprocessing + model into one artifact that scores raw customer records
+    artifact = build_artifact(
+        preprocessor=preprocessor,
+        model=model,
+        feature_columns=feature_columns,
+        target_column=target_column,
+        input_schema=input_schema,
+        reference=reference
+    )
+
+    # Register as a new immutable version (with its metrics) and make it current
+    metadata = {
+        **metadata,
+        "metrics": registry_metrics(metrics, st.session_state.get("evaluation")),
+        "lineage": [describe_step(step) for step in get_lineage()],
+    }
+    with track("register_model"):
+        artifact["version"] = register_model(artifact, metadata)
+    st.session_state["artifact"] = artifact
+
+    st.success(
+        f"✅ Model trained and saved (session + registry version `{artifact['version']}` "
+        f"in `{version_dir(artifact['version'])}`, now the current model)."
+    )
+    st.markdown("➡️ Next: Go to **Step 6 – Predict New Customer**.")
+
+
+def use_version(version: str):
+    """
+    Make a promoted or rolled-back version this session's model: Step 6
+    scores with the session model before the registry's current one. The
+    threshold analysis belongs to the model it was computed for and is
+    dropped when the model changes.
+    """
+    from utils.registry import load_model_version
+
+    previous = st.session_state.get("artifact")
+    if previous is None or previous.get("version") != version:
+        st.session_state.pop("evaluation", None)
+    artifact = load_model_version(version)
+    st.session_state["artifact"] = artifact
+    st.session_state["model"] = artifact["pipeline"].named_steps["model"]
+    st.session_state["feature_columns"] = artifact["feature_columns"]
+
+
+def model_registry():
+    """
+    Registered model versions with their metrics; promote any version to
+    current or roll back to the previous one (used by Step 6, batch jobs
+    and the scoring server).
+    """
+    import pandas as pd
+
+    from utils.registry import MODEL_CACHE, current_version, list_versions, promote_version, rollback
+
+    versions = list_versions()
+    if not versions:
+        return
 
-        # Save model and feature columns in session
-        st.session_state["model"] = model
-        st.session_state["feature_columns"] = list(X_train.columns)
+    with st.expander(f"🗂️ Model registry ({len(versions)} versions)"):
+        current = current_version()
+        st.dataframe(pd.DataFrame([{
+            "version": m["version"],
+            "current": "✅" if m["version"] == current else "",
+            "created_at": m["created_at"],
+            "accuracy": (m.get("metrics") or {}).get("accuracy"),
+            "roc_auc": (m.get("metrics") or {}).get("roc_auc"),
+            "threshold": m.get("threshold"),
+            "params": ", ".join(f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}"
+                                for k, v in (m.get("params") or {}).items()),
+            "train_rows": m.get("train_rows"),
+            "training_seconds": m.get("training_seconds"),
+        } for m in versions]))
 
-        # Save to disk as well (for persistence)
-        os.makedirs("models", exist_ok=True)
-        joblib.dump(model, os.path.join("models", "logistic_model.pkl"))
-        joblib.dump(list(X_train.columns), os.path.join("models", "feature_columns.pkl"))
+        col1, col2 = st.columns(2)
+        with col1:
+            version = st.selectbox("Version", [m["version"] for m in versions])
+            if st.button("Promote to Current"):
+                promote_version(version)
+                use_version(version)
+                st.success(f"✅ `{version}` is now the current model.")
+        with col2:
+            if st.button("Roll Back"):
+                try:
+                    previous = rollback()
+                except ValueError as e:
+                    st.warning(str(e))
+                else:
+                    use_version(previous)
+                    st.success(f"✅ Rolled back to `{previous}`.")
 
-        st.success("✅ Model trained and saved (session + `models/` folder).")
-        st.markdown("➡️ Next: Go to **Step 6 – Predict New Customer**.")
+        stats = MODEL_CACHE.stats()
+        st.caption(f"Process model cache: {stats['cached']}/{stats['maxsize']} versions loaded · "
+                   f"{stats['hits']} hits · {stats['misses']} loads ({stats['load_seconds']:.2f}s)")
 
 if __name__ == "__main__":
     main()
+    jobs_sidebar()
+    perf_sidebar()
@@ -1,66 +1,365 @@
 # pages/6_Predict_New_Customer.py  (or 6_🔮_Predict_New_Customer.py)
+import os
+import time
 import streamlit as st
-import pandas as pd
-import joblib
 
-from utils.state_manager import init_session_state
+# Model, scoring and plotting modules are imported by the functions that use
+# them: unpickling the model loads scikit-learn anyway, and the page renders
+# its "no model" message without it
+from utils.state_manager import get_raw_df, init_session_state, jobs_sidebar, perf_sidebar, track
 
-def main():
-    init_session_state()
-    st.title("🔮 Step 6 – Predict New Customer Churn")
+@st.cache_resource(show_spinner="Loading model…", max_entries=4)
+def _load_model_file(path: str, mtime: float, legacy: bool = False):
+    """
+    Unpickle a model file once per server process (again when it changes on
+    disk); shared by reference like the registry's MODEL_CACHE.
+    """
+    if legacy:
+        import joblib
+
+        return joblib.load(path)
+    from utils.artifacts import load_artifact
+
+    return load_artifact(path)
 
+def _model_file(path: str, legacy: bool = False):
+    return _load_model_file(path, os.path.getmtime(path), legacy)
+
+def load_model():
+    """
+    Returns (artifact, model, feature_columns): the model trained in this
+    session, else the current registry version, else the files of older
+    app versions. artifact is None for models saved before preprocessing
+    was bundled with the model.
+    """
+    from utils.artifacts import ARTIFACT_PATH, LEGACY_FEATURES_PATH, LEGACY_MODEL_PATH
+    from utils.registry import load_model_version
+
+    artifact = st.session_state.get("artifact")
     model = st.session_state.get("model")
     feature_columns = st.session_state.get("feature_columns")
 
-    # If model not in session, try loading from disk
-    if model is None or feature_columns is None:
-        try:
-            model = joblib.load("models/logistic_model.pkl")
-            feature_columns = joblib.load("models/feature_columns.pkl")
-            st.session_state["model"] = model
-            st.session_state["feature_columns"] = feature_columns
-            st.info("Loaded model and feature columns from `models/` folder.")
-        except Exception:
-            st.warning(
-                "No trained model found. Please train the model in **Step 5** "
-                "before doing predictions."
-            )
+    if artifact is not None:
+        return artifact, artifact["pipeline"].named_steps["model"], artifact["feature_columns"]
+    if model is not None and feature_columns is not None:
+        return None, model, feature_columns
+
+    # Shared process-wide cache: not copied into the session, so promote /
+    # rollback in the registry reaches sessions that did not train a model
+    try:
+        artifact = load_model_version()
+        st.info(f"Using the current registry model `{artifact['version']}`.")
+        return artifact, artifact["pipeline"].named_steps["model"], artifact["feature_columns"]
+    except FileNotFoundError:
+        pass
+
+    try:
+        artifact = _model_file(ARTIFACT_PATH)
+        st.session_state["artifact"] = artifact
+        st.session_state["model"] = artifact["pipeline"].named_steps["model"]
+        st.session_state["feature_columns"] = artifact["feature_columns"]
+        st.info(f"Loaded scoring pipeline from `{ARTIFACT_PATH}`.")
+        return artifact, st.session_state["model"], artifact["feature_columns"]
+    except Exception:
+        pass
+
+    model = _model_file(LEGACY_MODEL_PATH, legacy=True)
+    feature_columns = _model_file(LEGACY_FEATURES_PATH, legacy=True)
+    st.session_state["model"] = model
+    st.session_state["feature_columns"] = feature_columns
+    st.info("Loaded model and feature columns from `models/` folder.")
+    return None, model, feature_columns
+
+def model_explainer(artifact, model, feature_columns):
+    """
+    Shared explainer of the model (global importance computed once per version).
+    """
+    from utils.explain import explainer_for
+
+    preprocessor = artifact["pipeline"].named_steps["preprocess"] if artifact is not None else None
+    return explainer_for(
+        model, feature_columns, getattr(preprocessor, "scale_", None), getattr(preprocessor, "mean_", None)
+    )
+
+def raw_input_form(input_schema, record=None, key_prefix="raw"):
+    """
+    One widget per raw input column (as loaded in Step 1).
+    Values from `record` (e.g. a held-out customer) replace the defaults.
+    """
+    import pandas as pd
+
+    inputs = {}
+    for field in input_schema:
+        col = field["column"]
+        default = field["default"]
+        if record is not None and col in record and pd.notna(record[col]):
+            default = str(record[col]) if field["kind"] == "categorical" else float(record[col])
+        key = f"{key_prefix}_{col}"
+
+        if field["kind"] == "categorical":
+            if field["options"]:
+                index = field["options"].index(default) if default in field["options"] else 0
+                inputs[col] = st.selectbox(col, options=field["options"], index=index, key=key)
+            else:
+                inputs[col] = st.text_input(col, value=default, key=key)
+        elif field["integer"]:
+            inputs[col] = int(st.number_input(col, value=int(round(default)), step=1, key=key))
+        else:
+            inputs[col] = st.number_input(col, value=float(default), step=1.0, key=key)
+    return inputs
+
+
+def held_out_record(input_schema):
+    """
+    Optionally pick a customer from the Step 4 test rows to pre-fill the form.
+    Returns (record, key_prefix); record is None when not used.
+    """
+    raw_df = get_raw_df()
+    split = st.session_state.get("split")
+    if raw_df is None or split is None or not len(split["test"]):
+        return None, "raw"
+    if any(field["column"] not in raw_df.columns for field in input_schema):
+        return None, "raw"
+
+    if not st.checkbox("Pre-fill with a held-out (test) customer from the loaded data"):
+        return None, "raw"
+
+    position = int(st.number_input("Test customer #", min_value=0, max_value=len(split["test"]) - 1, value=0, step=1))
+    row = int(split["test"][position])
+    record = raw_df.iloc[row]
+
+    target = st.session_state.get("target_column")
+    actual = f" · actual `{target}` = **{record[target]}**" if target in raw_df.columns else ""
+    st.caption(f"Row {row:,} of the loaded data{actual}")
+    # New widget keys per row so the form picks up the new values
+    return record, f"test{row}"
+
+def batch_scoring(artifact, model, feature_columns):
+    """
+    Score a whole CSV/Parquet file chunk by chunk and stream the results to disk.
+    """
+    from utils.artifacts import artifact_threshold
+    from utils.data_loader import count_rows, file_format, iter_chunks, read_columns
+    from utils.drift import DriftMonitor
+    from utils.explain import DEFAULT_REASONS
+    from utils.scoring import DEFAULT_CHUNKSIZE, score_chunks, scoring_inputs
+
+    estimator, input_columns = scoring_inputs(artifact, model, feature_columns)
+    threshold = artifact_threshold(artifact)
+
+    st.markdown(
+        "Score a file of customers in fixed-size chunks. "
+        + ("The file must contain the **raw columns** of the loaded dataset."
+           if artifact is not None else
+           "The file must contain the **processed feature columns** used during training.")
+        + f" `churn_prediction` is 1 when the churn probability is at least **{threshold:.4g}**."
+    )
+
+    uploaded_file = st.file_uploader("Upload a CSV or Parquet file", type=["csv", "parquet"], key="batch_file")
+    server_path = st.text_input(
+        "…or a file path on the server (recommended for very large files)",
+        help="Uploads are held in memory by Streamlit; a server-side path is streamed from disk."
+    )
+
+    if uploaded_file is not None:
+        source, fmt, name = uploaded_file, file_format(uploaded_file.name), uploaded_file.name
+    elif server_path:
+        if not os.path.exists(server_path):
+            st.error(f"File not found: {server_path}")
             return
+        source, fmt, name = server_path, file_format(server_path), os.path.basename(server_path)
+    else:
+        st.info("Upload a file or enter a path to start batch scoring.")
+        return
+
+    columns = read_columns(source, fmt)
+    missing = [c for c in input_columns if c not in columns]
+    if missing:
+        st.error(f"The file is missing required columns: {missing}")
+        return
+
+    id_candidates = [c for c in columns if c not in input_columns] + input_columns
+    keep_columns = st.multiselect(
+        "Columns to copy into the output (e.g. customer id):",
+        options=id_candidates,
+        default=[c for c in ("CustomerId",) if c in columns]
+    )
+    chunksize = st.number_input("Rows per chunk", min_value=1_000, max_value=5_000_000,
+                                value=DEFAULT_CHUNKSIZE, step=10_000)
+    out_format = st.radio("Output format", ["csv", "parquet"], horizontal=True,
+                          index=1 if fmt == "parquet" else 0)
+    reasons = st.number_input(
+        "Top churn reasons per customer", min_value=0, max_value=20, value=DEFAULT_REASONS, step=1,
+        help="Adds reason_1 … reason_k: the features raising each customer's churn score the most "
+             "(coefficient × (value − training mean), in log-odds). 0 writes scores only."
+    )
+    reference = artifact.get("reference") if artifact is not None else None
+    monitor_drift = st.checkbox(
+        "Monitor drift against the training data", value=reference is not None, disabled=reference is None,
+        help="Compares the feature and score distributions of this file with the histograms stored at "
+             "training time (PSI / KS), without keeping any scored rows."
+             if reference is not None else
+             "This model has no training reference (trained before drift monitoring, or out of core)."
+    )
 
-    st.markdown("""
-    Enter values for **one new customer** below.
+    if not st.button("Score File"):
+        return
 
-    ⚠️ These inputs correspond to the **processed feature columns** used during training  
-    (including dummy variables created in Step 3).
-    """)
+    total_rows = count_rows(source, fmt)
+    output_path = os.path.join(
+        "outputs", f"scores_{os.path.splitext(name)[0]}_{time.strftime('%Y%m%d_%H%M%S')}.{out_format}"
+    )
+
+    bar = st.progress(0.0, text="Starting…")
+
+    def on_progress(rows_done, elapsed):
+        rate = rows_done / elapsed if elapsed > 0 else 0.0
+        bar.progress(min(rows_done / max(total_rows, 1), 1.0),
+                     text=f"{rows_done:,} / {total_rows:,} rows · {rate:,.0f} rows/s")
+
+    read_columns_needed = list(dict.fromkeys(input_columns + keep_columns))
+    monitor = DriftMonitor(reference) if monitor_drift else None
+    with track("score_batch", rows=total_rows):
+        summary = score_chunks(
+            estimator,
+            input_columns,
+            iter_chunks(source, fmt, chunksize=int(chunksize), columns=read_columns_needed),
+            output_path,
+            threshold=threshold,
+            keep_columns=keep_columns,
+            progress=on_progress,
+            reasons=int(reasons),
+            monitor=monitor
+        )
+
+    st.success(
+        f"✅ Scored **{summary['rows']:,}** customers in {summary['seconds']:.2f}s "
+        f"(**{summary['rows_per_sec']:,.0f} rows/s**). Results written to `{output_path}`."
+    )
+
+    if os.path.getsize(output_path) <= 100 * 1024 ** 2:
+        with open(output_path, "rb") as f:
+            st.download_button("Download scores", f, file_name=os.path.basename(output_path))
+
+    if monitor is not None:
+        drift_report(monitor.report())
+
+def drift_report(report):
+    """
+    PSI / KS of the churn score and of the monitored features against the training data.
+    """
+    import pandas as pd
+
+    from utils.drift import PSI_MODERATE, PSI_SIGNIFICANT
+
+    st.subheader("📡 Drift vs Training Data")
+    if not report["rows"]:
+        st.info("The file has no rows to compare with the training data.")
+        return
+    score = report["score"]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Score PSI", f"{score['psi']:.3f}")
+    col2.metric("Score KS", f"{score['ks']:.3f}")
+    col3.metric("Mean churn score", f"{score['mean']:.2%}", f"{score['mean_shift'] * 100:+.2f} pts",
+                delta_color="inverse")
+    col4.metric("Drifted features", f"{len(report['drifted_features'])} / {len(report['features'])}")
+
+    if report["retrain"]:
+        drifted = (["churn score"] if score["status"] == "significant" else []) + report["drifted_features"]
+        st.warning(f"⚠️ Significant drift (PSI ≥ {PSI_SIGNIFICANT}) in: {', '.join(drifted)}. "
+                   "Consider retraining the model in **Step 5**.")
+    else:
+        st.success(f"✅ No significant drift (PSI < {PSI_SIGNIFICANT}) on the score or the monitored features.")
+
+    st.caption(
+        f"{report['rows']:,} scored rows vs {report['reference_rows']:,} training rows · "
+        f"PSI < {PSI_MODERATE} stable, < {PSI_SIGNIFICANT} moderate, otherwise significant."
+    )
+    st.dataframe(
+        pd.DataFrame(report["features"]).style.format({"psi": "{:.4f}", "ks": "{:.4f}"}),
+        hide_index=True
+    )
+
+def main():
+    init_session_state()
+    st.title("🔮 Step 6 – Predict New Customer Churn")
+
+    # If model not in session, try loading from disk
+    try:
+        artifact, model, feature_columns = load_model()
+    except Exception:
+        st.warning(
+            "No trained model found. Please train the model in **Step 5** "
+            "before doing predictions."
+        )
+        return
+
+    import numpy as np
+
+    from utils.artifacts import artifact_threshold
+
+    mode = st.radio("Prediction mode", ["Single customer", "Batch file"], horizontal=True)
+    if mode == "Batch file":
+        batch_scoring(artifact, model, feature_columns)
+        return
+
+    use_raw_inputs = artifact is not None and artifact.get("input_schema")
+
+    if use_raw_inputs:
+        st.markdown("""
+        Enter the **raw values** for one new customer below (same columns as the loaded dataset).
+
+        The saved preprocessing pipeline applies the Step 3 encoding automatically.
+        """)
+    else:
+        st.markdown("""
+        Enter values for **one new customer** below.
+
+        ⚠️ These inputs correspond to the **processed feature columns** used during training  
+        (including dummy variables created in Step 3).
+        """)
 
     inputs = {}
+    record, key_prefix = held_out_record(artifact["input_schema"]) if use_raw_inputs else (None, "raw")
 
     with st.form("prediction_form"):
-        for col in feature_columns:
-            value = st.number_input(
-                f"{col}",
-                value=0.0,
-                step=1.0
-            )
-            inputs[col] = value
+        if use_raw_inputs:
+            inputs = raw_input_form(artifact["input_schema"], record, key_prefix)
+        else:
+            for col in feature_columns:
+                value = st.number_input(
+                    f"{col}",
+                    value=0.0,
+                    step=1.0
+                )
+                inputs[col] = value
 
         submitted = st.form_submit_button("Predict Churn Probability")
 
     if submitted:
-        # Create a single-row DataFrame with the correct columns
-        input_df = pd.DataFrame([inputs], columns=feature_columns)
+        with track("predict_single", rows=1, memory=False):
+            if use_raw_inputs:
+                # Raw record -> model features through the encoders' lookup tables (no DataFrame)
+                values = artifact["pipeline"].named_steps["preprocess"].transform_records([inputs])[0]
+            else:
+                # Values are already in the processed feature order
+                values = np.asarray([inputs[col] for col in feature_columns], dtype=float)
 
-        # ---------- 1️⃣ Probability Prediction ----------
-        proba = model.predict_proba(input_df)[0]
-        prob_not_churn = proba[0]
-        prob_churn = proba[1]
+            # ---------- 1️⃣ Probability Prediction ----------
+            # Pure-NumPy scorer: probability and per-feature contributions in one pass
+            explainer = model_explainer(artifact, model, feature_columns)
+            churn_proba, row_contributions = explainer.score(values[np.newaxis, :])
+        prob_churn = float(churn_proba[0])
+        prob_not_churn = 1.0 - prob_churn
 
         st.subheader("📊 Prediction Result")
         st.write(f"Probability of **NOT churn (0)**: `{prob_not_churn*100:.2f}%`")
         st.write(f"Probability of **churn (1)**: `{prob_churn*100:.2f}%`")
 
-        if prob_churn >= 0.5:
+        threshold = artifact_threshold(artifact)
+        st.caption(f"Operating threshold: {threshold:.4g} (set in Step 5)")
+
+        if prob_churn >= threshold:
             st.error(
                 f"⚠️ The model predicts: **Customer WILL CHURN** "
                 f"with probability `{prob_churn*100:.2f}%`."
@@ -74,27 +373,17 @@ def main():
         # ---------- 2️⃣ Explanation: Why this prediction? ----------
         st.subheader("🔍 Why this prediction? (Top contributing features)")
 
-        # For binary logistic regression: model.coef_[0] gives coefficients
-        coef = model.coef_[0]   # shape: (n_features,)
-        values = input_df.iloc[0].values
-
-        # Contribution ≈ coefficient × value (in log-odds space)
-        contributions = values * coef
-
-        contrib_df = pd.DataFrame({
-            "feature": feature_columns,
-            "input_value": values,
-            "coefficient": coef,
-            "contribution": contributions
-        })
-
-        # Sort by contribution (descending: pushes towards churn)
-        contrib_sorted = contrib_df.sort_values(by="contribution", ascending=False)
-
+        # Contribution = coefficient × (value − training mean), in log-odds space; the
+        # top features are picked with argpartition instead of sorting every feature
         top_n = 5  # how many features to show
+        feature_index = {col: i for i, col in enumerate(explainer.feature_columns)}
+
+        def with_inputs(table):
+            table.insert(1, "input_value", values[[feature_index[f] for f in table["feature"]]])
+            return table
 
         st.markdown("**Top features increasing churn risk (pushing towards 1):**")
-        top_positive = contrib_sorted.head(top_n)
+        top_positive = with_inputs(explainer.drivers(row_contributions, top_n, increasing=True)[0])
         if not top_positive.empty:
             st.dataframe(
                 top_positive[["feature", "input_value", "coefficient", "contribution"]]
@@ -104,7 +393,7 @@ def main():
             st.write("No strong positive contributors found.")
 
         st.markdown("**Top features decreasing churn risk (pushing towards 0):**")
-        top_negative = contrib_sorted.sort_values(by="contribution", ascending=True).head(top_n)
+        top_negative = with_inputs(explainer.drivers(row_contributions, top_n, increasing=False)[0])
         if not top_negative.empty:
             st.dataframe(
                 top_negative[["feature", "input_value", "coefficient", "contribution"]]
@@ -116,10 +405,26 @@ def main():
         st.info(
             "💡 Interpretation:\n"
             "- **Coefficient**: how strongly this feature influences churn in general (positive → more churn, negative → less churn).\n"
-            "- **Contribution**: coefficient × input_value for this customer (larger magnitude = more impact on this specific prediction).\n"
+            "- **Contribution**: coefficient × (input_value − training mean) for this customer: how far this feature moves "
+            "the prediction away from the average training customer (larger magnitude = more impact).\n"
             "\nThis is a simple, log-odds based explanation ideal for demos. "
             "For production, you might consider SHAP or other explainability tools."
         )
 
+        with st.expander("🌍 Global feature importance (this model)"):
+            st.caption(
+                "Standardized importance = |coefficient| × feature standard deviation in the training data: "
+                "the log-odds change for a one-standard-deviation move. Computed once per model version."
+            )
+            st.dataframe(
+                explainer.importance.style.format({
+                    "coefficient": "{:.4f}", "odds_ratio": "{:.4f}", "std": "{:.4g}",
+                    "standardized": "{:.4f}", "importance": "{:.4f}"
+                }),
+                hide_index=True
+            )
+
 if __name__ == "__main__":
     main()
+    jobs_sidebar()
+    perf_sidebar()
@@ -0,0 +1,111 @@
+# utils/artifacts.py
+import os
+from datetime import datetime, timezone
+
+import joblib
+
+from utils.fast_scorer import LinearScorer
+from utils.scoring import DEFAULT_THRESHOLD
+
+# Bump when the artifact layout changes in a way older loaders cannot read
+ARTIFACT_VERSION = 1
+
+MODELS_DIR = "models"
+ARTIFACT_PATH = os.path.join(MODELS_DIR, "churn_model.joblib")
+LEGACY_MODEL_PATH = os.path.join(MODELS_DIR, "logistic_model.pkl")
+LEGACY_FEATURES_PATH = os.path.join(MODELS_DIR, "feature_columns.pkl")
+SCORER_SUFFIX = ".scorer.npz"
+
+
+def build_artifact(preprocessor, model, feature_columns, target_column, input_schema,
+                   threshold: float = DEFAULT_THRESHOLD, reference: dict = None) -> dict:
+    """
+    Bundle the fitted preprocessing and the model into one scoring pipeline
+    that accepts raw customer records, with the operating threshold used
+    to turn churn probabilities into predictions and the training-data
+    histograms batch scoring compares against (utils.drift.build_reference).
+    """
+    # Imported here so the registry and the app pages can list / load
+    # models without paying for scikit-learn up front
+    import sklearn
+    from sklearn.pipeline import Pipeline
+
+    return {
+        "artifact_version": ARTIFACT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "sklearn_version": sklearn.__version__,
+        "pipeline": Pipeline([("preprocess", preprocessor), ("model", model)]),
+        "feature_columns": list(feature_columns),
+        "target_column": target_column,
+        "input_schema": input_schema,
+        "threshold": float(threshold),
+        "reference": reference,
+    }
+
+
+def artifact_threshold(artifact) -> float:
+    """
+    Operating threshold of an artifact (artifacts saved before thresholds
+    were stored, and legacy models, use the default).
+    """
+    if artifact is None:
+        return DEFAULT_THRESHOLD
+    return float(artifact.get("threshold", DEFAULT_THRESHOLD))
+
+
+def scorer_path(path: str = ARTIFACT_PATH) -> str:
+    """
+    The NumPy scorer export lives next to its artifact and is named after
+    it (models/churn_model.joblib -> models/churn_model.scorer.npz), so
+    several artifacts can share a directory.
+    """
+    return os.path.splitext(path)[0] + SCORER_SUFFIX
+
+
+def write_artifact(artifact: dict, path: str):
+    """
+    Write the artifact and its NumPy weights export (utils.fast_scorer),
+    read back and checked against the model so a server never loads a
+    scorer that disagrees with it.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    joblib.dump(artifact, path)
+
+    model = artifact["pipeline"].named_steps["model"]
+    LinearScorer.from_model(model, artifact["feature_columns"]).save(scorer_path(path))
+    LinearScorer.load(scorer_path(path)).check(model)
+
+
+def load_scorer(path: str = ARTIFACT_PATH):
+    """
+    The NumPy scorer exported with an artifact file, or None for artifacts
+    written before exports were named after them.
+    """
+    path = scorer_path(path)
+    return LinearScorer.load(path) if os.path.exists(path) else None
+
+
+def save_artifact(artifact: dict, path: str = ARTIFACT_PATH):
+    """
+    Write the artifact and its NumPy weights export. Only the default
+    ARTIFACT_PATH also refreshes the legacy model/feature files used by
+    older app versions; an export elsewhere leaves them alone.
+    """
+    write_artifact(artifact, path)
+    if os.path.abspath(path) != os.path.abspath(ARTIFACT_PATH):
+        return
+
+    model = artifact["pipeline"].named_steps["model"]
+    joblib.dump(model, LEGACY_MODEL_PATH)
+    joblib.dump(artifact["feature_columns"], LEGACY_FEATURES_PATH)
+
+
+def load_artifact(path: str = ARTIFACT_PATH) -> dict:
+    artifact = joblib.load(path)
+    version = artifact.get("artifact_version") if isinstance(artifact, dict) else None
+    if version != ARTIFACT_VERSION:
+        raise ValueError(
+            f"Unsupported model artifact version {version!r} in {path} "
+            f"(expected {ARTIFACT_VERSION}). Please retrain the model."
+        )
+    return artifact
@@ -0,0 +1,91 @@
+# utils/column_stats.py
+"""
+Vectorized per-column summaries for plotting (Step 2).
+
+Only the summaries (counts and bin edges) are handed to matplotlib, so a
+plot costs the same whether the column has ten thousand or ten million rows.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.encoding import is_categorical_column
+
+# Bars drawn for a categorical column; the rest are summarised as "other"
+MAX_BARS = 50
+
+
+def category_counts(s: pd.Series):
+    """
+    Returns (labels, counts) of the non-missing values, sorted by label.
+    Category columns reuse their codes; text columns are factorized once.
+    Counting is a single np.bincount over the integer codes.
+    """
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codes = s.cat.codes.to_numpy()
+        labels = np.asarray(s.cat.categories.astype(str))
+    else:
+        codes, uniques = pd.factorize(s, use_na_sentinel=True)
+        labels = np.asarray(pd.Index(uniques).astype(str))
+
+    counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+    order = np.argsort(labels, kind="stable")
+    return labels[order], counts[order]
+
+
+def finite_values(s: pd.Series) -> np.ndarray:
+    """
+    The column as float64 with missing and infinite values removed.
+    """
+    if isinstance(s.dtype, pd.SparseDtype):
+        s = s.sparse.to_dense()
+    values = s.to_numpy(dtype=np.float64, na_value=np.nan)
+    return values[np.isfinite(values)]
+
+
+def numeric_histogram(s, bins: int = 30):
+    """
+    Returns (counts, edges) over the finite values, like ax.hist without drawing.
+    Accepts a Series or an array already passed through finite_values.
+    """
+    values = finite_values(s) if isinstance(s, pd.Series) else s
+    if len(values) == 0:
+        return np.zeros(bins, dtype=np.int64), np.linspace(0.0, 1.0, bins + 1)
+    return np.histogram(values, bins=bins)
+
+
+def top_categories(labels, counts, max_bars: int = MAX_BARS):
+    """
+    Keep the `max_bars` most frequent categories (in label order); returns
+    (labels, counts, other_count).
+    """
+    if len(labels) <= max_bars:
+        return labels, counts, 0
+    keep = np.sort(np.argpartition(counts, -max_bars)[-max_bars:])
+    return labels[keep], counts[keep], int(counts.sum() - counts[keep].sum())
+
+
+def sample_positions(n_rows: int, k: int, seed: int = 0) -> np.ndarray:
+    """
+    Sorted positions of a uniform random sample of min(k, n_rows) rows
+    without replacement (the same distribution as a reservoir sample).
+    """
+    if k >= n_rows:
+        return np.arange(n_rows)
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.choice(n_rows, size=k, replace=False))
+
+
+def column_summary(s: pd.Series, bins: int = 30, sample_size: int = None, seed: int = 0) -> dict:
+    """
+    Plot-ready summary of one column. With `sample_size`, counts are
+    computed from a random sample of that many rows.
+    """
+    if sample_size is not None and sample_size < len(s):
+        s = s.iloc[sample_positions(len(s), sample_size, seed)]
+
+    if is_categorical_column(s):
+        labels, counts = category_counts(s)
+        return {"kind": "categorical", "rows": len(s), "cardinality": len(labels), "labels": labels, "counts": counts}
+
+    counts, edges = numeric_histogram(s, bins)
+    return {"kind": "numeric", "rows": len(s), "counts": counts, "edges": edges}
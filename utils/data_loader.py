@@ -0,0 +1,343 @@
+# utils/data_loader.py
+import glob
+import hashlib
+import importlib.util
+import io
+import json
+import operator
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# Low-cardinality text columns of the Churn_Modelling.csv schema
+CATEGORY_COLUMNS = ["Geography", "Gender"]
+
+# Files picked up from a partition directory or glob
+PARTITION_SUFFIXES = (".csv", ".parquet", ".pq")
+
+# Row filter operators (see parse_filter)
+FILTER_OPS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">=": operator.ge,
+    "<=": operator.le,
+    ">": operator.gt,
+    "<": operator.lt,
+}
+
+
+def content_hash(data: bytes) -> str:
+    """
+    Stable digest of a file's raw bytes, used as the ingestion cache key.
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def csv_engine() -> str:
+    """
+    Use the multithreaded pyarrow CSV parser when it is installed.
+    """
+    return "pyarrow" if importlib.util.find_spec("pyarrow") is not None else "c"
+
+
+def memory_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True).sum())
+
+
+def optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert columns to compact dtypes:
+    - known low-cardinality text columns -> category
+    - integer columns (0/1 flags, counts, ids) -> smallest int that fits (int8 for flags)
+    - float columns -> float32
+    """
+    converted = {}
+    for col in df.columns:
+        s = df[col]
+        if col in CATEGORY_COLUMNS:
+            converted[col] = s.astype("category")
+        elif pd.api.types.is_bool_dtype(s):
+            converted[col] = s.astype("int8")
+        elif pd.api.types.is_integer_dtype(s):
+            converted[col] = pd.to_numeric(s, downcast="integer")
+        elif pd.api.types.is_float_dtype(s):
+            converted[col] = s.astype("float32")
+        else:
+            converted[col] = s
+    return pd.DataFrame(converted, index=df.index)
+
+
+def read_csv_optimized(data: bytes):
+    """
+    Parse CSV bytes once and shrink them to compact dtypes.
+
+    Returns the optimized DataFrame and a memory report with the
+    footprint before and after dtype optimization (in bytes).
+    """
+    df = pd.read_csv(io.BytesIO(data), engine=csv_engine())
+    before = memory_bytes(df)
+
+    df = optimize_dtypes(df)
+    after = memory_bytes(df)
+
+    report = {
+        "engine": csv_engine(),
+        "rows": len(df),
+        "before_bytes": before,
+        "after_bytes": after,
+    }
+    return df, report
+
+
+def file_format(name: str) -> str:
+    """
+    'parquet' for .parquet/.pq files, 'csv' otherwise.
+    """
+    return "parquet" if str(name).lower().endswith((".parquet", ".pq")) else "csv"
+
+
+def read_columns(source, fmt: str):
+    """
+    Column names of a CSV/Parquet file (path or file-like) without reading the data.
+    """
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return list(pq.ParquetFile(source).schema_arrow.names)
+
+    columns = list(pd.read_csv(source, nrows=0).columns)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return columns
+
+
+def count_rows(source, fmt: str) -> int:
+    """
+    Number of data rows, from Parquet metadata or by counting CSV line breaks
+    in fixed-size blocks (nothing is parsed).
+    """
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(source).metadata.num_rows
+
+    own_file = isinstance(source, (str, os.PathLike))
+    f = open(source, "rb") if own_file else source
+    try:
+        lines = 0
+        last = b"\n"
+        for block in iter(lambda: f.read(1 << 24), b""):
+            lines += block.count(b"\n")
+            last = block[-1:]
+        if last != b"\n":
+            lines += 1  # final line without trailing newline
+        return max(lines - 1, 0)  # minus header
+    finally:
+        if own_file:
+            f.close()
+        else:
+            source.seek(0)
+
+
+def iter_chunks(source, fmt: str, chunksize: int = 100_000, columns=None):
+    """
+    Stream a CSV/Parquet file as DataFrames of at most `chunksize` rows,
+    reading only `columns` when given. Memory stays bounded by the chunk size.
+    """
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+        return
+
+    with pd.read_csv(source, chunksize=chunksize, usecols=columns) as reader:
+        for chunk in reader:
+            yield chunk
+
+
+def resolve_partitions(spec: str) -> list:
+    """
+    Files of a partitioned dataset: a directory (searched recursively), a
+    glob pattern (** allowed) or a single file. Only .csv / .parquet files
+    are kept (not hidden or _SUCCESS-style markers), sorted by path so daily
+    partitions come in date order.
+    """
+    if os.path.isdir(spec):
+        paths = [os.path.join(d, name) for d, _, names in os.walk(spec) for name in names]
+    elif any(c in spec for c in "*?["):
+        paths = glob.glob(spec, recursive=True)
+    else:
+        paths = [spec]
+    paths = sorted(
+        p for p in paths
+        if os.path.isfile(p) and p.lower().endswith(PARTITION_SUFFIXES)
+        and not os.path.basename(p).startswith((".", "_"))
+    )
+    if not paths:
+        raise FileNotFoundError(f"No CSV or Parquet files match '{spec}'.")
+    return paths
+
+
+def partitions_hash(paths, columns=None, filters=()) -> str:
+    """
+    Cache / snapshot key of a partitioned read: paths, sizes and modification
+    times of the files plus the projection and filters (no data is read).
+    """
+    files = []
+    for path in paths:
+        stat = os.stat(path)
+        files.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+    key = json.dumps([files, list(columns) if columns else None, [list(f) for f in filters]], default=str)
+    return content_hash(key.encode("utf-8"))
+
+
+def _filter_value(text: str) -> str:
+    return text.strip().strip("'\"")
+
+
+def parse_filter(text: str) -> tuple:
+    """
+    'Age >= 30', 'Geography == France' or 'Geography in France, Spain' ->
+    (column, op, value); value is a list for 'in' / 'not in'.
+    """
+    match = re.match(r"^\s*(.+?)\s+(not in|in)\s+(.+?)\s*$", text)
+    if match:
+        column, op, value = match.groups()
+        return column.strip(), op, [_filter_value(v) for v in value.split(",")]
+    match = re.match(r"^\s*(.+?)\s*(==|!=|>=|<=|=|>|<)\s*([^<>=!\s].*?)\s*$", text)
+    if match:
+        column, op, value = match.groups()
+        return column.strip(), "==" if op == "=" else op, _filter_value(value)
+    raise ValueError(
+        f"Cannot parse filter '{text}'. Expected e.g. 'Age >= 30' or 'Geography in France, Spain'."
+    )
+
+
+def _coerce(s: pd.Series, value):
+    # Compare numbers as numbers, everything else as text
+    return float(value) if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s) else str(value)
+
+
+def filter_mask(df: pd.DataFrame, filters) -> np.ndarray:
+    """
+    Boolean mask of the rows passing every (column, op, value) filter.
+    Missing values never pass.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for column, op, value in filters:
+        s = df[column]
+        if op in ("in", "not in"):
+            passed = s.isin([_coerce(s, v) for v in value]).to_numpy()
+            if op == "not in":
+                passed = ~passed
+        else:
+            passed = np.asarray(FILTER_OPS[op](s, _coerce(s, value)), dtype=bool)
+        # "!=" and "not in" are True for NaN
+        mask &= passed & s.notna().to_numpy()
+    return mask
+
+
+def iter_partitions(paths, chunksize: int = 100_000, columns=None, filters=()):
+    """
+    Stream several CSV/Parquet files as DataFrame chunks, reading only
+    `columns` (plus the columns the filters need) and keeping only the rows
+    that pass every filter. Memory stays bounded by the chunk size.
+    """
+    filters = list(filters or ())
+    read = None if columns is None else list(dict.fromkeys(list(columns) + [f[0] for f in filters]))
+    for path in paths:
+        for chunk in iter_chunks(path, file_format(path), chunksize=chunksize, columns=read):
+            if filters:
+                chunk = chunk[filter_mask(chunk, filters)]
+            yield chunk if columns is None else chunk[list(columns)]
+
+
+def preview_partitions(paths, n_rows: int = 20, columns=None, filters=()) -> pd.DataFrame:
+    """
+    The first n_rows matching rows; reading stops as soon as they are found.
+    """
+    parts, found = [], 0
+    for chunk in iter_partitions(paths, chunksize=max(n_rows, 10_000), columns=columns, filters=filters):
+        parts.append(chunk.head(n_rows - found))
+        found += len(parts[-1])
+        if found >= n_rows:
+            break
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=columns)
+
+
+def partition_summary(paths) -> pd.DataFrame:
+    """
+    File, format, row count and size of every partition, from Parquet
+    metadata or a line count (nothing is parsed).
+    """
+    return pd.DataFrame([{
+        "file": path,
+        "format": file_format(path),
+        "rows": count_rows(path, file_format(path)),
+        "size_mb": os.path.getsize(path) / 1024 ** 2,
+    } for path in paths])
+
+
+def count_matching(paths, filters, chunksize: int = 500_000) -> int:
+    """
+    Number of rows passing the filters, reading only the filtered columns.
+    """
+    columns = list(dict.fromkeys(f[0] for f in filters))
+    return sum(len(chunk) for chunk in iter_partitions(paths, chunksize, columns=columns, filters=filters))
+
+
+def concat_frames(parts) -> pd.DataFrame:
+    """
+    Concatenate dtype-optimized chunks. Category columns are merged with
+    union_categoricals (plain concat would fall back to object when the
+    chunks saw different categories).
+    """
+    from pandas.api.types import union_categoricals
+
+    columns = {}
+    for name in parts[0].columns:
+        series = [part[name] for part in parts]
+        if all(isinstance(s.dtype, pd.CategoricalDtype) for s in series):
+            columns[name] = pd.Series(union_categoricals(series), name=name)
+        else:
+            columns[name] = pd.concat(series, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def read_partitions(paths, columns=None, filters=(), chunksize: int = 100_000, progress=None):
+    """
+    Read a partitioned dataset chunk by chunk with projection and filters,
+    shrinking each chunk to compact dtypes before it is kept, so the full
+    unoptimized frame never exists in memory.
+
+    `progress(files_done, n_files, rows)` is called after every file.
+    Returns (df, report) with the same report keys as read_csv_optimized
+    plus "files".
+    """
+    parts, before = [], 0
+    rows = 0
+    for i, path in enumerate(paths):
+        for chunk in iter_partitions([path], chunksize, columns=columns, filters=filters):
+            before += memory_bytes(chunk)
+            parts.append(optimize_dtypes(chunk))
+            rows += len(chunk)
+        if progress is not None:
+            progress(i + 1, len(paths), rows)
+
+    if parts:
+        df = concat_frames(parts)
+    else:
+        # No chunk at all (header-only files): an empty frame with the projected columns
+        names = columns
+        if names is None:
+            names = read_columns(paths[0], file_format(paths[0])) if paths else []
+        df = pd.DataFrame(columns=list(names))
+    formats = sorted({file_format(p) for p in paths})
+    report = {
+        "engine": f"chunked {'/'.join(formats)}",
+        "rows": len(df),
+        "files": len(paths),
+        "before_bytes": before,
+        "after_bytes": memory_bytes(df),
+    }
+    return df, report
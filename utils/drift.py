@@ -0,0 +1,195 @@
+# utils/drift.py
+"""
+Data drift and score-distribution monitoring for batch scoring.
+
+At training time build_reference() stores, with the artifact, fixed-bin
+histograms of the most important model features and of the churn score
+over (a sample of) the training rows: quantile bin edges plus counts, a
+few hundred numbers in total. A DriftMonitor then accumulates counts in
+the same bins chunk by chunk while a file is scored (the counters only
+ever grow, no scored row is kept), and report() compares them with the
+reference:
+
+    PSI = sum((cur% - ref%) * ln(cur% / ref%))     < 0.1 stable, < 0.25 moderate, else significant
+    KS  = max |CDF_cur - CDF_ref| over the bin edges
+
+A significant PSI on the score or on any monitored feature flags the
+model for retraining.
+"""
+import numpy as np
+import scipy.sparse as sp
+
+from utils.fast_scorer import LinearScorer
+from utils.splits import take
+
+# Quantile bins per feature / for the churn score
+DEFAULT_BINS = 10
+
+# Most important features monitored (|coefficient| x std), and rows sampled for the reference
+MAX_MONITORED_FEATURES = 50
+REFERENCE_ROWS = 100_000
+
+# PSI levels of the usual rule of thumb
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+# Floor for empty bins in the PSI logarithm
+_EPSILON = 1e-4
+
+
+def _dense_columns(X, columns) -> np.ndarray:
+    if sp.issparse(X):
+        return X[:, columns].toarray()
+    return np.asarray(X)[:, columns]
+
+
+def bin_edges(values: np.ndarray, bins: int = DEFAULT_BINS) -> np.ndarray:
+    """
+    Interior quantile edges of the finite values; bins are right-closed,
+    (-inf, e1], (e1, e2], ..., (ek, inf), so every distinct value of a
+    0/1 column gets its own bin. Missing values fall into the last bin.
+    """
+    finite = values[np.isfinite(values)]
+    if len(finite) == 0:
+        return np.empty(0)
+    return np.unique(np.quantile(finite, np.linspace(0.0, 1.0, bins + 1)[1:-1]))
+
+
+def bin_counts(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    return np.bincount(np.searchsorted(edges, values, side="left"), minlength=len(edges) + 1)
+
+
+def build_reference(X, model, feature_columns, rows=None, bins: int = DEFAULT_BINS,
+                    max_features: int = MAX_MONITORED_FEATURES, max_rows: int = REFERENCE_ROWS,
+                    seed: int = 0) -> dict:
+    """
+    Reference histograms from the feature matrix X (array or CSR) and the
+    fitted model: the `max_features` most important features and the churn
+    score, over at most `max_rows` rows sampled from the training positions
+    `rows` (default: all rows). Only the sampled rows are gathered.
+    """
+    n_rows = X.shape[0] if rows is None else len(rows)
+    if n_rows > max_rows:
+        positions = np.arange(n_rows) if rows is None else np.asarray(rows)
+        rows = np.sort(np.random.default_rng(seed).choice(positions, size=max_rows, replace=False))
+    X = take(X, rows)
+
+    scorer = LinearScorer.from_model(model, feature_columns)
+    if sp.issparse(X):
+        mean = np.asarray(X.mean(axis=0)).ravel()
+        std = np.sqrt(np.maximum(np.asarray(X.multiply(X).mean(axis=0)).ravel() - mean ** 2, 0.0))
+    else:
+        std = np.asarray(X, dtype=np.float64).std(axis=0)
+    importance = np.abs(scorer.coef) * std
+    columns = np.sort(np.argsort(-importance, kind="stable")[:max_features])
+
+    values = _dense_columns(X, columns)
+    features = []
+    for j, column in enumerate(columns):
+        edges = bin_edges(values[:, j], bins)
+        features.append({
+            "feature": scorer.feature_columns[column],
+            "index": int(column),
+            "edges": edges,
+            "counts": bin_counts(values[:, j], edges),
+        })
+
+    proba = scorer.predict_proba(X)
+    score_edges = bin_edges(proba, bins)
+    return {
+        "rows": int(X.shape[0]),
+        "training_rows": int(n_rows),
+        "features": features,
+        "score": {"edges": score_edges, "counts": bin_counts(proba, score_edges), "mean": float(proba.mean())},
+    }
+
+
+def psi(expected_counts, actual_counts) -> float:
+    """
+    Population stability index between two count vectors over the same bins.
+    """
+    expected = np.maximum(np.asarray(expected_counts, dtype=np.float64) / max(np.sum(expected_counts), 1), _EPSILON)
+    actual = np.maximum(np.asarray(actual_counts, dtype=np.float64) / max(np.sum(actual_counts), 1), _EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def binned_ks(expected_counts, actual_counts) -> float:
+    """
+    Kolmogorov-Smirnov statistic evaluated at the bin edges.
+    """
+    expected = np.cumsum(expected_counts) / max(np.sum(expected_counts), 1)
+    actual = np.cumsum(actual_counts) / max(np.sum(actual_counts), 1)
+    return float(np.max(np.abs(actual - expected)))
+
+
+def psi_status(value: float) -> str:
+    if value >= PSI_SIGNIFICANT:
+        return "significant"
+    return "moderate" if value >= PSI_MODERATE else "stable"
+
+
+class DriftMonitor:
+    """
+    Streaming fixed-bin accumulator over scored chunks:
+
+        monitor = DriftMonitor(artifact["reference"])
+        for X, proba in batches:          # model feature matrix, churn probabilities
+            monitor.update(X, proba)
+        monitor.report()
+    """
+
+    def __init__(self, reference: dict):
+        self.reference = reference
+        self.columns = np.asarray([f["index"] for f in reference["features"]], dtype=np.intp)
+        self.feature_counts = [np.zeros(len(f["counts"]), dtype=np.int64) for f in reference["features"]]
+        self.score_counts = np.zeros(len(reference["score"]["counts"]), dtype=np.int64)
+        self.rows = 0
+        self.score_sum = 0.0
+
+    def update(self, X, proba):
+        """
+        Add one chunk: X is the model feature matrix (array or CSR), proba its churn probabilities.
+        """
+        values = _dense_columns(X, self.columns)
+        for j, feature in enumerate(self.reference["features"]):
+            self.feature_counts[j] += bin_counts(values[:, j], feature["edges"])
+        proba = np.asarray(proba)
+        self.score_counts += bin_counts(proba, self.reference["score"]["edges"])
+        self.score_sum += float(proba.sum(dtype=np.float64))
+        self.rows += len(proba)
+
+    def report(self) -> dict:
+        """
+        PSI / KS per monitored feature (most drifted first) and for the
+        churn score, the mean score shift and the retraining flag.
+        """
+        score_ref = self.reference["score"]
+        score_psi = psi(score_ref["counts"], self.score_counts)
+        features = sorted((
+            {
+                "feature": feature["feature"],
+                "psi": psi(feature["counts"], counts),
+                "ks": binned_ks(feature["counts"], counts),
+            }
+            for feature, counts in zip(self.reference["features"], self.feature_counts)
+        ), key=lambda f: f["psi"], reverse=True)
+        for f in features:
+            f["status"] = psi_status(f["psi"])
+
+        drifted = [f["feature"] for f in features if f["status"] == "significant"]
+        mean = self.score_sum / self.rows if self.rows else None
+        return {
+            "rows": self.rows,
+            "reference_rows": self.reference["rows"],
+            "score": {
+                "psi": score_psi,
+                "ks": binned_ks(score_ref["counts"], self.score_counts),
+                "status": psi_status(score_psi),
+                "mean": mean,
+                "reference_mean": score_ref["mean"],
+                "mean_shift": mean - score_ref["mean"] if mean is not None else None,
+            },
+            "features": features,
+            "drifted_features": drifted,
+            "retrain": bool(self.rows) and (score_psi >= PSI_SIGNIFICANT or bool(drifted)),
+        }
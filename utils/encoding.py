@@ -0,0 +1,180 @@
+# utils/encoding.py
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.preprocessing import OneHotEncoder
+
+# Encoder modes offered on the Encode Categoricals page
+ENCODING_MODES = {
+    "onehot": "One-hot (dense uint8 columns)",
+    "onehot_sparse": "One-hot (sparse uint8 columns)",
+    "hashing": "Feature hashing (sparse, fixed width)",
+    "frequency": "Frequency encoding (1 numeric column)",
+    "target": "Target encoding (1 numeric column)",
+}
+
+# Modes whose output is kept sparse all the way to the model
+SPARSE_MODES = ("onehot_sparse", "hashing")
+
+
+def is_categorical_column(s: pd.Series) -> bool:
+    """
+    Text-like columns: object, string (pandas >= 3 default for text) or category.
+    """
+    return (
+        pd.api.types.is_object_dtype(s)
+        or pd.api.types.is_string_dtype(s)
+        or isinstance(s.dtype, pd.CategoricalDtype)
+    )
+
+
+def _as_frame(X) -> pd.DataFrame:
+    return X if isinstance(X, pd.DataFrame) else pd.DataFrame(X)
+
+
+class HashingEncoder(BaseEstimator, TransformerMixin):
+    """
+    Hash each column's values into `n_features` buckets (one block per column).
+    Stateless and vectorized: hashing uses pandas' C implementation and the
+    output is a CSR matrix with exactly one non-zero per row and column.
+    """
+
+    def __init__(self, n_features: int = 64):
+        self.n_features = n_features
+
+    def fit(self, X, y=None):
+        X = _as_frame(X)
+        self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self.n_features_in_ = X.shape[1]
+        return self
+
+    def transform(self, X):
+        X = _as_frame(X)
+        n_rows = len(X)
+        blocks = []
+        for col in X.columns:
+            # object, string and category columns with the same values hash identically
+            hashes = pd.util.hash_pandas_object(X[col], index=False).to_numpy()
+            buckets = (hashes % np.uint64(self.n_features)).astype(np.int32)
+            blocks.append(sp.csr_matrix(
+                (np.ones(n_rows, dtype=np.uint8), buckets, np.arange(n_rows + 1, dtype=np.int64)),
+                shape=(n_rows, self.n_features)
+            ))
+        return sp.hstack(blocks, format="csr", dtype=np.uint8)
+
+    def get_feature_names_out(self, input_features=None):
+        cols = self.feature_names_in_ if input_features is None else input_features
+        return np.asarray([f"{c}_hash{i}" for c in cols for i in range(self.n_features)], dtype=object)
+
+
+class FrequencyEncoder(BaseEstimator, TransformerMixin):
+    """
+    Replace each category by its relative frequency in the training data.
+    Unseen categories map to 0.
+    """
+
+    def fit(self, X, y=None):
+        X = _as_frame(X)
+        self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self.n_features_in_ = X.shape[1]
+        self.frequencies_ = [X[c].value_counts(normalize=True) for c in X.columns]
+        return self
+
+    def transform(self, X):
+        X = _as_frame(X)
+        out = np.empty((len(X), X.shape[1]), dtype=np.float32)
+        for j, col in enumerate(X.columns):
+            out[:, j] = X[col].map(self.frequencies_[j]).astype("float32").fillna(0.0).to_numpy()
+        return out
+
+    def get_feature_names_out(self, input_features=None):
+        return np.asarray(self.feature_names_in_ if input_features is None else input_features, dtype=object)
+
+
+class TargetMeanEncoder(BaseEstimator, TransformerMixin):
+    """
+    Replace each category by its smoothed churn rate:
+        (sum_y + smoothing * prior) / (count + smoothing)
+
+    fit_transform returns out-of-fold encodings (each row is encoded with
+    statistics computed without it) to limit target leakage; transform uses
+    statistics from the full training data. Unseen categories map to the prior.
+    """
+
+    def __init__(self, smoothing: float = 10.0, n_splits: int = 5, random_state: int = 0):
+        self.smoothing = smoothing
+        self.n_splits = n_splits
+        self.random_state = random_state
+
+    def _stats(self, col: pd.Series, y: np.ndarray):
+        grouped = pd.DataFrame({"key": col.to_numpy(), "y": y}).groupby("key", observed=True)["y"]
+        sums, counts = grouped.sum(), grouped.count()
+        return (sums + self.smoothing * self.prior_) / (counts + self.smoothing)
+
+    def fit(self, X, y):
+        X = _as_frame(X)
+        y = np.asarray(y, dtype=np.float64)
+        self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self.n_features_in_ = X.shape[1]
+        self.prior_ = float(y.mean())
+        self.encodings_ = [self._stats(X[c], y) for c in X.columns]
+        return self
+
+    def transform(self, X):
+        X = _as_frame(X)
+        out = np.empty((len(X), X.shape[1]), dtype=np.float32)
+        for j, col in enumerate(X.columns):
+            out[:, j] = X[col].map(self.encodings_[j]).astype("float32").fillna(self.prior_).to_numpy()
+        return out
+
+    def fit_transform(self, X, y):
+        X = _as_frame(X)
+        self.fit(X, y)
+        y = np.asarray(y, dtype=np.float64)
+
+        rng = np.random.default_rng(self.random_state)
+        folds = rng.permutation(len(X)) % self.n_splits
+        out = np.empty((len(X), X.shape[1]), dtype=np.float32)
+        for k in range(self.n_splits):
+            in_fold = folds == k
+            for j, col in enumerate(X.columns):
+                stats = self._stats(X[col][~in_fold], y[~in_fold])
+                out[in_fold, j] = X[col][in_fold].map(stats).astype("float32").fillna(self.prior_).to_numpy()
+        return out
+
+    def get_feature_names_out(self, input_features=None):
+        return np.asarray(self.feature_names_in_ if input_features is None else input_features, dtype=object)
+
+
+def make_encoder(mode: str, drop_first: bool = False, n_features: int = 64, smoothing: float = 10.0):
+    """
+    Unfitted sklearn-compatible encoder for one encoding mode.
+    """
+    if mode in ("onehot", "onehot_sparse"):
+        return OneHotEncoder(
+            drop="first" if drop_first else None,
+            sparse_output=(mode == "onehot_sparse"),
+            dtype=np.uint8,
+            handle_unknown="ignore"
+        )
+    if mode == "hashing":
+        return HashingEncoder(n_features=n_features)
+    if mode == "frequency":
+        return FrequencyEncoder()
+    if mode == "target":
+        return TargetMeanEncoder(smoothing=smoothing)
+    raise ValueError(f"Unknown encoding mode '{mode}'. Expected one of {list(ENCODING_MODES)}.")
+
+
+def encoded_columns(encoder, X: pd.DataFrame, y=None) -> pd.DataFrame:
+    """
+    Fit the encoder on X and return its output as named columns.
+    Sparse output stays sparse (pandas Sparse[uint8] columns).
+    """
+    out = encoder.fit_transform(X, y) if y is not None else encoder.fit_transform(X)
+    names = encoder.get_feature_names_out(list(X.columns))
+    if sp.issparse(out):
+        return pd.DataFrame.sparse.from_spmatrix(out, index=X.index, columns=names)
+    return pd.DataFrame(out, index=X.index, columns=names)
+
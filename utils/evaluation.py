@@ -0,0 +1,215 @@
+# utils/evaluation.py
+"""
+Threshold-free evaluation of churn probabilities from one sorted pass.
+
+The scores are sorted once (descending); cumulative positive counts along
+that order give the confusion matrix at every distinct threshold, from
+which ROC / precision-recall curves, their areas, lift/gain by decile and
+metrics at any threshold are read off with array indexing. The cost is one
+O(n log n) sort, so tens of millions of test rows take seconds.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.modeling import metrics_from_confusion
+from utils.scoring import DEFAULT_THRESHOLD
+
+# Thresholds listed in the metrics-vs-threshold table
+TABLE_THRESHOLDS = np.round(np.arange(0.05, 1.0, 0.05), 2)
+
+
+def sorted_pass(y_true, y_proba, n_bins: int = 10) -> dict:
+    """
+    Counts at every distinct score, highest first, plus the cumulative
+    positives at each rank decile (for lift / gain).
+
+    Returns {"thresholds", "tp", "fp", "positives", "negatives", "rows",
+    "bin_rows", "bin_positives"}; predicting churn when proba >= thresholds[i]
+    gives tp[i] true and fp[i] false positives.
+    """
+    y_proba = np.asarray(y_proba)
+    n_rows = len(y_proba)
+    # The order within ties is irrelevant (tied scores are grouped below), so the
+    # unstable sort is fine and ~3x faster than a stable one on large arrays
+    order = np.argsort(y_proba)[::-1]
+    scores = y_proba[order]
+    tp = np.cumsum(np.asarray(y_true)[order] == 1, dtype=np.int64)
+    del order
+
+    # Last position of each run of equal scores: ties are flagged together
+    last = np.flatnonzero(np.append(scores[1:] != scores[:-1], True)) if n_rows else np.zeros(0, dtype=np.int64)
+    positives = int(tp[-1]) if n_rows else 0
+
+    # Rank deciles (top 10% of scores, next 10%, ...)
+    edges = np.linspace(0, n_rows, n_bins + 1).round().astype(np.int64)
+    cum_positives = np.concatenate([[0], tp])[edges]
+
+    return {
+        "thresholds": scores[last],
+        "tp": tp[last],
+        "fp": last + 1 - tp[last],
+        "positives": positives,
+        "negatives": n_rows - positives,
+        "rows": n_rows,
+        "bin_rows": np.diff(edges),
+        "bin_positives": np.diff(cum_positives),
+    }
+
+
+def _ratio(num, den):
+    num = np.asarray(num, dtype=np.float64)
+    return np.divide(num, den, out=np.zeros_like(num), where=np.asarray(den) > 0)
+
+
+def roc_pr_curves(counts: dict) -> dict:
+    """
+    ROC (fpr, tpr) and precision-recall curves with ROC AUC and average
+    precision (same definitions as sklearn's roc_auc_score and
+    average_precision_score).
+    """
+    tp, fp = counts["tp"], counts["fp"]
+    tpr = np.concatenate([[0.0], _ratio(tp, counts["positives"])])
+    fpr = np.concatenate([[0.0], _ratio(fp, counts["negatives"])])
+    precision = _ratio(tp, tp + fp)
+    defined = counts["positives"] > 0 and counts["negatives"] > 0
+
+    return {
+        "fpr": fpr,
+        "tpr": tpr,
+        "precision": precision,
+        "recall": tpr[1:],
+        # Trapezoids under ROC; step-wise sum for average precision
+        "roc_auc": float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1])) / 2) if defined else float("nan"),
+        "average_precision": float(np.sum(np.diff(tpr) * precision)) if counts["positives"] else float("nan"),
+    }
+
+
+def counts_at(counts: dict, thresholds) -> tuple:
+    """
+    (tp, fp) when predicting churn for proba >= each of `thresholds`.
+    """
+    # thresholds in counts are descending: the number of distinct scores >= t
+    k = np.searchsorted(-counts["thresholds"], -np.asarray(thresholds, dtype=np.float64), side="right")
+    return np.concatenate([[0], counts["tp"]])[k], np.concatenate([[0], counts["fp"]])[k]
+
+
+def metrics_at(counts: dict, threshold: float) -> dict:
+    """
+    Accuracy / precision / recall / F1 / confusion matrix at one threshold.
+    """
+    tp, fp = (int(v[0]) for v in counts_at(counts, [threshold]))
+    fn = counts["positives"] - tp
+    tn = counts["negatives"] - fp
+    return metrics_from_confusion([[tn, fp], [fn, tp]])
+
+
+def threshold_table(counts: dict, thresholds=TABLE_THRESHOLDS) -> pd.DataFrame:
+    """
+    Metrics for a grid of thresholds, all columns computed as arrays.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    tp, fp = counts_at(counts, thresholds)
+    fn = counts["positives"] - tp
+    tn = counts["negatives"] - fp
+    precision = _ratio(tp, tp + fp)
+    recall = _ratio(tp, counts["positives"])
+    return pd.DataFrame({
+        "threshold": thresholds,
+        "flagged": tp + fp,
+        "flagged_pct": _ratio(tp + fp, counts["rows"]) * 100,
+        "precision": precision,
+        "recall": recall,
+        "f1": _ratio(2 * precision * recall, precision + recall),
+        "accuracy": _ratio(tp + tn, counts["rows"]),
+        "tp": tp,
+        "fp": fp,
+        "fn": fn,
+        "tn": tn,
+    })
+
+
+def lift_table(counts: dict) -> pd.DataFrame:
+    """
+    Churn rate, lift and cumulative gain per score decile (highest scores first).
+    """
+    bin_rows, bin_positives = counts["bin_rows"], counts["bin_positives"]
+    base_rate = counts["positives"] / counts["rows"] if counts["rows"] else 0.0
+    rate = _ratio(bin_positives, bin_rows)
+    return pd.DataFrame({
+        "decile": np.arange(1, len(bin_rows) + 1),
+        "rows": bin_rows,
+        "churners": bin_positives,
+        "churn_rate": rate,
+        "lift": rate / base_rate if base_rate else np.zeros_like(rate),
+        "cumulative_gain": _ratio(np.cumsum(bin_positives), counts["positives"]),
+        "cumulative_lift": (_ratio(np.cumsum(bin_positives), np.cumsum(bin_rows)) / base_rate
+                            if base_rate else np.zeros_like(rate)),
+    })
+
+
+def best_threshold(counts: dict, metric: str = "f1") -> float:
+    """
+    The distinct score that maximizes F1 (metric="f1") or Youden's J
+    (metric="youden", tpr - fpr) when used as the threshold.
+    """
+    if not len(counts["thresholds"]):
+        return DEFAULT_THRESHOLD
+    tp, fp = counts["tp"], counts["fp"]
+    recall = _ratio(tp, counts["positives"])
+    if metric == "youden":
+        objective = recall - _ratio(fp, counts["negatives"])
+    elif metric == "f1":
+        precision = _ratio(tp, tp + fp)
+        objective = _ratio(2 * precision * recall, precision + recall)
+    else:
+        raise ValueError(f"Unknown threshold metric '{metric}'. Expected 'f1' or 'youden'.")
+    return float(counts["thresholds"][int(np.argmax(objective))])
+
+
+def thin_curve(x, y, max_points: int = 2000):
+    """
+    At most `max_points` evenly spaced points of a curve, for plotting.
+    """
+    if len(x) <= max_points:
+        return x, y
+    keep = np.unique(np.linspace(0, len(x) - 1, max_points).round().astype(np.int64))
+    return x[keep], y[keep]
+
+
+def evaluate_scores(y_true, y_proba, n_bins: int = 10) -> dict:
+    """
+    Everything the threshold analysis needs from one sorted pass:
+    counts (for metrics_at / threshold_table), curves, AUCs and the lift table.
+    """
+    counts = sorted_pass(y_true, y_proba, n_bins=n_bins)
+    return {
+        "counts": counts,
+        **roc_pr_curves(counts),
+        "lift": lift_table(counts),
+        "best_f1_threshold": best_threshold(counts, "f1"),
+    }
+
+
+def compact_evaluation(evaluation: dict, step: float = 0.01, max_points: int = 2000) -> dict:
+    """
+    A few-KB summary of evaluate_scores for keeping in the session: thinned
+    curves, the lift table and a threshold table on a `step` grid (plus the
+    best-F1 threshold) instead of counts proportional to the test rows.
+    """
+    counts = evaluation["counts"]
+    grid = np.unique(np.append(np.round(np.arange(0.0, 1.0 + step / 2, step), 6), evaluation["best_f1_threshold"]))
+    fpr, tpr = thin_curve(evaluation["fpr"], evaluation["tpr"], max_points)
+    recall, precision = thin_curve(evaluation["recall"], evaluation["precision"], max_points)
+    return {
+        "rows": counts["rows"],
+        "positives": counts["positives"],
+        "roc_auc": evaluation["roc_auc"],
+        "average_precision": evaluation["average_precision"],
+        "fpr": fpr,
+        "tpr": tpr,
+        "recall": recall,
+        "precision": precision,
+        "lift": evaluation["lift"],
+        "thresholds": threshold_table(counts, grid),
+        "best_f1_threshold": evaluation["best_f1_threshold"],
+    }
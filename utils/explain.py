@@ -0,0 +1,217 @@
+# utils/explain.py
+"""
+Vectorized explanations for the linear churn model.
+
+The log-odds of a customer are intercept + sum_j x_j * w_j. Churn reasons
+compare the customer with the average training customer (mean_j recorded
+by the preprocessor fit): the contribution (x_j - mean_j) * w_j of every
+feature, and these add up exactly to the customer's log-odds minus those
+of the average customer. Raw x_j * w_j would rank features by magnitude
+(Age, Balance) and give every customer the same reasons.
+
+For a batch the contributions are one (rows x features) product; the
+top-k drivers of every row are picked with np.argpartition (linear in the
+number of features) and only those k values are sorted. Sparse features
+give CSR contributions, ranked over their nonzeros without densifying.
+
+Global importance depends only on the model: the coefficients and the
+standardized importance |w_j| * std_j (std_j recorded by the preprocessor
+fit), i.e. the log-odds change for a one-standard-deviation move. It is
+computed once per fitted model and shared through explainer_for().
+"""
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from utils.fast_scorer import LinearScorer
+
+# Churn reasons written per customer in batch scoring (page 6)
+DEFAULT_REASONS = 5
+
+
+def _top_k_sparse(values, k: int, largest: bool):
+    # One sort of the nonzeros by (row, value); the first k of every row are kept
+    n_rows = values.shape[0]
+    values = values.tocsr()
+    rows = np.repeat(np.arange(n_rows), np.diff(values.indptr))
+    order = np.lexsort((-values.data if largest else values.data, rows))
+    rank = np.arange(len(order)) - values.indptr[rows]
+    kept = rank < k
+    positions, rank = order[kept], rank[kept]
+
+    idx = np.zeros((n_rows, k), dtype=np.intp)
+    out = np.zeros((n_rows, k), dtype=values.dtype)
+    idx[rows[positions], rank] = values.indices[positions]
+    out[rows[positions], rank] = values.data[positions]
+    return idx, out
+
+
+def _center_sparse(contributions, baseline, k: int):
+    """
+    The entries of contributions - baseline (broadcast over rows) that can
+    reach the k largest or smallest of a row, as CSR.
+
+    Off the stored entries the centered value is -baseline_j, so among them
+    only the first k + nnz(row) columns in -baseline order can rank; the
+    k + max nnz columns at either end of that order are kept for every row.
+    """
+    c = contributions.tocsr()
+    n_rows, n_cols = c.shape
+    width = k + int(np.diff(c.indptr).max(initial=0))
+    order = np.argsort(baseline, kind="stable")
+    candidates = np.unique(np.concatenate([order[:width], order[-width:]]))
+
+    stored = sp.csr_matrix((c.data - baseline[c.indices], c.indices, c.indptr), shape=c.shape)
+    implicit = sp.csr_matrix(np.broadcast_to(-baseline[candidates], (n_rows, len(candidates))))
+    overlap = c[:, candidates]
+    overlap.data = np.ones_like(overlap.data)
+    implicit = (implicit - implicit.multiply(overlap)).tocsr()
+    implicit = sp.csr_matrix((implicit.data, candidates[implicit.indices], implicit.indptr), shape=c.shape)
+    return (stored + implicit).tocsr()
+
+
+def top_k(values, k: int, largest: bool = True):
+    """
+    Column indices and values of the k largest (or smallest) entries of
+    every row, ordered per row. Returns two (rows x k) arrays.
+
+    For a CSR matrix only the stored entries are ranked; rows with fewer
+    than k of them are padded with zeros (column 0), which callers that
+    keep only positive or negative contributions drop anyway.
+    """
+    n_rows, n_cols = values.shape
+    k = min(k, n_cols)
+    if k <= 0:
+        return np.empty((n_rows, 0), dtype=np.intp), np.empty((n_rows, 0), dtype=values.dtype)
+    if sp.issparse(values):
+        return _top_k_sparse(values, k, largest)
+
+    keyed = -values if largest else values
+    if k < n_cols:
+        idx = np.argpartition(keyed, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.broadcast_to(np.arange(n_cols), (n_rows, n_cols))
+    order = np.argsort(np.take_along_axis(keyed, idx, axis=1), axis=1, kind="stable")
+    idx = np.take_along_axis(idx, order, axis=1)
+    return idx, np.take_along_axis(values, idx, axis=1)
+
+
+def global_importance(coef, feature_columns, feature_scale=None) -> pd.DataFrame:
+    """
+    One row per feature, most important first: coefficient, odds ratio,
+    feature std and standardized importance. Without a feature scale (models
+    fitted before it was recorded) features are ranked by |coefficient|.
+    """
+    coef = np.asarray(coef, dtype=np.float64).ravel()
+    scale = np.full(len(coef), np.nan) if feature_scale is None else np.asarray(feature_scale, dtype=np.float64)
+    standardized = coef * scale
+    importance = np.abs(standardized) if feature_scale is not None else np.abs(coef)
+    table = pd.DataFrame({
+        "feature": list(feature_columns),
+        "coefficient": coef,
+        "odds_ratio": np.exp(coef),
+        "std": scale,
+        "standardized": standardized,
+        "importance": importance,
+    })
+    return table.iloc[np.argsort(-importance, kind="stable")].reset_index(drop=True)
+
+
+class Explainer:
+    """
+    Scores and explains feature matrices (array or CSR, in feature_columns order).
+    """
+
+    def __init__(self, scorer: LinearScorer, feature_scale=None, feature_mean=None):
+        self.scorer = scorer
+        self.feature_columns = scorer.feature_columns
+        self.importance = global_importance(scorer.coef, self.feature_columns, feature_scale)
+        # mean_j * w_j; models fitted before the mean was recorded rank raw x_j * w_j
+        self.baseline = None if feature_mean is None else (
+            np.asarray(feature_mean, dtype=np.float32) * scorer.coef
+        )
+
+    def score(self, X):
+        """
+        Returns (churn_probability, contributions): float32 x_j * w_j,
+        CSR for sparse X (never densified, see top_k). drivers() and
+        reasons() center them on the training mean.
+        """
+        return self.scorer.score(X)
+
+    def _top_k(self, contributions, k: int, largest: bool):
+        if self.baseline is None:
+            return top_k(contributions, k, largest)
+        if sp.issparse(contributions):
+            return top_k(_center_sparse(contributions, self.baseline, k), k, largest)
+        return top_k(contributions - self.baseline, k, largest)
+
+    def drivers(self, contributions, k: int, increasing: bool = True) -> list:
+        """
+        Per-row tables of the k features pushing the score up (or down) the
+        most compared with the average training customer, for a handful of
+        rows (page 6). Features that push the other way are left out.
+        """
+        idx, values = self._top_k(contributions, k, largest=increasing)
+        tables = []
+        for row in range(len(idx)):
+            keep = values[row] > 0 if increasing else values[row] < 0
+            tables.append(pd.DataFrame({
+                "feature": [self.feature_columns[j] for j in idx[row][keep]],
+                "coefficient": self.scorer.coef[idx[row][keep]],
+                "contribution": values[row][keep],
+            }))
+        return tables
+
+    def reasons(self, contributions, k: int = DEFAULT_REASONS) -> dict:
+        """
+        Top-k churn reasons of every row as output columns: reason_1 ..
+        reason_k (feature names, categorical) and reason_i_contribution
+        (log-odds above the average training customer). Only features that
+        raise the churn score count; the remaining slots are empty.
+        """
+        idx, values = self._top_k(contributions, k, largest=True)
+        positive = values > 0
+        codes = np.where(positive, idx, -1)
+        columns = {}
+        for i in range(idx.shape[1]):
+            columns[f"reason_{i + 1}"] = pd.Categorical.from_codes(codes[:, i], categories=self.feature_columns)
+            columns[f"reason_{i + 1}_contribution"] = np.where(positive[:, i], values[:, i], np.nan).astype(np.float32)
+        return columns
+
+
+# Explainers keyed by the fitted model object: one per model version in the
+# process (MODEL_CACHE shares artifacts), dropped with the model
+_EXPLAINERS = weakref.WeakKeyDictionary()
+_EXPLAINERS_LOCK = threading.Lock()
+
+
+def explainer_for(model, feature_columns, feature_scale=None, feature_mean=None) -> Explainer:
+    """
+    The shared Explainer of a fitted linear model (built on first use).
+    """
+    with _EXPLAINERS_LOCK:
+        explainer = _EXPLAINERS.get(model)
+        if explainer is None:
+            explainer = Explainer(LinearScorer.from_model(model, feature_columns), feature_scale, feature_mean)
+            _EXPLAINERS[model] = explainer
+        return explainer
+
+
+def pipeline_explainer(estimator, input_columns):
+    """
+    (transform, Explainer) for an estimator from utils.scoring.scoring_inputs:
+    the artifact pipeline (raw records through its preprocessor) or a bare
+    model on the encoded feature columns.
+    """
+    if hasattr(estimator, "named_steps"):
+        preprocessor = estimator.named_steps["preprocess"]
+        explainer = explainer_for(
+            estimator.named_steps["model"], preprocessor.feature_columns,
+            getattr(preprocessor, "scale_", None), getattr(preprocessor, "mean_", None)
+        )
+        return preprocessor.transform, explainer
+    return (lambda X: X.to_numpy(dtype=np.float32)), explainer_for(estimator, input_columns)
@@ -0,0 +1,82 @@
+# utils/fast_scorer.py
+"""
+Dependency-light scorer for the logistic model: NumPy only.
+
+For a linear model, sklearn's predict_proba validation costs far more than
+the dot product itself. The exported file holds the float32 weights and the
+feature order; scoring is sigmoid(X @ coef + intercept) on plain arrays.
+"""
+import os
+
+import numpy as np
+
+
+class LinearScorer:
+
+    def __init__(self, coef, intercept: float, feature_columns):
+        self.coef = np.ascontiguousarray(coef, dtype=np.float32).ravel()
+        self.intercept = np.float32(intercept)
+        self.feature_columns = [str(c) for c in feature_columns]
+        if len(self.coef) != len(self.feature_columns):
+            raise ValueError(
+                f"{len(self.coef)} coefficients but {len(self.feature_columns)} feature columns."
+            )
+
+    @classmethod
+    def from_model(cls, model, feature_columns):
+        """
+        Build from a fitted binary linear classifier (coef_ / intercept_).
+        """
+        return cls(model.coef_[0], float(model.intercept_[0]), feature_columns)
+
+    def check(self, model, rows: int = 64, tolerance: float = 1e-4):
+        """
+        Raise ValueError unless this scorer reproduces model.predict_proba
+        (random inputs, float32 tolerance), e.g. after a save / load round trip.
+        """
+        X = np.random.default_rng(0).standard_normal((rows, len(self.coef))).astype(np.float32)
+        error = float(np.max(np.abs(self.predict_proba(X) - model.predict_proba(X)[:, 1])))
+        if error > tolerance:
+            raise ValueError(f"Exported scorer differs from the model by up to {error:.2g} in probability.")
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(
+            path,
+            coef=self.coef,
+            intercept=np.asarray([self.intercept], dtype=np.float32),
+            feature_columns=np.asarray(self.feature_columns, dtype=str)
+        )
+
+    @classmethod
+    def load(cls, path: str):
+        # A few KB of weights: reading them eagerly is as cheap as memory-mapping
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["coef"], float(data["intercept"][0]), data["feature_columns"].tolist())
+
+    @staticmethod
+    def _sigmoid(z):
+        # tanh form is numerically stable for large |z| and avoids overflow warnings
+        return 0.5 * (1.0 + np.tanh(0.5 * z))
+
+    def decision_function(self, X):
+        return X @ self.coef + self.intercept
+
+    def predict_proba(self, X) -> np.ndarray:
+        """
+        Churn probability (class 1) for each row of X (array or CSR, in feature_columns order).
+        """
+        return self._sigmoid(self.decision_function(X))
+
+    def score(self, X):
+        """
+        Returns (churn_probability, contributions) in one pass, where
+        contributions = X * coef (log-odds per feature, sparse for CSR input).
+        """
+        if hasattr(X, "multiply"):  # scipy sparse
+            contributions = X.multiply(self.coef).tocsr()
+            z = np.asarray(contributions.sum(axis=1)).ravel()
+        else:
+            contributions = np.asarray(X, dtype=np.float32) * self.coef
+            z = contributions.sum(axis=1)
+        return self._sigmoid(z + self.intercept), contributions
@@ -0,0 +1,172 @@
+# utils/incremental.py
+"""
+Out-of-core training for files larger than memory.
+
+The file is streamed in chunks: the preprocessor and a feature scaler are
+fitted on the first chunk, then every chunk is encoded and fed to an
+SGD logistic regression via partial_fit. A fixed random fraction of each
+chunk is held out and scored in a final pass, so memory stays bounded by
+the chunk size throughout (plus 5 bytes per hold-out row for the scores
+kept for the threshold analysis).
+"""
+import time
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import confusion_matrix, log_loss
+
+from utils.data_loader import iter_chunks
+from utils.modeling import fold_scaler, make_scaler, metrics_from_confusion, prepare_training_data
+from utils.preprocessing import required_columns
+from utils.scoring import DEFAULT_CHUNKSIZE
+
+
+def _holdout_masks(random_state: int):
+    """
+    Per-chunk test mask function. Re-created for every pass with the
+    same seed, so each row lands on the same side in every epoch.
+    """
+    rng = np.random.default_rng(random_state)
+
+    def mask(n_rows: int, test_size: float) -> np.ndarray:
+        return rng.random(n_rows) < test_size
+
+    return mask
+
+
+def _target_encoder(first: pd.Series):
+    """
+    Map target values to 0/1 consistently across chunks: numeric targets
+    are used as-is, other targets get the category codes of the first chunk.
+
+    The returned function raises ValueError when a chunk holds a missing
+    target, a numeric value other than 0/1 or a label the first chunk did
+    not have, instead of feeding partial_fit an invalid class.
+    """
+    if pd.api.types.is_numeric_dtype(first):
+        def encode(s: pd.Series) -> np.ndarray:
+            values = s.to_numpy(dtype=float, na_value=np.nan)
+            _check_target(s, ~np.isin(values, (0, 1)), "must be 0/1")
+            return values.astype(np.int64)
+        return encode
+
+    categories = sorted(first.dropna().unique())
+
+    def encode(s: pd.Series) -> np.ndarray:
+        codes = pd.Categorical(s, categories=categories).codes.astype(np.int64)
+        _check_target(s, codes < 0, f"must be one of {categories}")
+        return codes
+    return encode
+
+
+def _check_target(s: pd.Series, invalid: np.ndarray, rule: str):
+    if invalid.any():
+        found = s[invalid].drop_duplicates().tolist()[:5]
+        raise ValueError(
+            f"Target '{s.name}' {rule} in every chunk, but {int(invalid.sum())} row(s) "
+            f"have {found}. Drop or fix these rows before training."
+        )
+
+
+def train_incremental(source, fmt: str, steps, target_col: str, chunksize: int = DEFAULT_CHUNKSIZE,
+                      test_size: float = 0.2, epochs: int = 1, alpha: float = 1e-4,
+                      random_state: int = 42, progress=None) -> dict:
+    """
+    Train an SGDClassifier(loss="log_loss") on `source` (CSV/Parquet path)
+    one chunk at a time and evaluate it on the held-out rows.
+
+    `steps` is the recorded lineage (Step 3); encoders only know the
+    categories of the first chunk, later unseen values are ignored.
+    `progress(phase, rows_done, elapsed)` is called after every chunk.
+
+    Returns the fitted preprocessor and model (scaling folded into the
+    coefficients, so it takes the preprocessor output directly), the
+    hold-out metrics at 0.5, the hold-out targets and probabilities
+    (y_true / y_proba, for utils.evaluation) and rows/sec for the
+    training and evaluation passes.
+    """
+    def chunks(columns=None):
+        return iter_chunks(source, fmt, chunksize=chunksize, columns=columns)
+
+    # Fit the encoding and the scaler on the training rows of the first chunk
+    with closing(chunks()) as reader:
+        first = next(reader)
+    first_train = first[~_holdout_masks(random_state)(len(first), test_size)]
+    data = prepare_training_data(first_train, steps, target_col)
+    preprocessor = data["preprocessor"]
+    encode_target = _target_encoder(first[target_col])
+    del first, first_train
+
+    X_first = data.pop("X")
+    scaler = make_scaler(X_first).fit(X_first)
+    del X_first
+
+    columns = list(dict.fromkeys(required_columns(preprocessor) + [target_col]))
+    model = SGDClassifier(loss="log_loss", alpha=alpha, random_state=random_state)
+    classes = np.array([0, 1])
+
+    train_rows = 0
+    n_chunks = 0
+    start = time.perf_counter()
+    for epoch in range(epochs):
+        holdout = _holdout_masks(random_state)
+        done = 0
+        for chunk in chunks(columns):
+            train = chunk[~holdout(len(chunk), test_size)]
+            done += len(chunk)
+            if len(train):
+                X = scaler.transform(preprocessor.transform(train))
+                model.partial_fit(X, encode_target(train[target_col]), classes=classes)
+                train_rows += len(train)
+            n_chunks += epoch == 0
+            if progress is not None:
+                progress(f"epoch {epoch + 1}/{epochs}", done, time.perf_counter() - start)
+    train_seconds = time.perf_counter() - start
+
+    model = fold_scaler(model, scaler)
+
+    # Hold-out pass: accumulate the confusion matrix and log loss per chunk
+    cm = np.zeros((2, 2), dtype=np.int64)
+    loss_sum = 0.0
+    y_parts, proba_parts = [], []
+    test_rows = 0
+    holdout = _holdout_masks(random_state)
+    done = 0
+    start = time.perf_counter()
+    for chunk in chunks(columns):
+        test = chunk[holdout(len(chunk), test_size)]
+        done += len(chunk)
+        if len(test):
+            y_true = encode_target(test[target_col])
+            proba = model.predict_proba(preprocessor.transform(test))[:, 1]
+            cm += confusion_matrix(y_true, (proba >= 0.5).astype(int), labels=[0, 1])
+            loss_sum += log_loss(y_true, proba, labels=[0, 1], normalize=False)
+            y_parts.append(y_true.astype(np.int8))
+            proba_parts.append(proba.astype(np.float32))
+            test_rows += len(test)
+        if progress is not None:
+            progress("evaluate", done, time.perf_counter() - start)
+    eval_seconds = time.perf_counter() - start
+
+    metrics = metrics_from_confusion(cm)
+    metrics["log_loss"] = loss_sum / test_rows if test_rows else float("nan")
+
+    return {
+        "preprocessor": preprocessor,
+        "model": model,
+        "feature_columns": data["feature_columns"],
+        "dropped_columns": data["dropped_columns"],
+        "input_schema": data["input_schema"],
+        "metrics": metrics,
+        "y_true": np.concatenate(y_parts) if y_parts else np.zeros(0, dtype=np.int8),
+        "y_proba": np.concatenate(proba_parts) if proba_parts else np.zeros(0, dtype=np.float32),
+        "chunks": n_chunks,
+        "train_rows": train_rows // epochs,
+        "test_rows": test_rows,
+        "train_seconds": train_seconds,
+        "train_rows_per_sec": train_rows / train_seconds if train_seconds > 0 else 0.0,
+        "eval_seconds": eval_seconds,
+        "eval_rows_per_sec": done / eval_seconds if eval_seconds > 0 else 0.0,
+    }
@@ -0,0 +1,325 @@
+# utils/jobs.py
+"""
+Background job queue for the heavy steps (feature building + split,
+training), so a Streamlit run only submits work and polls for it.
+
+    job_id = JOB_QUEUE.submit(train_job, X, y, split, ..., kind="train", label="C=1.0")
+    JOB_QUEUE.get(job_id)      # {"status", "progress", "message", "result", ...}
+    JOB_QUEUE.cancel(job_id)
+
+Every job runs in its own spawned process, at most `max_workers` at a time
+(the rest wait in FIFO order), so concurrent analysts neither block the
+server nor each other. Cancelling a queued job drops it; cancelling a
+running one terminates its process, which also stops a fit in progress.
+Job functions report progress with `progress(fraction, message)`; the
+result travels back pickled, so keep it to what the session needs.
+
+Like MODEL_CACHE, JOB_QUEUE is one per server process and shared by all
+sessions; finished jobs stay queryable until forget() (or until the
+oldest are dropped beyond `history`).
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict, deque
+
+# Job states; the last three are final
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+# Datasets from this many rows default to background jobs in the app (smaller
+# ones finish faster inline than a worker process takes to start)
+BACKGROUND_ROWS = 100_000
+
+
+def _worker(job_id: str, fn, args, kwargs, events):
+    """
+    Child process entry point: run fn and send progress / the result back.
+    """
+    def progress(fraction: float, message: str = ""):
+        events.put(("progress", job_id, float(fraction), message))
+
+    events.put(("started", job_id, os.getpid()))
+    try:
+        result = fn(*args, progress=progress, **kwargs)
+    except BaseException:
+        events.put(("failed", job_id, traceback.format_exc(limit=20)))
+    else:
+        events.put(("done", job_id, result))
+
+
+class JobQueue:
+    """
+    Process-based job queue with ids, progress, cancellation and results.
+    """
+
+    def __init__(self, max_workers: int = None, history: int = 50):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) // 2)
+        self.history = history
+        self._context = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._pending = deque()
+        self._processes = {}
+        self._events = None
+        self._monitor = None
+
+    def _start(self):
+        # Created on first use: importing the module must not start processes or threads
+        if self._monitor is None:
+            self._events = self._context.Queue()
+            self._monitor = threading.Thread(target=self._run_monitor, name="job-queue", daemon=True)
+            self._monitor.start()
+
+    def submit(self, fn, *args, kind: str = "job", label: str = "", owner: str = None, **kwargs) -> str:
+        """
+        Queue fn(*args, progress=..., **kwargs) and return the job id. fn must
+        be a module-level function (it is imported by the child process).
+        """
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._start()
+            self._jobs[job_id] = {
+                "id": job_id,
+                "kind": kind,
+                "label": label,
+                "owner": owner,
+                "status": QUEUED,
+                "progress": 0.0,
+                "message": "Queued",
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "pid": None,
+                "result": None,
+                "error": None,
+            }
+            self._pending.append((job_id, fn, args, kwargs))
+            self._dispatch()
+            self._trim()
+        return job_id
+
+    def _dispatch(self):
+        while self._pending and len(self._processes) < self.max_workers:
+            job_id, fn, args, kwargs = self._pending.popleft()
+            process = self._context.Process(
+                target=_worker, args=(job_id, fn, args, kwargs, self._events), name=f"job-{job_id}", daemon=True
+            )
+            process.start()
+            self._processes[job_id] = process
+            self._jobs[job_id].update(status=RUNNING, message="Starting", started_at=time.time())
+
+    def _finish(self, job_id: str, status: str, **fields):
+        job = self._jobs.get(job_id)
+        if job is None or job["status"] in FINISHED:
+            return
+        job.update(status=status, finished_at=time.time(), **fields)
+        if status == DONE:
+            job["progress"] = 1.0
+        self._processes.pop(job_id, None)
+
+    def _handle(self, event):
+        kind, job_id = event[0], event[1]
+        job = self._jobs.get(job_id)
+        if job is None or job["status"] in FINISHED:
+            return
+        if kind == "started":
+            job["pid"] = event[2]
+        elif kind == "progress":
+            job["progress"], job["message"] = event[2], event[3]
+        elif kind == "done":
+            self._finish(job_id, DONE, result=event[2], message="Done")
+        elif kind == "failed":
+            self._finish(job_id, FAILED, error=event[2], message="Failed")
+
+    def _drain(self):
+        while True:
+            try:
+                self._handle(self._events.get_nowait())
+            except queue.Empty:
+                return
+
+    def _run_monitor(self):
+        while True:
+            try:
+                event = self._events.get(timeout=0.2)
+            except queue.Empty:
+                event = None
+            with self._lock:
+                if event is not None:
+                    self._handle(event)
+                # A process that died without reporting (killed, segfault, out of memory)
+                for job_id, process in list(self._processes.items()):
+                    if process.exitcode is not None:
+                        self._drain()
+                        self._finish(job_id, FAILED, message="Failed",
+                                     error=f"Worker process exited with code {process.exitcode}.")
+                self._dispatch()
+            multiprocessing.active_children()  # reap finished processes
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in FINISHED]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> dict:
+        """
+        A copy of the job record (None for unknown or forgotten ids).
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def jobs(self, owner: str = None, include_results: bool = False) -> list:
+        """
+        Job records (all, or one owner's), oldest first; results are left out unless asked for.
+        """
+        with self._lock:
+            return [
+                {**job, "result": job["result"] if include_results else None}
+                for job in self._jobs.values() if owner is None or job["owner"] == owner
+            ]
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued or running job. Returns False when it already finished.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] in FINISHED:
+                return False
+            if job["status"] == QUEUED:
+                self._pending = deque(p for p in self._pending if p[0] != job_id)
+            else:
+                process = self._processes.get(job_id)
+                if process is not None:
+                    process.terminate()
+            self._finish(job_id, CANCELLED, message="Cancelled")
+            self._dispatch()
+            return True
+
+    def forget(self, job_id: str):
+        """
+        Drop a finished job (and its result) from the queue.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job["status"] in FINISHED:
+                del self._jobs[job_id]
+
+    def wait(self, job_id: str, timeout: float = None, poll: float = 0.1) -> dict:
+        """
+        Block until the job finishes (or timeout seconds pass); returns its record.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job["status"] in FINISHED:
+                return job
+            if deadline is not None and time.monotonic() > deadline:
+                return job
+            time.sleep(poll)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return {"max_workers": self.max_workers, "queued": len(self._pending), **counts}
+
+
+# One queue per process, shared by all sessions
+JOB_QUEUE = JobQueue()
+
+
+# ---------- Job functions (run in the child process) ----------
+
+def features_job(raw_df, steps, feature_columns, y, split: dict, progress=None) -> dict:
+    """
+    Step 4: fit the preprocessor and build the feature matrix for a split
+    made by the caller (utils.splits.make_split); the preprocessor only sees
+    the training rows when the lineage target-encodes.
+    """
+    from utils.lineage import target_columns
+    from utils.modeling import fit_preprocessor
+
+    progress(0.05, "Encoding features")
+    y = y.to_numpy()
+    train_rows = split["train"] if target_columns(steps) else None
+    preprocessor, X, schema = fit_preprocessor(raw_df, steps, feature_columns, y, train_rows)
+    del raw_df
+    return {"preprocessor": preprocessor, "X": X, "y": y, "input_schema": schema, "split": split}
+
+
+def train_job(X, y, split, C: float, preprocessor, feature_columns, target_column, input_schema,
+              metadata: dict, scale: bool = True, solver: str = "auto", progress=None) -> dict:
+    """
+    Step 5 single fit: train, evaluate, rank the test scores and register
+    the model (promoted to current), so the result is kept even if nobody
+    collects it. Returns the model, metrics (without y_proba), the compact
+    evaluation, the artifact, the training time and the final fit's
+    solver / iterations (utils.modeling.fit_summary).
+    """
+    from functools import partial
+
+    from utils.artifacts import build_artifact
+    from utils.drift import build_reference
+    from utils.evaluation import compact_evaluation, evaluate_scores
+    from utils.modeling import cross_validated_metrics, evaluate_model, fit_summary, train_model
+    from utils.registry import register_model, registry_metrics
+    from utils.splits import take
+
+    fit_params = {"C": C, "scale": scale, "solver": solver}
+    start = time.perf_counter()
+    if split["folds"]:
+        progress(0.05, f"Cross-validating {len(split['folds'])} folds")
+        metrics = cross_validated_metrics(partial(train_model, **fit_params), X, y, split["folds"])
+        progress(0.6, "Fitting on all rows")
+        fit_start = time.perf_counter()
+        model = train_model(X, y, **fit_params)
+        fit_seconds = time.perf_counter() - fit_start
+    else:
+        progress(0.05, f"Fitting on {len(split['train']):,} rows")
+        fit_start = time.perf_counter()
+        model = train_model(take(X, split["train"]), take(y, split["train"]), **fit_params)
+        fit_seconds = time.perf_counter() - fit_start
+        progress(0.7, "Evaluating")
+        metrics = evaluate_model(model, take(X, split["test"]), take(y, split["test"]))
+    training_seconds = time.perf_counter() - start
+    fit = {**fit_summary(model), "fit_seconds": fit_seconds, "scale": scale}
+
+    progress(0.85, "Ranking test scores")
+    ranking_start = time.perf_counter()
+    evaluation = compact_evaluation(evaluate_scores(take(y, split["test"]), metrics.pop("y_proba")))
+    evaluation["seconds"] = time.perf_counter() - ranking_start
+
+    progress(0.9, "Building drift reference")
+    reference = build_reference(X, model, feature_columns, rows=None if split["folds"] else split["train"])
+
+    progress(0.95, "Registering model")
+    artifact = build_artifact(
+        preprocessor=preprocessor,
+        model=model,
+        feature_columns=feature_columns,
+        target_column=target_column,
+        input_schema=input_schema,
+        reference=reference
+    )
+    artifact["version"] = register_model(artifact, {
+        **metadata,
+        "params": {**metadata.get("params", {}), **fit},
+        "training_seconds": training_seconds,
+        "metrics": registry_metrics(metrics, evaluation),
+    })
+    return {
+        "model": model,
+        "metrics": metrics,
+        "evaluation": evaluation,
+        "artifact": artifact,
+        "training_seconds": training_seconds,
+        "fit": fit,
+    }
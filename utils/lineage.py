@@ -0,0 +1,103 @@
+# utils/lineage.py
+import json
+
+import numpy as np
+import pandas as pd
+
+# Supported transformation steps
+STEP_OPS = ("encode", "drop", "select")
+
+
+def make_step(op: str, columns, **params) -> dict:
+    """
+    Build a lightweight, JSON-serialisable description of one transformation.
+    Only column names and options are stored - never data.
+    """
+    if op not in STEP_OPS:
+        raise ValueError(f"Unknown step '{op}'. Expected one of {STEP_OPS}.")
+    return {"op": op, "columns": list(columns), **params}
+
+
+def describe_step(step: dict) -> str:
+    cols = ", ".join(step["columns"])
+    if step["op"] == "encode":
+        mode = step.get("mode", "onehot")
+        if mode == "hashing":
+            detail = f" ({step.get('n_features', 64)} buckets)"
+        elif mode == "target":
+            detail = f" (target: {step.get('target')})"
+        else:
+            detail = " (drop first)" if step.get("drop_first") else ""
+        return f"encode/{mode} [{cols}]{detail}"
+    return f"{step['op']} [{cols}]"
+
+
+def target_columns(steps) -> set:
+    """
+    Targets the recorded target-encoding steps were computed against.
+    """
+    return {s.get("target") for s in steps if s["op"] == "encode" and s.get("mode") == "target"}
+
+
+def lineage_key(steps) -> str:
+    """
+    Stable key identifying a lineage, used to cache materialized frames.
+    """
+    return json.dumps(steps, sort_keys=True, default=str)
+
+
+def _target_values(columns: dict, target: str) -> np.ndarray:
+    y = columns[target]
+    if not pd.api.types.is_numeric_dtype(y):
+        y = y.astype("category").cat.codes
+    return y.to_numpy()
+
+
+def _encode(columns: dict, step: dict, created: set):
+    # scikit-learn is only needed once an encode step is replayed
+    from utils.encoding import encoded_columns, make_encoder
+
+    selected = [c for c in step["columns"] if c in columns]
+    if not selected:
+        return columns
+
+    mode = step.get("mode", "onehot")
+    encoder = make_encoder(
+        mode,
+        drop_first=step.get("drop_first", False),
+        n_features=step.get("n_features", 64),
+        smoothing=step.get("smoothing", 10.0)
+    )
+    y = _target_values(columns, step["target"]) if mode == "target" else None
+    encoded = encoded_columns(encoder, pd.DataFrame({c: columns[c] for c in selected}, copy=False), y)
+
+    # Same layout as pd.get_dummies(df, columns=...): untouched columns first, encoded columns last
+    out = {name: s for name, s in columns.items() if name not in selected}
+    for name in encoded.columns:
+        out[name] = encoded[name]
+        created.add(name)
+    return out
+
+
+def apply_steps(base_df: pd.DataFrame, steps):
+    """
+    Materialize the lineage on top of the base frame.
+
+    Untouched columns are passed through by reference (no copy), so only the
+    columns produced by `encode` steps allocate new memory.
+
+    Returns (materialized_df, created_columns).
+    """
+    columns = {name: base_df[name] for name in base_df.columns}
+    created = set()
+
+    for step in steps:
+        if step["op"] == "encode":
+            columns = _encode(columns, step, created)
+        elif step["op"] == "drop":
+            columns = {name: s for name, s in columns.items() if name not in step["columns"]}
+        elif step["op"] == "select":
+            columns = {name: columns[name] for name in step["columns"] if name in columns}
+
+    created = [c for c in columns if c in created]
+    return pd.DataFrame(columns, index=base_df.index, copy=False), created
@@ -0,0 +1,327 @@
+# utils/modeling.py
+"""
+Split / train / evaluate logic shared by the Streamlit pages and the
+`churnmodel.py` command line. Must not import streamlit or matplotlib.
+"""
+import inspect
+import warnings
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from joblib import Parallel, delayed
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, confusion_matrix, f1_score, roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+from sklearn.preprocessing import StandardScaler
+
+from utils.lineage import apply_steps, target_columns
+from utils.preprocessing import build_preprocessor, input_schema, required_columns
+from utils.splits import make_split, take
+
+
+def numeric_target(y: pd.Series):
+    """
+    Returns (y, converted): non-numeric targets become category codes.
+    """
+    if not pd.api.types.is_numeric_dtype(y):
+        return y.astype("category").cat.codes, True
+    return y, False
+
+
+def select_feature_columns(processed_df: pd.DataFrame, target_col: str):
+    """
+    Returns (numeric_cols, non_numeric_cols) of the processed frame, excluding the target.
+    Logistic Regression only accepts numeric/bool features.
+    """
+    X_full = processed_df.drop(columns=[target_col])
+    numeric_cols = X_full.select_dtypes(include=["number", "bool"]).columns.tolist()
+    non_numeric_cols = [c for c in X_full.columns if c not in numeric_cols]
+    return numeric_cols, non_numeric_cols
+
+
+def check_target_encoding(steps, target_col: str) -> bool:
+    """
+    Whether the lineage target-encodes columns, in which case the
+    preprocessor must be fitted on the training rows only. Step 3 encodes
+    against the target it recorded and the pipeline against the modelling
+    target, so the two must match; raises ValueError otherwise.
+    """
+    targets = target_columns(steps)
+    other = sorted(str(t) for t in targets - {target_col})
+    if other:
+        raise ValueError(
+            f"Step 3 target-encoded against {other}, but the model target is '{target_col}'. "
+            f"Re-encode against '{target_col}'."
+        )
+    return bool(targets)
+
+
+def fit_preprocessor(raw_df: pd.DataFrame, steps, feature_columns, y, train_rows=None):
+    """
+    Fit the raw-record -> feature matrix transform for the recorded steps.
+    With `train_rows` the transform is fitted on those rows only and the
+    other rows are transformed with train-only statistics (no test target
+    reaches a target encoding); X still covers every row in order.
+    Returns (preprocessor, X, input_schema).
+    """
+    preprocessor = build_preprocessor(steps, raw_df.columns, feature_columns)
+    if train_rows is None:
+        X = preprocessor.fit_transform(raw_df, y)
+    else:
+        train_rows = np.asarray(train_rows)
+        other_rows = np.setdiff1d(np.arange(len(raw_df)), train_rows)
+        parts = [preprocessor.fit_transform(raw_df.iloc[train_rows], take(np.asarray(y), train_rows))]
+        if len(other_rows):
+            parts.append(preprocessor.transform(raw_df.iloc[other_rows]))
+        stacked = sp.vstack(parts, format="csr") if sp.issparse(parts[0]) else np.concatenate(parts)
+        X = take(stacked, np.argsort(np.concatenate([train_rows, other_rows]), kind="stable"))
+    return preprocessor, X, input_schema(raw_df, required_columns(preprocessor))
+
+
+def prepare_training_data(raw_df: pd.DataFrame, steps, target_col: str, split_params: dict = None) -> dict:
+    """
+    Everything Step 4 derives from the loaded data and recorded steps:
+    feature matrix, numeric target, feature columns and fitted preprocessor,
+    plus the split (utils.splits.make_split) when `split_params` is given.
+    The split is made first, so target encodings are fitted on its
+    training rows only.
+    """
+    target_encoded = check_target_encoding(steps, target_col)
+    processed_df, _ = apply_steps(raw_df, steps)
+    y, target_converted = numeric_target(processed_df[target_col])
+    feature_columns, dropped_columns = select_feature_columns(processed_df, target_col)
+    split = make_split(y.to_numpy(), **split_params) if split_params is not None else None
+    train_rows = split["train"] if split is not None and target_encoded else None
+    preprocessor, X, schema = fit_preprocessor(raw_df, steps, feature_columns, y, train_rows)
+    return {
+        "X": X,
+        "y": y,
+        "feature_columns": feature_columns,
+        "dropped_columns": dropped_columns,
+        "target_converted": target_converted,
+        "preprocessor": preprocessor,
+        "input_schema": schema,
+        "split": split,
+    }
+
+
+# Solvers offered for a single fit; "auto" picks one with select_solver()
+SOLVERS = ("auto", "lbfgs", "liblinear", "saga")
+
+# Training sets up to this many rows are fitted with liblinear
+SMALL_DATA_ROWS = 20_000
+
+
+def penalty_params(penalty: str) -> dict:
+    """
+    LogisticRegression kwargs for an 'l1'/'l2' penalty. scikit-learn >= 1.8
+    deprecates `penalty` in favour of `l1_ratio`.
+    """
+    if inspect.signature(LogisticRegression).parameters["penalty"].default == "deprecated":
+        return {"l1_ratio": 1.0 if penalty == "l1" else 0.0}
+    return {"penalty": penalty}
+
+
+def path_solver(penalty: str) -> str:
+    # lbfgs and saga both reuse the previous solution when warm_start=True
+    return "saga" if penalty == "l1" else "lbfgs"
+
+
+def select_solver(X, penalty: str = "l2") -> str:
+    """
+    Solver for a fit on standardized features: liblinear for small data;
+    otherwise lbfgs, or saga for an l1 penalty (lbfgs is l2 only).
+    """
+    if X.shape[0] <= SMALL_DATA_ROWS:
+        return "liblinear"
+    return "saga" if penalty == "l1" else "lbfgs"
+
+
+def make_scaler(X) -> StandardScaler:
+    # Centering would densify sparse matrices
+    return StandardScaler(with_mean=not sp.issparse(X))
+
+
+def fold_scaler(model, scaler: StandardScaler):
+    """
+    Rewrite a model fitted on standardized features so it takes raw features:
+    w_raw = w / scale,  b_raw = b - sum(w_raw * mean).
+    """
+    scale = scaler.scale_ if scaler.scale_ is not None else 1.0
+    mean = scaler.mean_ if scaler.with_mean else 0.0
+    coef = model.coef_ / scale
+    model.intercept_ = model.intercept_ - (coef * mean).sum(axis=1)
+    model.coef_ = coef
+    return model
+
+
+# Scorers for the regularization path; roc_auc uses probabilities, the rest 0.5-threshold labels
+PATH_METRICS = {
+    "roc_auc": roc_auc_score,
+    "accuracy": accuracy_score,
+    "f1": f1_score,
+}
+
+
+def _path_scores(X, y, train_idx, test_idx, Cs, penalty, metric, max_iter):
+    """
+    Fit one CV fold along the (ascending) C grid, warm-starting each fit
+    from the previous solution. Returns one test score per C.
+    """
+    scaler = make_scaler(X)
+    X_tr = scaler.fit_transform(X[train_idx])
+    X_te = scaler.transform(X[test_idx])
+    y_tr, y_te = y[train_idx], y[test_idx]
+
+    model = LogisticRegression(
+        solver=path_solver(penalty), warm_start=True, max_iter=max_iter, **penalty_params(penalty)
+    )
+    scores = []
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", ConvergenceWarning)
+        for C in Cs:
+            model.set_params(C=C)
+            model.fit(X_tr, y_tr)
+            proba = model.predict_proba(X_te)[:, 1]
+            if metric == "roc_auc":
+                scores.append(roc_auc_score(y_te, proba))
+            else:
+                scores.append(PATH_METRICS[metric](y_te, (proba >= 0.5).astype(int)))
+    return scores
+
+
+def fit_scaled_logistic(X, y, C: float = 1.0, penalty: str = "l2", max_iter: int = 1000) -> LogisticRegression:
+    """
+    Fit on standardized features, then fold the scaling into the
+    coefficients so the model takes raw features like train_model's.
+    """
+    return train_model(X, y, C=C, penalty=penalty, solver=path_solver(penalty), max_iter=max_iter)
+
+
+def regularization_path(X, y, Cs, penalties=("l2",), n_splits: int = 5, metric: str = "roc_auc",
+                        n_jobs: int = -1, max_iter: int = 1000, random_state: int = 42, folds=None) -> dict:
+    """
+    Cross-validated sweep over C (and penalties) with warm starts along the
+    C grid; (penalty, fold) paths run in parallel via joblib on all cores.
+    `folds` ((train, test) position pairs, e.g. group-aware ones from
+    utils.splits) replaces the default stratified `n_splits` folds.
+
+    Returns the per-(penalty, C) scores, the best parameters and a model
+    refitted on all of X with them (scaling folded into its coefficients,
+    so it takes raw features like a single fit).
+    """
+    Cs = np.sort(np.asarray(Cs, dtype=float))
+    y = np.asarray(y)
+    X_arr = X.tocsr() if sp.issparse(X) else np.asarray(X)
+
+    if folds is None:
+        folds = list(StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state).split(X_arr, y))
+    tasks = [(penalty, train_idx, test_idx) for penalty in penalties for train_idx, test_idx in folds]
+
+    fold_scores = Parallel(n_jobs=n_jobs)(
+        delayed(_path_scores)(X_arr, y, train_idx, test_idx, Cs, penalty, metric, max_iter)
+        for penalty, train_idx, test_idx in tasks
+    )
+
+    rows = []
+    for penalty in penalties:
+        scores = np.asarray([s for (p, _, _), s in zip(tasks, fold_scores) if p == penalty])
+        for j, C in enumerate(Cs):
+            rows.append({"penalty": penalty, "C": C, "mean_score": scores[:, j].mean(), "std_score": scores[:, j].std()})
+    results = pd.DataFrame(rows)
+
+    best = results.loc[results["mean_score"].idxmax()]
+    return {
+        "results": results,
+        "metric": metric,
+        "best_C": float(best["C"]),
+        "best_penalty": best["penalty"],
+        "best_score": float(best["mean_score"]),
+        "model": fit_scaled_logistic(X_arr, y, C=float(best["C"]), penalty=best["penalty"], max_iter=max_iter),
+    }
+
+
+def train_model(X_train, y_train, C: float = 1.0, penalty: str = "l2", scale: bool = True,
+                solver: str = "auto", max_iter: int = 1000) -> LogisticRegression:
+    """
+    Logistic regression on the feature matrix. With scale=True the fit runs
+    on standardized features and the scaling is folded into the coefficients
+    (fold_scaler), so the model still takes the raw preprocessor output.
+    solver="auto" uses select_solver(); see fit_summary() for the iterations.
+    """
+    if solver == "auto":
+        solver = select_solver(X_train, penalty)
+    if scale:
+        scaler = make_scaler(X_train)
+        X_fit = scaler.fit_transform(X_train)
+    else:
+        # The feature matrix is stored as float32; lbfgs on unscaled features
+        # needs float64 gradients to converge, so upcast the (already gathered) rows
+        scaler, X_fit = None, X_train.astype(np.float64)
+    model = LogisticRegression(C=C, solver=solver, max_iter=max_iter, **penalty_params(penalty))
+    model.fit(X_fit, y_train)
+    return fold_scaler(model, scaler) if scaler is not None else model
+
+
+def fit_summary(model: LogisticRegression) -> dict:
+    """
+    Solver and iteration count of a fitted model; converged is False when
+    the fit stopped at max_iter.
+    """
+    iterations = int(np.max(model.n_iter_))
+    return {"solver": model.solver, "iterations": iterations, "converged": iterations < model.max_iter}
+
+
+def metrics_from_confusion(cm) -> dict:
+    """
+    Accuracy / precision / recall / F1 from a 2x2 confusion matrix
+    (rows = actual, columns = predicted). Undefined ratios are 0.
+    """
+    tn, fp, fn, tp = (int(v) for v in np.asarray(cm).ravel())
+    total = tn + fp + fn + tp
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    return {
+        "accuracy": (tp + tn) / total if total else 0.0,
+        "precision": precision,
+        "recall": recall,
+        "f1": 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        "confusion_matrix": [[tn, fp], [fn, tp]],
+    }
+
+
+def evaluate_predictions(y_true, y_pred) -> dict:
+    return metrics_from_confusion(confusion_matrix(y_true, y_pred, labels=[0, 1]))
+
+
+def cross_validated_metrics(fit_fn, X, y, folds) -> dict:
+    """
+    Out-of-fold evaluation: fit_fn(X_train, y_train) -> model on each fold,
+    metrics from the pooled out-of-fold predictions (at 0.5), plus per-fold
+    accuracy and the out-of-fold probabilities (aligned with the fold test rows).
+    """
+    y = np.asarray(y)
+    y_proba = np.zeros(len(y), dtype=np.float64)
+    fold_accuracy = []
+    for train_idx, test_idx in folds:
+        model = fit_fn(X[train_idx], y[train_idx])
+        y_proba[test_idx] = model.predict_proba(X[test_idx])[:, 1]
+        fold_accuracy.append(float(((y_proba[test_idx] >= 0.5) == y[test_idx]).mean()))
+
+    test_idx = np.sort(np.concatenate([te for _, te in folds]))
+    metrics = evaluate_predictions(y[test_idx], (y_proba[test_idx] >= 0.5).astype(int))
+    metrics["y_proba"] = y_proba[test_idx]
+    metrics["fold_accuracy"] = fold_accuracy
+    return metrics
+
+
+def evaluate_model(model, X_test, y_test) -> dict:
+    """
+    Metrics at the default 0.5 threshold plus the churn probabilities.
+    """
+    y_proba = model.predict_proba(X_test)[:, 1]
+    metrics = evaluate_predictions(y_test, (y_proba >= 0.5).astype(int))
+    metrics["y_proba"] = y_proba
+    return metrics
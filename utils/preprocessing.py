@@ -0,0 +1,256 @@
+# utils/preprocessing.py
+from collections import ChainMap
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import OneHotEncoder
+
+from utils.encoding import (
+    SPARSE_MODES, FrequencyEncoder, HashingEncoder, TargetMeanEncoder, is_categorical_column, make_encoder
+)
+
+# Categorical inputs with at most this many values get a dropdown on the prediction page
+MAX_INPUT_OPTIONS = 50
+
+# Hashed values whose feature column is remembered per input column (transform_records)
+HASH_MEMO_SIZE = 100_000
+
+
+class FeaturePreprocessor(BaseEstimator, TransformerMixin):
+    """
+    Raw customer records -> model feature matrix.
+
+    Wraps a ColumnTransformer built from the recorded encode steps (Step 3)
+    plus passthrough numeric columns, then keeps exactly `feature_columns`
+    in that order (the numeric-column selection done in Step 4).
+
+    Output is one C-contiguous float32 array for dense encodings and a
+    float32 CSR matrix when any sparse encoding is used, so training can
+    index rows of a single matrix (utils.splits) without copying columns.
+
+    Fitting also records `mean_` and `scale_`, the mean and standard
+    deviation of every output feature: the baseline customer that churn
+    reasons are measured against and the scale that makes coefficients
+    comparable (utils.explain).
+    """
+
+    def __init__(self, transformer: ColumnTransformer, feature_columns, sparse: bool = False):
+        self.transformer = transformer
+        self.feature_columns = feature_columns
+        self.sparse = sparse
+
+    def _select(self, out):
+        if self.sparse:
+            return sp.csr_matrix(out)[:, self.indices_].astype(np.float32)
+        return np.ascontiguousarray(out.iloc[:, self.indices_].to_numpy(dtype=np.float32))
+
+    def fit(self, X, y=None):
+        self.fit_transform(X, y)
+        return self
+
+    def fit_transform(self, X, y=None):
+        out = self.transformer.fit_transform(X, y)
+        names = list(self.transformer.get_feature_names_out())
+        missing = [c for c in self.feature_columns if c not in names]
+        if missing:
+            raise ValueError(f"Preprocessor does not produce feature columns: {missing}")
+        self.indices_ = np.asarray([names.index(c) for c in self.feature_columns])
+        self.n_features_in_ = self.transformer.n_features_in_
+        self.feature_names_in_ = self.transformer.feature_names_in_
+        X = self._select(out)
+        self.mean_, self.scale_ = feature_stats(X)
+        return X
+
+    def transform(self, X):
+        return self._select(self.transformer.transform(X))
+
+    def transform_records(self, records) -> np.ndarray:
+        """
+        Records (dicts of raw values, e.g. a serving request) -> dense float32
+        feature rows, the same values as transform() without building a
+        DataFrame or running the ColumnTransformer: numeric columns are copied
+        and categories looked up in tables taken from the fitted encoders.
+        """
+        plan = self._record_plan()
+        if plan is None:  # an encoder without a lookup form
+            out = self.transform(pd.DataFrame.from_records(records, columns=list(self.feature_names_in_)))
+            return out.toarray() if sp.issparse(out) else out
+
+        out = np.zeros((len(records), len(self.feature_columns)), dtype=np.float32)
+        for kind, col, target, table in plan:
+            values = [record[col] for record in records]
+            if kind == "numeric":
+                out[:, target] = values
+            elif kind == "onehot":
+                for i, value in enumerate(values):
+                    j = table.get(value)
+                    if j is not None:
+                        out[i, j] = 1.0
+            elif kind == "hashing":
+                # Only values not seen before are hashed (pandas' hash, as in HashingEncoder)
+                buckets, memo = table
+                lookup = memo
+                new = [value for value in dict.fromkeys(values) if value not in memo]
+                if new:
+                    hashes = pd.util.hash_array(np.asarray(new, dtype=object))
+                    found = dict(zip(new, buckets[(hashes % np.uint64(len(buckets))).astype(np.intp)].tolist()))
+                    if len(memo) < HASH_MEMO_SIZE:
+                        memo.update(found)
+                    else:
+                        lookup = ChainMap(found, memo)
+                for i, value in enumerate(values):
+                    j = lookup[value]
+                    if j >= 0:
+                        out[i, j] = 1.0
+            else:  # "lookup": frequency / target encodings, `target` holds (column, unseen value)
+                j, unseen = target
+                out[:, j] = [table.get(value, unseen) for value in values]
+        return out
+
+    def _record_plan(self):
+        # Built once per fitted preprocessor: (kind, column, target, table) per raw column
+        if getattr(self, "_plan", False) is not False:
+            return self._plan
+
+        index = {c: j for j, c in enumerate(self.feature_columns)}
+        # The fitted transformers_ hold a FunctionTransformer in place of "passthrough"
+        specs = {name: spec for name, spec, _ in self.transformer.transformers}
+        plan = []
+        for name, encoder, cols in self.transformer.transformers_:
+            if encoder == "drop" or not len(cols):
+                continue
+            if specs.get(name) == "passthrough":
+                plan += [("numeric", c, index[c], None) for c in cols if c in index]
+            elif isinstance(encoder, OneHotEncoder):
+                names = iter(encoder.get_feature_names_out(cols))
+                for k, (col, categories) in enumerate(zip(cols, encoder.categories_)):
+                    dropped = None if encoder.drop_idx_ is None else encoder.drop_idx_[k]
+                    table = {}
+                    for m, category in enumerate(categories):
+                        if dropped is not None and m == dropped:
+                            continue
+                        j = index.get(next(names))
+                        if j is not None:
+                            table[category] = j
+                    plan.append(("onehot", col, None, table))
+            elif isinstance(encoder, HashingEncoder):
+                plan += [("hashing", col, None, (np.asarray(
+                    [index.get(f"{col}_hash{b}", -1) for b in range(encoder.n_features)], dtype=np.intp
+                ), {})) for col in cols]
+            elif isinstance(encoder, (FrequencyEncoder, TargetMeanEncoder)):
+                tables = encoder.frequencies_ if isinstance(encoder, FrequencyEncoder) else encoder.encodings_
+                unseen = 0.0 if isinstance(encoder, FrequencyEncoder) else encoder.prior_
+                plan += [("lookup", col, (index[col], unseen), table.to_dict())
+                         for col, table in zip(cols, tables) if col in index]
+            else:
+                plan = None
+                break
+        self._plan = plan
+        return plan
+
+    def get_feature_names_out(self, input_features=None):
+        return np.asarray(self.feature_columns, dtype=object)
+
+
+def feature_stats(X):
+    """
+    Per-column (mean, standard deviation) of a dense or CSR feature matrix,
+    from float64 sums (no centered copy of X is made).
+    """
+    n = X.shape[0]
+    if n == 0:
+        return np.zeros(X.shape[1]), np.zeros(X.shape[1])
+    if sp.issparse(X):
+        total = np.asarray(X.sum(axis=0, dtype=np.float64)).ravel()
+        squares = np.asarray(X.multiply(X).sum(axis=0, dtype=np.float64)).ravel()
+    else:
+        total = X.sum(axis=0, dtype=np.float64)
+        squares = np.einsum("ij,ij->j", X, X, dtype=np.float64)
+    mean = total / n
+    return mean, np.sqrt(np.maximum(squares / n - mean ** 2, 0.0))
+
+
+def build_preprocessor(steps, raw_columns, feature_columns) -> FeaturePreprocessor:
+    """
+    Translate the recorded lineage into an unfitted FeaturePreprocessor.
+
+    `raw_columns` are the columns of the loaded data, `feature_columns` the
+    final model inputs. Target encoders are fitted against the `y` passed to
+    fit (the modelling target chosen in Step 4).
+    """
+    alive = list(raw_columns)
+    transformers = []
+    sparse = False
+
+    for i, step in enumerate(steps):
+        cols = [c for c in step["columns"] if c in alive]
+        if step["op"] == "encode" and cols:
+            mode = step.get("mode", "onehot")
+            encoder = make_encoder(
+                mode,
+                drop_first=step.get("drop_first", False),
+                n_features=step.get("n_features", 64),
+                smoothing=step.get("smoothing", 10.0)
+            )
+            transformers.append((f"encode{i}_{mode}", encoder, cols))
+            sparse = sparse or mode in SPARSE_MODES
+            alive = [c for c in alive if c not in cols]
+        elif step["op"] == "drop":
+            alive = [c for c in alive if c not in cols]
+        elif step["op"] == "select":
+            alive = [c for c in alive if c in cols]
+
+    passthrough = [c for c in alive if c in feature_columns]
+    if passthrough:
+        transformers.insert(0, ("numeric", "passthrough", passthrough))
+
+    transformer = ColumnTransformer(
+        transformers,
+        remainder="drop",
+        sparse_threshold=1.0 if sparse else 0.0,
+        verbose_feature_names_out=False
+    )
+    if not sparse:
+        transformer.set_output(transform="pandas")
+
+    return FeaturePreprocessor(transformer, list(feature_columns), sparse=sparse)
+
+
+def required_columns(preprocessor: FeaturePreprocessor):
+    """
+    Raw input columns the fitted preprocessor reads, in loaded-data order.
+    """
+    used = set()
+    for _, transformer, cols in preprocessor.transformer.transformers_:
+        if transformer != "drop" and isinstance(cols, list):
+            used.update(cols)
+    return [c for c in preprocessor.feature_names_in_ if c in used]
+
+
+def input_schema(df: pd.DataFrame, columns) -> list:
+    """
+    Compact description of the raw inputs (kind, default, options) used to
+    render the single-customer form without keeping the training data around.
+    """
+    schema = []
+    for col in columns:
+        s = df[col]
+        if is_categorical_column(s):
+            counts = s.value_counts()
+            schema.append({
+                "column": col,
+                "kind": "categorical",
+                "default": str(counts.index[0]) if len(counts) else "",
+                "options": [str(v) for v in counts.index] if len(counts) <= MAX_INPUT_OPTIONS else None,
+            })
+        else:
+            schema.append({
+                "column": col,
+                "kind": "numeric",
+                "default": float(s.median()) if s.notna().any() else 0.0,
+                "integer": bool(pd.api.types.is_integer_dtype(s)),
+            })
+    return schema
@@ -0,0 +1,128 @@
+# utils/profiling.py
+"""
+Column profile of a frame, built once after loading (Step 1) and read by the
+later pages instead of rescanning the data on every rerun.
+
+Each column is visited once: dtype, kind, null count, cardinality and either
+min / max / quantiles / histogram (numeric) or value counts (categorical).
+The profile holds only these summaries, so it stays a few KB regardless of
+the number of rows.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.column_stats import MAX_BARS, category_counts, finite_values, numeric_histogram, top_categories
+from utils.encoding import is_categorical_column
+
+# Histogram resolution stored in the profile (the default on the Visualize page)
+PROFILE_BINS = 30
+PROFILE_QUANTILES = (0.01, 0.25, 0.5, 0.75, 0.99)
+
+
+def column_kind(s: pd.Series) -> str:
+    """
+    'categorical' (text/category), 'numeric' (numbers and bools, i.e. usable
+    as model features) or 'other' (datetimes etc.).
+    """
+    if is_categorical_column(s):
+        return "categorical"
+    if pd.api.types.is_numeric_dtype(s) or pd.api.types.is_bool_dtype(s):
+        return "numeric"
+    return "other"
+
+
+def _sorted_quantiles(values: np.ndarray) -> dict:
+    """
+    PROFILE_QUANTILES of an already sorted array (linear interpolation, as np.quantile).
+    """
+    positions = np.asarray(PROFILE_QUANTILES) * (len(values) - 1)
+    lo = np.floor(positions).astype(np.int64)
+    hi = np.minimum(lo + 1, len(values) - 1)
+    frac = positions - lo
+    return dict(zip(PROFILE_QUANTILES, (values[lo] * (1 - frac) + values[hi] * frac).tolist()))
+
+
+def profile_column(s: pd.Series, bins: int = PROFILE_BINS) -> dict:
+    kind = column_kind(s)
+    profile = {
+        "dtype": str(s.dtype),
+        "kind": kind,
+        "nulls": int(s.isna().sum()),
+    }
+
+    if kind == "categorical":
+        labels, counts = category_counts(s)
+        top_labels, top_counts, other = top_categories(labels, counts, MAX_BARS)
+        profile.update({
+            "cardinality": len(labels),
+            "labels": top_labels,
+            "counts": top_counts,
+            "other_count": other,
+        })
+    elif kind == "numeric":
+        # One sort gives min / max, the distinct count and exact quantiles
+        values = np.sort(finite_values(s))
+        counts, edges = numeric_histogram(values, bins)
+        has_values = len(values) > 0
+        profile.update({
+            "cardinality": int(1 + np.count_nonzero(values[1:] != values[:-1])) if has_values else 0,
+            "min": float(values[0]) if has_values else None,
+            "max": float(values[-1]) if has_values else None,
+            "mean": float(values.mean()) if has_values else None,
+            "quantiles": _sorted_quantiles(values) if has_values else {},
+            "counts": counts,
+            "edges": edges,
+        })
+    else:
+        profile["cardinality"] = int(s.nunique())
+
+    return profile
+
+
+def profile_frame(df: pd.DataFrame, base: dict = None, recompute=()) -> dict:
+    """
+    Profile every column of df. With `base` (the profile of the frame df was
+    derived from), columns present there are reused unless listed in
+    `recompute`, so only new or rewritten columns are scanned.
+    """
+    start = time.perf_counter()
+    base_columns = base["columns"] if base is not None else {}
+    recompute = set(recompute)
+
+    columns = {}
+    for col in df.columns:
+        if col in base_columns and col not in recompute:
+            columns[col] = base_columns[col]
+        else:
+            columns[col] = profile_column(df[col])
+
+    return {
+        "rows": len(df),
+        "columns": columns,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def columns_of_kind(profile: dict, kind: str, exclude=()):
+    return [c for c, p in profile["columns"].items() if p["kind"] == kind and c not in exclude]
+
+
+def profile_table(profile: dict) -> pd.DataFrame:
+    """
+    One row per column: dtype, kind, nulls, distinct values, min / median / max.
+    """
+    rows = []
+    for col, p in profile["columns"].items():
+        rows.append({
+            "column": col,
+            "dtype": p["dtype"],
+            "kind": p["kind"],
+            "nulls": p["nulls"],
+            "distinct": p["cardinality"],
+            "min": p.get("min"),
+            "median": p.get("quantiles", {}).get(0.5),
+            "max": p.get("max"),
+        })
+    return pd.DataFrame(rows)
@@ -0,0 +1,301 @@
+# utils/registry.py
+"""
+Versioned model registry with a process-wide model cache.
+
+    models/registry/<version>/churn_model.joblib      artifact (utils.artifacts)
+    models/registry/<version>/churn_model.scorer.npz  NumPy weights export
+    models/registry/<version>/metadata.json           metrics, params, features, data hash, timings
+    models/registry/current.json                      {"version", "history"}: the promoted model
+
+A version directory is written under a temporary name and renamed into
+place, and never modified afterwards. Promote and rollback rewrite only
+current.json (os.replace), so a reader sees either the old or the new
+current model, never a partial one. Their read-modify-write of
+current.json is serialized across processes by current.json.lock.
+
+Every session, batch job and server thread in the process loads models
+through MODEL_CACHE, so each version is deserialized once per process.
+"""
+import json
+import os
+from contextlib import contextmanager
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from utils.artifacts import ARTIFACT_PATH, MODELS_DIR, load_artifact, write_artifact
+
+REGISTRY_DIR = os.path.join(MODELS_DIR, "registry")
+ARTIFACT_FILENAME = "churn_model.joblib"
+METADATA_FILENAME = "metadata.json"
+CURRENT_FILENAME = "current.json"
+LOCK_TIMEOUT = 10.0
+STALE_LOCK_SECONDS = 60.0
+
+# Metrics kept in a version's metadata (the rest, e.g. y_proba, stays with the caller)
+REGISTRY_METRICS = ("accuracy", "precision", "recall", "f1", "confusion_matrix", "log_loss")
+
+
+def _write_json(payload, path: str):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str):
+    with open(path) as f:
+        return json.load(f)
+
+
+def new_version() -> str:
+    """
+    Sortable, unique version id: UTC timestamp plus a random suffix.
+    """
+    return f"{datetime.now(timezone.utc):%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+
+def version_dir(version: str, root: str = REGISTRY_DIR) -> str:
+    return os.path.join(root, version)
+
+
+def version_path(version: str, root: str = REGISTRY_DIR) -> str:
+    """
+    Path of the artifact file of a registered version.
+    """
+    return os.path.join(version_dir(version, root), ARTIFACT_FILENAME)
+
+
+def register_model(artifact: dict, metadata: dict = None, root: str = REGISTRY_DIR,
+                   promote: bool = True) -> str:
+    """
+    Store the artifact as a new immutable version and return its id.
+
+    `metadata` (metrics, params such as C, data_hash, training_seconds, ...)
+    is saved next to it together with the feature list, target and
+    threshold taken from the artifact. With promote=True the new version
+    becomes the current model.
+    """
+    version = new_version()
+    artifact = {**artifact, "version": version}
+    tmp_dir = os.path.join(root, f".{version}.{os.getpid()}.tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    write_artifact(artifact, os.path.join(tmp_dir, ARTIFACT_FILENAME))
+    _write_json({
+        **(metadata or {}),
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "artifact_version": artifact["artifact_version"],
+        "sklearn_version": artifact["sklearn_version"],
+        "target_column": artifact["target_column"],
+        "feature_columns": artifact["feature_columns"],
+        "threshold": artifact.get("threshold"),
+    }, os.path.join(tmp_dir, METADATA_FILENAME))
+    os.replace(tmp_dir, version_dir(version, root))
+
+    if promote:
+        promote_version(version, root)
+    return version
+
+
+def registry_metrics(metrics: dict, evaluation: dict = None) -> dict:
+    """
+    The metrics stored with a version: the threshold metrics plus the
+    ranking metrics of the threshold analysis (utils.evaluation) when available.
+    """
+    evaluation = evaluation or {}
+    return {
+        **{k: v for k, v in metrics.items() if k in REGISTRY_METRICS},
+        "roc_auc": evaluation.get("roc_auc"),
+        "average_precision": evaluation.get("average_precision"),
+    }
+
+
+def list_versions(root: str = REGISTRY_DIR) -> list:
+    """
+    Metadata of every registered version, newest first.
+    """
+    if not os.path.isdir(root):
+        return []
+    versions = []
+    for name in os.listdir(root):
+        path = os.path.join(root, name, METADATA_FILENAME)
+        if not name.startswith(".") and os.path.exists(path):
+            versions.append(_read_json(path))
+    return sorted(versions, key=lambda m: m["version"], reverse=True)
+
+
+def read_metadata(version: str, root: str = REGISTRY_DIR) -> dict:
+    return _read_json(os.path.join(version_dir(version, root), METADATA_FILENAME))
+
+
+def _current_state(root: str) -> dict:
+    path = os.path.join(root, CURRENT_FILENAME)
+    if not os.path.exists(path):
+        return {"version": None, "history": []}
+    return _read_json(path)
+
+
+@contextmanager
+def _current_lock(root: str, timeout: float = LOCK_TIMEOUT):
+    """
+    Hold current.json.lock (created with O_EXCL) while current.json is read
+    and replaced. A lock older than STALE_LOCK_SECONDS is left over from a
+    crashed process and is removed.
+    """
+    path = os.path.join(root, f"{CURRENT_FILENAME}.lock")
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) > STALE_LOCK_SECONDS:
+                    os.remove(path)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Could not lock {path} within {timeout:g}s.")
+            time.sleep(0.05)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        yield
+    finally:
+        os.remove(path)
+
+
+def current_version(root: str = REGISTRY_DIR):
+    """
+    The promoted version id, or None when nothing has been promoted.
+    """
+    return _current_state(root)["version"]
+
+
+def promote_version(version: str, root: str = REGISTRY_DIR):
+    """
+    Make `version` the current model; the previous one is kept for rollback().
+    """
+    if not os.path.exists(version_path(version, root)):
+        raise ValueError(f"Unknown model version '{version}' in {root}.")
+    with _current_lock(root):
+        state = _current_state(root)
+        if state["version"] == version:
+            return
+        history = state["history"] + ([state["version"]] if state["version"] else [])
+        _write_json({
+            "version": version,
+            "history": history,
+            "promoted_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }, os.path.join(root, CURRENT_FILENAME))
+
+
+def rollback(root: str = REGISTRY_DIR) -> str:
+    """
+    Re-promote the previously current version. Returns its id.
+    """
+    with _current_lock(root):
+        state = _current_state(root)
+        if not state["history"]:
+            raise ValueError("No previous model version to roll back to.")
+        previous = state["history"][-1]
+        _write_json({
+            "version": previous,
+            "history": state["history"][:-1],
+            "promoted_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }, os.path.join(root, CURRENT_FILENAME))
+    return previous
+
+
+def resolve_model(spec: str = None, root: str = REGISTRY_DIR):
+    """
+    Artifact path for a --model option: an existing file, a registry version
+    id or, when None, the current version (falling back to the single
+    models/churn_model.joblib of apps without a registry).
+    """
+    if spec is not None:
+        if os.path.exists(spec):
+            return spec
+        if os.path.exists(version_path(spec, root)):
+            return version_path(spec, root)
+        raise ValueError(f"'{spec}' is neither a model file nor a version in {root}.")
+    version = current_version(root)
+    return version_path(version, root) if version else ARTIFACT_PATH
+
+
+class ModelCache:
+    """
+    Thread-safe LRU of loaded artifacts keyed by file path.
+
+    Registered versions never change, so a cached artifact never goes stale;
+    concurrent requests for the same uncached version wait for a single
+    load. Cached artifacts are shared: callers must not modify them.
+    """
+
+    def __init__(self, maxsize: int = 4):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+        self.hits = 0
+        self.misses = 0
+        self.load_seconds = 0.0
+
+    def get(self, path: str) -> dict:
+        key = os.path.abspath(path)
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._items:  # loaded by another thread meanwhile
+                    self.hits += 1
+                    return self._items[key]
+            start = time.perf_counter()
+            artifact = load_artifact(path)
+            with self._lock:
+                self.misses += 1
+                self.load_seconds += time.perf_counter() - start
+                self._items[key] = artifact
+                while len(self._items) > self.maxsize:
+                    self._items.popitem(last=False)
+                self._loading.pop(key, None)
+            return artifact
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "cached": len(self._items),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "load_seconds": self.load_seconds,
+            }
+
+
+# One cache per process, shared by all sessions and threads
+MODEL_CACHE = ModelCache()
+
+
+def load_model_version(version: str = None, root: str = REGISTRY_DIR) -> dict:
+    """
+    Artifact of `version` (default: the current one) through MODEL_CACHE.
+    Raises FileNotFoundError when the registry has no current model.
+    """
+    version = version or current_version(root)
+    if version is None:
+        raise FileNotFoundError(f"No model has been promoted in {root}.")
+    return MODEL_CACHE.get(version_path(version, root))
@@ -0,0 +1,143 @@
+# utils/scoring.py
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.explain import pipeline_explainer
+
+# Default number of rows scored per chunk in batch mode
+DEFAULT_CHUNKSIZE = 100_000
+
+# Churn probability at or above which a customer is predicted to churn,
+# unless the artifact stores a tuned operating threshold (Step 5)
+DEFAULT_THRESHOLD = 0.5
+
+
+def scoring_inputs(artifact, model, feature_columns):
+    """
+    Returns (estimator, input_columns): the full raw-record pipeline when an
+    artifact is available, otherwise the bare model on encoded feature columns.
+    """
+    # The preprocessing module (scikit-learn) is already loaded with the artifact
+    from utils.preprocessing import required_columns
+
+    if artifact is not None:
+        pipeline = artifact["pipeline"]
+        return pipeline, required_columns(pipeline.named_steps["preprocess"])
+    return model, list(feature_columns)
+
+
+class _ChunkWriter:
+    """
+    Append scored chunks to a CSV or Parquet file without keeping them in memory.
+
+    The Parquet schema is fixed by the first chunk, where a copied input
+    column may be all missing or integer only to gain text or a missing
+    value later. Such `widen` columns are opened as string / int64 (missing
+    values become nulls), and every later chunk is cast to the file's schema.
+    """
+
+    def __init__(self, path: str, widen=()):
+        self.path = path
+        self.fmt = "parquet" if path.lower().endswith((".parquet", ".pq")) else "csv"
+        self.widen = set(widen)
+        self._parquet = None
+        self._first = True
+
+    def _file_schema(self, table):
+        import pyarrow as pa
+
+        fields = []
+        for field, column in zip(table.schema, table.columns):
+            if field.name in self.widen:
+                # All missing (null, or NaN from a CSV reader): the type is unknown yet
+                if column.null_count == len(column) or pa.types.is_null(field.type):
+                    field = field.with_type(pa.string())
+                elif pa.types.is_integer(field.type):
+                    field = field.with_type(pa.int64())
+            fields.append(field)
+        return pa.schema(fields, metadata=table.schema.metadata)
+
+    def write(self, df: pd.DataFrame):
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, self._file_schema(table))
+            self._parquet.write_table(table.cast(self._parquet.schema, safe=False))
+        else:
+            df.to_csv(self.path, mode="w" if self._first else "a", header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def score_chunks(estimator, input_columns, chunks, output_path: str,
+                 threshold: float = DEFAULT_THRESHOLD, keep_columns=(), progress=None, reasons: int = 0,
+                 monitor=None) -> dict:
+    """
+    Score an iterator of DataFrame chunks with one vectorized predict_proba
+    call per chunk and append the results to `output_path` (CSV or Parquet).
+
+    `keep_columns` (e.g. CustomerId) are copied to the output next to
+    `churn_probability` and `churn_prediction`. `progress(rows_done, elapsed)`
+    is called after every chunk. With `reasons` > 0 the top churn reasons of
+    every customer are added as reason_1 .. reason_k columns (utils.explain);
+    the chunk is then scored by the NumPy scorer in the same pass. A
+    utils.drift.DriftMonitor passed as `monitor` is updated with the
+    features and scores of every chunk.
+
+    Returns a summary dict with rows, seconds and rows_per_sec.
+    """
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    writer = _ChunkWriter(output_path, widen=keep_columns)
+    model_columns = hasattr(estimator, "feature_names_in_")
+    features_needed = bool(reasons) or monitor is not None
+    if features_needed:
+        transform, explainer = pipeline_explainer(estimator, input_columns)
+
+    rows = 0
+    start = time.perf_counter()
+    try:
+        for chunk in chunks:
+            X = chunk[input_columns]
+            if not len(chunk):
+                # A header-only file: nothing to score, the output gets its header only
+                proba = np.zeros(0)
+            elif features_needed:
+                features = transform(X)
+                if reasons:
+                    proba, contributions = explainer.score(features)
+                else:
+                    proba = explainer.scorer.predict_proba(features)
+                if monitor is not None:
+                    monitor.update(features, proba)
+            else:
+                proba = estimator.predict_proba(X if model_columns else X.to_numpy())[:, 1]
+
+            out = chunk[list(keep_columns)].copy() if keep_columns else pd.DataFrame(index=chunk.index)
+            out["churn_probability"] = proba.astype(np.float32)
+            out["churn_prediction"] = (proba >= threshold).astype(np.int8)
+            if reasons and len(chunk):
+                for column, values in explainer.reasons(contributions, reasons).items():
+                    out[column] = values
+            writer.write(out)
+
+            rows += len(chunk)
+            if progress is not None:
+                progress(rows, time.perf_counter() - start)
+    finally:
+        writer.close()
+
+    seconds = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if seconds > 0 else 0.0,
+        "output_path": output_path,
+    }
@@ -0,0 +1,344 @@
+# utils/scoring_server.py
+"""
+Small stdlib HTTP scoring service with request micro-batching.
+
+    python churnmodel.py serve --port 8080
+
+    POST /predict   {"records": [{...}, ...]}  or a single record {...}
+    GET  /stats     request / preprocessing / model latency percentiles and batch sizes
+    GET  /metrics   stage timings and process memory in Prometheus text format
+    GET  /health
+
+Concurrent requests are coalesced into one batch and scored with a
+single vectorized call: the records go straight to NumPy feature rows
+(FeaturePreprocessor.transform_records) and through the artifact's exported
+NumPy scorer (utils.fast_scorer); older artifacts use a DataFrame and
+predict_proba. Records are checked against the model's input schema before
+they are queued, so a malformed request gets its own 400 instead of failing
+the batch it would have joined.
+"""
+import json
+import os
+import queue
+import signal
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from utils.artifacts import (
+    ARTIFACT_PATH, LEGACY_FEATURES_PATH, LEGACY_MODEL_PATH, artifact_threshold, load_artifact, load_scorer
+)
+from utils.instrumentation import export_prometheus, measure
+from utils.registry import resolve_model
+from utils.scoring import DEFAULT_THRESHOLD, scoring_inputs
+
+
+def load_estimator(model_path: str = ARTIFACT_PATH):
+    """
+    Returns (estimator, input_columns, threshold, input_schema). Falls back
+    to the legacy logistic_model.pkl / feature_columns.pkl pair (numeric
+    inputs, no schema) when no artifact exists.
+    """
+    if os.path.exists(model_path):
+        artifact = load_artifact(model_path)
+        return (*scoring_inputs(artifact, None, None), artifact_threshold(artifact), artifact.get("input_schema"))
+    model = joblib.load(LEGACY_MODEL_PATH)
+    return (*scoring_inputs(None, model, joblib.load(LEGACY_FEATURES_PATH)), DEFAULT_THRESHOLD, None)
+
+
+def coerce_records(records, input_columns, input_schema=None) -> list:
+    """
+    Records reduced to the input columns: text columns (categorical in the
+    input schema) as str, every other column as a finite float.
+    Raises ValueError naming the record and column of the first bad value.
+    """
+    categorical = {f["column"] for f in input_schema or () if f["kind"] == "categorical"}
+    coerced = []
+    for i, record in enumerate(records):
+        row = {}
+        for col in input_columns:
+            value = record[col]
+            if value is None or isinstance(value, (dict, list)):
+                raise ValueError(f"Record {i}: '{col}' must be a value, got {json.dumps(value)}.")
+            if col in categorical:
+                value = str(value)
+            else:
+                try:
+                    value = float(value)
+                except (TypeError, ValueError):
+                    raise ValueError(f"Record {i}: '{col}' must be numeric, got {json.dumps(value)}.") from None
+                if not np.isfinite(value):
+                    raise ValueError(f"Record {i}: '{col}' must be a finite number.")
+            row[col] = value
+        coerced.append(row)
+    return coerced
+
+
+class LatencyStats:
+    """
+    Rolling window of request, preprocessing (records -> features) and
+    model latencies (milliseconds).
+    """
+
+    def __init__(self, window: int = 10_000):
+        self._lock = threading.Lock()
+        self.request_ms = deque(maxlen=window)
+        self.preprocess_ms = deque(maxlen=window)
+        self.model_ms = deque(maxlen=window)
+        self.batch_rows = deque(maxlen=window)
+        self.requests = 0
+        self.rows = 0
+
+    def record_request(self, ms: float, rows: int):
+        with self._lock:
+            self.request_ms.append(ms)
+            self.requests += 1
+            self.rows += rows
+
+    def record_batch(self, preprocess_ms: float, model_ms: float, rows: int):
+        with self._lock:
+            self.preprocess_ms.append(preprocess_ms)
+            self.model_ms.append(model_ms)
+            self.batch_rows.append(rows)
+
+    @staticmethod
+    def _percentiles(values) -> dict:
+        if not values:
+            return {"p50": None, "p99": None}
+        p50, p99 = np.percentile(np.fromiter(values, dtype=float), [50, 99])
+        return {"p50": round(float(p50), 3), "p99": round(float(p99), 3)}
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "rows": self.rows,
+                "batches": len(self.batch_rows),
+                "mean_batch_rows": round(float(np.mean(self.batch_rows)), 2) if self.batch_rows else None,
+                "request_ms": self._percentiles(self.request_ms),
+                "preprocess_ms": self._percentiles(self.preprocess_ms),
+                "model_ms": self._percentiles(self.model_ms),
+            }
+
+
+class _Pending:
+    __slots__ = ("records", "event", "result", "error")
+
+    def __init__(self, records):
+        self.records = records
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    Collect concurrently submitted record lists into batches of up to
+    `max_batch_size` rows, waiting at most `max_wait_ms` for more requests
+    once the first one arrives, and score each batch with one call:
+    prepare_fn(records) -> features, then predict_fn(features) -> probabilities.
+    """
+
+    def __init__(self, prepare_fn, predict_fn, max_batch_size: int = 512, max_wait_ms: float = 1.0,
+                 stats: LatencyStats = None):
+        self.prepare_fn = prepare_fn
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.stats = stats or LatencyStats()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def predict(self, records) -> np.ndarray:
+        pending = _Pending(records)
+        self._queue.put(pending)
+        pending.event.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        rows = len(batch[0].records)
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch_size:
+            try:
+                remaining = deadline - time.perf_counter()
+                pending = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(pending)
+            rows += len(pending.records)
+        return batch, rows
+
+    def _score_alone(self, pending: _Pending):
+        try:
+            pending.result = self.predict_fn(self.prepare_fn(pending.records))
+        except Exception as e:  # reported back to this request only
+            pending.error = e
+
+    def _run(self):
+        while True:
+            batch, rows = self._collect()
+            records = [r for pending in batch for r in pending.records]
+
+            with measure("server_predict", rows=rows, memory=False) as record:
+                try:
+                    start = time.perf_counter()
+                    X = self.prepare_fn(records)
+                    prepared = time.perf_counter()
+                    proba = self.predict_fn(X)
+                    self.stats.record_batch((prepared - start) * 1000, (time.perf_counter() - prepared) * 1000, rows)
+                except Exception:
+                    # Re-score request by request so only the offending one gets the error
+                    proba = None
+                    record["error"] = True
+                    for pending in batch:
+                        self._score_alone(pending)
+
+            offset = 0
+            for pending in batch:
+                n = len(pending.records)
+                if proba is not None:
+                    pending.result = proba[offset:offset + n]
+                offset += n
+                pending.event.set()
+
+
+def make_predict_fns(estimator, input_columns, scorer=None):
+    """
+    Returns (prepare, predict) for MicroBatcher: records (list of dicts) ->
+    features -> churn probabilities. With an exported NumPy scorer
+    (utils.fast_scorer) the records become feature rows through the
+    preprocessor's lookup tables (transform_records), with no DataFrame;
+    otherwise one DataFrame goes through predict_proba.
+    """
+    if scorer is not None and hasattr(estimator, "named_steps"):
+        preprocessor = estimator.named_steps["preprocess"]
+        if list(preprocessor.feature_columns) != scorer.feature_columns:
+            raise ValueError("The exported scorer does not match the artifact's feature columns.")
+        return preprocessor.transform_records, scorer.predict_proba
+
+    with_names = hasattr(estimator, "feature_names_in_")
+
+    def prepare(records):
+        X = pd.DataFrame.from_records(records, columns=input_columns)
+        return X if with_names else X.to_numpy(dtype=float)
+
+    def predict(X):
+        return estimator.predict_proba(X)[:, 1]
+
+    return prepare, predict
+
+
+def make_handler(batcher: MicroBatcher, input_columns, threshold: float = DEFAULT_THRESHOLD, input_schema=None):
+    required = set(input_columns)
+
+    class ScoringHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive for high request rates
+
+        def _send(self, status: int, payload, content_type: str = "application/json"):
+            body = (payload if isinstance(payload, str) else json.dumps(payload)).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok"})
+            elif self.path == "/stats":
+                self._send(200, batcher.stats.summary())
+            elif self.path == "/metrics":
+                self._send(200, export_prometheus(), "text/plain; version=0.0.4")
+            else:
+                self._send(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send(404, {"error": f"Unknown path {self.path}"})
+                return
+
+            start = time.perf_counter()
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except (ValueError, json.JSONDecodeError):
+                self._send(400, {"error": "Request body must be JSON."})
+                return
+
+            records = payload.get("records", [payload]) if isinstance(payload, dict) else payload
+            if not isinstance(records, list) or not records or not all(isinstance(r, dict) for r in records):
+                self._send(400, {"error": "Expected a record object or {\"records\": [...]}."})
+                return
+
+            # Validate here so one bad request cannot fail a whole micro-batch
+            missing = sorted({c for r in records for c in required - r.keys()})
+            if missing:
+                self._send(400, {"error": f"Records are missing required columns: {missing}"})
+                return
+            try:
+                records = coerce_records(records, input_columns, input_schema)
+            except ValueError as e:
+                self._send(400, {"error": str(e)})
+                return
+
+            try:
+                proba = batcher.predict(records)
+            except Exception as e:
+                self._send(500, {"error": str(e)})
+                return
+
+            self._send(200, {
+                "predictions": [
+                    {"churn_probability": float(p), "churn_prediction": int(p >= threshold)} for p in proba
+                ]
+            })
+            batcher.stats.record_request((time.perf_counter() - start) * 1000, len(records))
+
+        def log_message(self, format, *args):
+            pass  # per-request logging would dominate latency
+
+    return ScoringHandler
+
+
+class _ScoringHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # the stdlib default of 5 resets bursts of concurrent clients
+
+
+def serve(model_path: str = None, host: str = "127.0.0.1", port: int = 8080,
+          max_batch_size: int = 512, max_wait_ms: float = 1.0):
+    """
+    `model_path` is an artifact file or registry version; by default the
+    current registry version is served.
+    """
+    model_path = resolve_model(model_path)
+    estimator, input_columns, threshold, input_schema = load_estimator(model_path)
+    scorer = load_scorer(model_path) if os.path.exists(model_path) else None
+    batcher = MicroBatcher(*make_predict_fns(estimator, input_columns, scorer), max_batch_size, max_wait_ms)
+    server = _ScoringHTTPServer((host, port), make_handler(batcher, input_columns, threshold, input_schema))
+
+    def _stop(signum, frame):
+        raise KeyboardInterrupt
+
+    # Service managers stop with SIGTERM; print the latency summary either way
+    signal.signal(signal.SIGTERM, _stop)
+
+    print(f"Serving churn model {model_path}{' (NumPy scorer)' if scorer is not None else ''} "
+          f"on http://{host}:{port}/predict "
+          f"(threshold {threshold:.4g}, Ctrl+C to stop)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(batcher.stats.summary(), indent=2))
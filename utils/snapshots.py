@@ -0,0 +1,240 @@
+# utils/snapshots.py
+"""
+Session snapshots on disk, so a restarted app (or another replica sharing
+the directory) can resume without re-reading and re-encoding the source CSV.
+
+    snapshots/datasets/<data_hash>.arrow      loaded frame (Arrow IPC, uncompressed)
+    snapshots/splits/<split_hash>/            feature matrix, target and split positions (.npy)
+    snapshots/sessions/<snapshot_id>.json     manifest (what to load)
+    snapshots/sessions/<snapshot_id>.joblib   lineage, preprocessor, schema, profile
+
+Everything is keyed by content hash and written once: the same dataset or
+split saved from two sessions is stored a single time. Arrow files and .npy
+arrays are memory-mapped on load, so numeric columns are not copied into
+the process until they are touched.
+"""
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from utils.data_loader import content_hash
+from utils.lineage import lineage_key
+
+# Bump when the snapshot layout changes in a way older loaders cannot read
+SNAPSHOT_VERSION = 2
+
+SNAPSHOT_DIR = "snapshots"
+
+
+def frame_hash(df: pd.DataFrame) -> str:
+    """
+    Content hash of a frame (for frames that did not come from a hashed file).
+    """
+    return content_hash(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+
+
+def _replace_into(tmp_path: str, path: str):
+    # A concurrent writer may have stored the same content first; either copy is valid
+    if os.path.exists(path):
+        shutil.rmtree(tmp_path) if os.path.isdir(tmp_path) else os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, path)
+
+
+def write_frame(df, path: str):
+    """
+    Write a DataFrame (or Series) to an uncompressed Arrow IPC file, atomically.
+    """
+    import pyarrow as pa
+
+    frame = df.to_frame() if isinstance(df, pd.Series) else df
+    table = pa.Table.from_pandas(frame, preserve_index=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    _replace_into(tmp_path, path)
+
+
+def read_frame(path: str) -> pd.DataFrame:
+    """
+    Memory-map an Arrow IPC file; split_blocks lets pandas wrap numeric
+    columns without consolidating (copying) them.
+    """
+    import pyarrow as pa
+
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def _save_array(directory: str, name: str, values: np.ndarray):
+    np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(values))
+
+
+def _load_array(directory: str, name: str) -> np.ndarray:
+    return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+
+
+def _write_features(features: dict, directory: str) -> dict:
+    """
+    Feature matrix (dense array or CSR parts), target and split positions as .npy files.
+    """
+    import scipy.sparse as sp
+
+    X, split = features["X"], features["split"]
+    if sp.issparse(X):
+        X = X.tocsr()
+        for part in ("data", "indices", "indptr"):
+            _save_array(directory, f"X.{part}", getattr(X, part))
+    else:
+        _save_array(directory, "X", X)
+    _save_array(directory, "y", features["y"])
+    _save_array(directory, "train", split["train"])
+    _save_array(directory, "test", split["test"])
+    for i, (train, test) in enumerate(split["folds"] or ()):
+        _save_array(directory, f"fold{i}.train", train)
+        _save_array(directory, f"fold{i}.test", test)
+
+    return {
+        "sparse": bool(sp.issparse(X)),
+        "shape": list(X.shape),
+        "method": split["method"],
+        "n_folds": len(split["folds"]) if split["folds"] else 0,
+    }
+
+
+def _read_features(directory: str, meta: dict) -> dict:
+    if meta["sparse"]:
+        import scipy.sparse as sp
+
+        parts = tuple(_load_array(directory, f"X.{part}") for part in ("data", "indices", "indptr"))
+        X = sp.csr_matrix(parts, shape=tuple(meta["shape"]), copy=False)
+    else:
+        X = _load_array(directory, "X")
+    folds = [
+        (_load_array(directory, f"fold{i}.train"), _load_array(directory, f"fold{i}.test"))
+        for i in range(meta["n_folds"])
+    ]
+    split = {
+        "method": meta["method"],
+        "train": _load_array(directory, "train"),
+        "test": _load_array(directory, "test"),
+        "folds": folds or None,
+    }
+    return {"X": X, "y": _load_array(directory, "y"), "split": split}
+
+
+def split_hash(data_hash: str, lineage, split: dict, target_column, feature_columns) -> str:
+    """
+    Identify a split by its inputs and the row positions on each side
+    (hashing the positions is far cheaper than hashing the feature matrix).
+    """
+    parts = [data_hash, lineage_key(lineage), str(target_column), json.dumps(list(feature_columns or []))]
+    key = "|".join(parts).encode("utf-8")
+    arrays = [split["train"], split["test"]] + [a for fold in split["folds"] or () for a in fold]
+    for positions in arrays:
+        key += b"|" + np.ascontiguousarray(positions).tobytes()
+    return content_hash(key)
+
+
+def save_snapshot(raw_df: pd.DataFrame, data_hash: str, lineage, state: dict,
+                  features: dict = None, root: str = SNAPSHOT_DIR) -> str:
+    """
+    Snapshot the loaded frame, its lineage, the Step 4 state (target,
+    feature columns, preprocessor, input schema, profile) and optionally
+    the Step 4 features {"X", "y", "split"}. Returns the snapshot id.
+    """
+    data_hash = data_hash or frame_hash(raw_df)
+    for sub in ("datasets", "splits", "sessions"):
+        os.makedirs(os.path.join(root, sub), exist_ok=True)
+
+    dataset_path = os.path.join(root, "datasets", f"{data_hash}.arrow")
+    if not os.path.exists(dataset_path):
+        write_frame(raw_df, dataset_path)
+
+    split_id = None
+    if features is not None and all(features.get(k) is not None for k in ("X", "y", "split")):
+        split_id = split_hash(data_hash, lineage, features["split"], state.get("target_column"),
+                              state.get("feature_columns"))
+        split_dir = os.path.join(root, "splits", split_id)
+        if not os.path.exists(split_dir):
+            tmp_dir = f"{split_dir}.{os.getpid()}.tmp"
+            os.makedirs(tmp_dir, exist_ok=True)
+            with open(os.path.join(tmp_dir, "features.json"), "w") as f:
+                json.dump(_write_features(features, tmp_dir), f)
+            _replace_into(tmp_dir, split_dir)
+
+    snapshot_id = split_id or content_hash(f"{data_hash}|{lineage_key(lineage)}".encode("utf-8"))
+    sessions = os.path.join(root, "sessions")
+
+    import joblib
+
+    state_path = os.path.join(sessions, f"{snapshot_id}.joblib")
+    joblib.dump({"lineage": list(lineage), **state}, f"{state_path}.{os.getpid()}.tmp")
+    os.replace(f"{state_path}.{os.getpid()}.tmp", state_path)
+
+    manifest = {
+        "snapshot_version": SNAPSHOT_VERSION,
+        "snapshot_id": snapshot_id,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "data_hash": data_hash,
+        "rows": len(raw_df),
+        "columns": raw_df.shape[1],
+        "steps": len(lineage),
+        "target_column": state.get("target_column"),
+        "split_id": split_id,
+        "train_rows": len(features["split"]["train"]) if split_id else None,
+    }
+    manifest_path = os.path.join(sessions, f"{snapshot_id}.json")
+    with open(f"{manifest_path}.{os.getpid()}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{manifest_path}.{os.getpid()}.tmp", manifest_path)
+    return snapshot_id
+
+
+def list_snapshots(root: str = SNAPSHOT_DIR) -> list:
+    """
+    Manifests of the saved sessions, newest first.
+    """
+    sessions = os.path.join(root, "sessions")
+    if not os.path.isdir(sessions):
+        return []
+    manifests = []
+    for name in os.listdir(sessions):
+        if name.endswith(".json"):
+            with open(os.path.join(sessions, name)) as f:
+                manifests.append(json.load(f))
+    return sorted(manifests, key=lambda m: m["created_at"], reverse=True)
+
+
+def load_snapshot(snapshot_id: str, root: str = SNAPSHOT_DIR) -> dict:
+    """
+    Returns {"manifest", "raw_df", "state", "features"} with the frame and
+    the feature matrix memory-mapped from disk (features is None when the
+    snapshot was taken before Step 4).
+    """
+    sessions = os.path.join(root, "sessions")
+    with open(os.path.join(sessions, f"{snapshot_id}.json")) as f:
+        manifest = json.load(f)
+    if manifest.get("snapshot_version") != SNAPSHOT_VERSION:
+        raise ValueError(
+            f"Snapshot {snapshot_id} has version {manifest.get('snapshot_version')}, "
+            f"expected {SNAPSHOT_VERSION}. Re-create it from the source data."
+        )
+
+    import joblib
+
+    raw_df = read_frame(os.path.join(root, "datasets", f"{manifest['data_hash']}.arrow"))
+    state = joblib.load(os.path.join(sessions, f"{snapshot_id}.joblib"))
+
+    features = None
+    if manifest["split_id"]:
+        split_dir = os.path.join(root, "splits", manifest["split_id"])
+        with open(os.path.join(split_dir, "features.json")) as f:
+            features = _read_features(split_dir, json.load(f))
+
+    return {"manifest": manifest, "raw_df": raw_df, "state": state, "features": features}
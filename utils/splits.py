@@ -0,0 +1,104 @@
+# utils/splits.py
+"""
+Train/test partitions stored as int32 row positions into one feature matrix.
+
+A split costs 4 bytes per row instead of a second copy of the features, and
+re-splitting never touches the matrix. Rows are gathered with take() only
+when a model is fitted or evaluated.
+"""
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import (
+    GroupKFold,
+    GroupShuffleSplit,
+    StratifiedGroupKFold,
+    StratifiedKFold,
+    train_test_split,
+)
+
+SPLIT_METHODS = {
+    "random": "Random (stratified)",
+    "time": "Time-based (train on earlier rows)",
+    "group": "Group-aware (no group in both sets)",
+    "kfold": "K-fold cross-validation",
+}
+
+
+def _positions(idx) -> np.ndarray:
+    return np.ascontiguousarray(idx, dtype=np.int32)
+
+
+def _can_stratify(y) -> bool:
+    return y is not None and len(pd.unique(y)) > 1
+
+
+def make_split(y, method: str = "random", train_size: float = 0.7, random_state: int = 42,
+               order=None, groups=None, n_splits: int = 5, stratify: bool = None) -> dict:
+    """
+    Partition the rows of the feature matrix.
+
+    - random: stratified shuffle split (same rows as train_test_split on X)
+    - time:   rows sorted by `order`; the earliest `train_size` fraction trains
+    - group:  whole `groups` (e.g. CustomerId) go to one side only
+    - kfold:  `n_splits` stratified folds (group-aware when `groups` is given);
+              train covers every row and the test rows are the out-of-fold predictions
+
+    Returns {"method", "train", "test", "folds"} with int32 position arrays;
+    folds is a list of (train, test) pairs for kfold, otherwise None.
+    """
+    if method not in SPLIT_METHODS:
+        raise ValueError(f"Unknown split method '{method}'. Expected one of {list(SPLIT_METHODS)}.")
+    y = np.asarray(y)
+    n_rows = len(y)
+    rows = np.arange(n_rows, dtype=np.int32)
+    if stratify is None:
+        stratify = _can_stratify(y)
+    folds = None
+
+    if method == "random":
+        train, test = train_test_split(
+            rows, train_size=train_size, random_state=random_state, stratify=y if stratify else None
+        )
+    elif method == "time":
+        if order is None:
+            raise ValueError("A time-based split needs an ordering column.")
+        ranked = np.argsort(np.asarray(order), kind="stable")
+        n_train = int(round(train_size * n_rows))
+        train, test = np.sort(ranked[:n_train]), np.sort(ranked[n_train:])
+    elif method == "group":
+        if groups is None:
+            raise ValueError("A group-aware split needs a group column.")
+        splitter = GroupShuffleSplit(n_splits=1, train_size=train_size, random_state=random_state)
+        train, test = next(splitter.split(rows, y, groups=np.asarray(groups)))
+    else:
+        if groups is not None:
+            splitter = (StratifiedGroupKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+                        if stratify else GroupKFold(n_splits=n_splits))
+            fold_iter = splitter.split(rows, y, groups=np.asarray(groups))
+        else:
+            fold_iter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state).split(
+                rows, y if stratify else np.zeros(n_rows))
+        folds = [(_positions(tr), _positions(te)) for tr, te in fold_iter]
+        train, test = rows, np.sort(np.concatenate([te for _, te in folds]))
+
+    return {"method": method, "train": _positions(train), "test": _positions(test), "folds": folds}
+
+
+def take(X, positions):
+    """
+    Rows of the feature matrix (ndarray or CSR) or target at the given positions.
+    """
+    if positions is None:
+        return X
+    if isinstance(X, (pd.DataFrame, pd.Series)):
+        return X.iloc[positions]
+    return X[positions]
+
+
+def split_nbytes(split: dict) -> int:
+    if split is None:
+        return 0
+    total = split["train"].nbytes + split["test"].nbytes
+    for tr, te in split["folds"] or ():
+        total += tr.nbytes + te.nbytes
+    return int(total)
@@ -1,6 +1,18 @@
 # utils/state_manager.py
+# Imported by every page and app.py on each run: pandas, scikit-learn and the
+# data modules are imported inside the functions that use them, so a page
+# that has nothing to show yet (the first request on a new server) stays cheap.
+import time
+import uuid
+from typing import TYPE_CHECKING
+
 import streamlit as st
-import pandas as pd
+
+from utils.instrumentation import current_rss, export_json, export_prometheus, measure, peak_rss, summarize
+from utils.jobs import CANCELLED, DONE, FAILED, FINISHED, JOB_QUEUE
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 def init_session_state():
     """
@@ -8,15 +20,23 @@ def init_session_state():
     across different Streamlit pages.
     """
     default_keys = {
-        "raw_df": None,          # Original loaded data
-        "processed_df": None,    # Working copy after transformations
+        "raw_df": None,          # Original loaded data (single shared base frame)
+        "lineage": [],           # Transformation steps applied on top of raw_df
+        "data_hash": None,       # Content hash of the loaded file (ingestion cache key)
         "target_column": None,   # Selected target for prediction (e.g., 'Exited')
-        "X_train": None,
-        "X_test": None,
-        "y_train": None,
-        "y_test": None,
+        "X": None,               # Feature matrix of all rows (contiguous float32 array or CSR)
+        "y": None,               # Numeric target of all rows
+        "split": None,           # Train/test (and fold) row positions into X (utils.splits)
         "model": None,           # Trained LogisticRegression model
-        "feature_columns": None  # List of feature column names used for training
+        "feature_columns": None, # List of feature column names used for training
+        "preprocessor": None,    # Fitted raw-record -> feature matrix transform (Step 3 + Step 4)
+        "input_schema": None,    # Raw input columns (kind/default/options) for the prediction form
+        "artifact": None,        # Saved scoring artifact (preprocessor + model + threshold)
+        "evaluation": None,      # Threshold analysis of the saved model's test scores (utils.evaluation)
+        "profile": None,         # Column profile of raw_df (utils.profiling), built once per dataset
+        "perf": [],              # Timing / memory records of the measured stages (utils.instrumentation)
+        "jobs": {},              # This session's background jobs by id (utils.jobs), until delivered
+        "training_result": None  # Metrics / version of the last background training job
     }
 
     for key, value in default_keys.items():
@@ -24,17 +44,430 @@ def init_session_state():
             st.session_state[key] = value
 
 
-def set_dataframes(raw_df: pd.DataFrame, processed_df: pd.DataFrame):
+def set_raw_df(raw_df: "pd.DataFrame", data_hash: str = None):
     """
-    Helper to update raw_df and processed_df in session_state.
+    Register the base frame for this session.
+    The lineage is only reset when a different dataset is loaded, so
+    revisiting Step 1 keeps the encoding done in later steps.
     """
+    same_data = (
+        st.session_state.get("raw_df") is not None
+        and (raw_df is st.session_state["raw_df"]
+             or (data_hash is not None and data_hash == st.session_state.get("data_hash")))
+    )
+
     st.session_state["raw_df"] = raw_df
-    st.session_state["processed_df"] = processed_df
+    if data_hash is not None:
+        st.session_state["data_hash"] = data_hash
+    if not same_data:
+        reset_lineage()
 
 
 def get_raw_df():
     return st.session_state.get("raw_df", None)
 
 
+def get_lineage():
+    return list(st.session_state.get("lineage", []))
+
+
+def add_step(op: str, columns, **params):
+    """
+    Record a transformation step ('encode', 'drop' or 'select').
+    Nothing is computed until the processed frame is requested.
+    """
+    from utils.lineage import make_step
+
+    st.session_state["lineage"] = get_lineage() + [make_step(op, columns, **params)]
+
+
+def undo_last_step():
+    st.session_state["lineage"] = get_lineage()[:-1]
+
+
+def reset_lineage():
+    st.session_state["lineage"] = []
+    st.session_state.pop("_materialized", None)
+
+
+def _materialize():
+    raw_df = get_raw_df()
+    if raw_df is None:
+        return None
+
+    from utils.lineage import apply_steps, lineage_key
+
+    steps = get_lineage()
+    key = (st.session_state.get("data_hash"), id(raw_df), lineage_key(steps))
+
+    cached = st.session_state.get("_materialized")
+    if cached is None or cached["key"] != key:
+        with track("apply_lineage", rows=len(raw_df)):
+            df, created = apply_steps(raw_df, steps)
+        cached = {"key": key, "df": df, "created": created}
+        st.session_state["_materialized"] = cached
+    return cached
+
+
 def get_processed_df():
-    return st.session_state.get("processed_df", None)
+    """
+    The working frame: raw_df with the recorded lineage applied.
+    Unchanged columns are shared by reference with raw_df.
+    """
+    cached = _materialize()
+    return None if cached is None else cached["df"]
+
+
+def _data_key() -> str:
+    return st.session_state.get("data_hash") or f"id{id(get_raw_df())}"
+
+
+def get_processed_key() -> str:
+    """
+    Content-based key of the processed frame (dataset hash + lineage), for
+    caching values derived from it across reruns with st.cache_data.
+    """
+    from utils.lineage import lineage_key
+
+    return f"{_data_key()}:{lineage_key(get_lineage())}"
+
+
+def get_profile(processed: bool = True):
+    """
+    Column profile (dtype, kind, nulls, cardinality, ranges, histograms) of
+    the processed frame, or of the loaded frame with processed=False.
+    The loaded frame is profiled once per dataset; after lineage steps only
+    the columns they create are profiled.
+    """
+    raw_df = get_raw_df()
+    if raw_df is None:
+        return None
+
+    from utils.profiling import profile_frame
+
+    base = st.session_state.get("profile")
+    if base is None or base["key"] != _data_key():
+        with track("profile", rows=len(raw_df)):
+            base = profile_frame(raw_df)
+        base["key"] = _data_key()
+        st.session_state["profile"] = base
+
+    steps = get_lineage()
+    if not processed or not steps:
+        return base
+
+    key = get_processed_key()
+    cached = st.session_state.get("_processed_profile")
+    if cached is None or cached["key"] != key:
+        materialized = _materialize()
+        with track("profile", rows=len(materialized["df"])):
+            cached = profile_frame(materialized["df"], base=base, recompute=materialized["created"])
+        cached["key"] = key
+        st.session_state["_processed_profile"] = cached
+    return cached
+
+
+def nbytes(obj) -> int:
+    import pandas as pd
+    import scipy.sparse as sp
+
+    if obj is None:
+        return 0
+    if sp.issparse(obj):
+        return int(obj.data.nbytes + obj.indices.nbytes + obj.indptr.nbytes)
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(obj, pd.DataFrame) else int(usage)
+    return int(getattr(obj, "nbytes", 0))
+
+
+def get_memory_report() -> dict:
+    """
+    Per-session memory accounting (bytes).
+    - base: the loaded raw frame
+    - derived: columns created by lineage steps (everything else is shared with base)
+    - features: the Step 4 feature matrix X and target y (stored once)
+    - split: train/test row positions into X
+    """
+    from utils.splits import split_nbytes
+
+    raw_df = get_raw_df()
+    cached = _materialize()
+
+    base = nbytes(raw_df)
+    derived = 0
+    if cached is not None and cached["created"]:
+        derived = nbytes(cached["df"][cached["created"]])
+    features = nbytes(st.session_state.get("X")) + nbytes(st.session_state.get("y"))
+    split = split_nbytes(st.session_state.get("split"))
+
+    return {
+        "base": base,
+        "derived": derived,
+        "features": features,
+        "split": split,
+        "total": base + derived + features + split,
+    }
+
+
+# Session keys restored from / written to a snapshot besides the data itself
+SNAPSHOT_STATE_KEYS = ("target_column", "feature_columns", "preprocessor", "input_schema")
+FEATURE_KEYS = ("X", "y", "split")
+
+
+def save_session_snapshot() -> str:
+    """
+    Snapshot the loaded data, lineage, Step 4 state and train/test splits
+    (utils.snapshots). Returns the snapshot id.
+    """
+    from utils.snapshots import save_snapshot
+
+    state = {k: st.session_state.get(k) for k in SNAPSHOT_STATE_KEYS}
+    state["profile"] = st.session_state.get("profile")
+    features = {k: st.session_state.get(k) for k in FEATURE_KEYS}
+    with track("snapshot_save", rows=len(get_raw_df())):
+        return save_snapshot(
+            get_raw_df(),
+            st.session_state.get("data_hash"),
+            get_lineage(),
+            state,
+            features=features
+        )
+
+
+def resume_session_snapshot(snapshot_id: str) -> dict:
+    """
+    Replace the session data with a snapshot. Frames and split matrices are
+    memory-mapped, so this takes milliseconds regardless of dataset size.
+    Returns the snapshot manifest.
+    """
+    from utils.snapshots import load_snapshot
+
+    with track("snapshot_resume") as record:
+        snapshot = load_snapshot(snapshot_id)
+        record["rows"] = len(snapshot["raw_df"])
+    manifest, state = snapshot["manifest"], snapshot["state"]
+
+    set_raw_df(snapshot["raw_df"], data_hash=manifest["data_hash"])
+    st.session_state["lineage"] = list(state["lineage"])
+    st.session_state.pop("_materialized", None)
+    st.session_state.pop("_processed_profile", None)
+    st.session_state.pop("_features", None)
+    for key in SNAPSHOT_STATE_KEYS:
+        st.session_state[key] = state.get(key)
+    if state.get("profile") is not None:
+        st.session_state["profile"] = state["profile"]
+
+    features = snapshot["features"] or {}
+    for key in FEATURE_KEYS:
+        st.session_state[key] = features.get(key)
+    if features:
+        # Re-splitting the resumed data only needs new positions, not a new feature matrix
+        st.session_state["_features"] = {
+            "key": (get_processed_key(), state.get("target_column")),
+            "X": features["X"],
+            "y": features["y"],
+            "feature_columns": state.get("feature_columns"),
+        }
+    return manifest
+
+
+# Records kept per session for the sidebar panel (the process totals are unbounded)
+PERF_HISTORY = 500
+
+
+def _record_perf(record: dict):
+    records = st.session_state.get("perf") or []
+    st.session_state["perf"] = (records + [record])[-PERF_HISTORY:]
+
+
+def track(stage: str, rows: int = None, memory: bool = True):
+    """
+    Measure a stage (utils.instrumentation.measure) and keep the record in
+    this session for the performance panel.
+
+        with track("fit", rows=n) as record:
+            ...
+    """
+    return measure(stage, rows=rows, sink=_record_perf, memory=memory)
+
+
+def perf_sidebar():
+    """
+    Sidebar panel: per-stage timings and memory of this session, plus JSON /
+    Prometheus exports of the whole process. Call it at the end of a page so
+    it includes the stages of the current run.
+    """
+    records = st.session_state.get("perf") or []
+    with st.sidebar.expander("⏱️ Performance"):
+        rss, peak = current_rss(), peak_rss()
+        if rss is not None:
+            st.caption(f"Process memory: {rss / 1024 ** 2:,.0f} MB RSS"
+                       + (f" · peak {peak / 1024 ** 2:,.0f} MB" if peak is not None else ""))
+        if not records:
+            st.caption("No stages measured yet in this session.")
+        else:
+            last = records[-1]
+            st.caption(f"Last: **{last['stage']}** {last['seconds'] * 1000:,.0f} ms"
+                       + (f" · {last['rows']:,} rows" if last.get("rows") else ""))
+            import pandas as pd
+
+            summary = pd.DataFrame(summarize(records)).set_index("stage")
+            st.dataframe(summary[["calls", "last_s", "p95_s", "rows_per_sec", "peak_rss_mb"]].style.format({
+                "last_s": "{:.3f}", "p95_s": "{:.3f}", "rows_per_sec": "{:,.0f}", "peak_rss_mb": "{:,.0f}"
+            }, na_rep="–"))
+        st.download_button("Export JSON", export_json(records), file_name="churn_perf.json",
+                           mime="application/json", key="perf_json")
+        st.download_button("Export Prometheus", export_prometheus(), file_name="churn_perf.prom",
+                           mime="text/plain", key="perf_prom")
+
+
+# ---------- Background jobs (utils.jobs) ----------
+
+# Finished jobs listed in the sidebar panel
+JOB_PANEL_HISTORY = 5
+
+
+def _session_id() -> str:
+    if "session_id" not in st.session_state:
+        st.session_state["session_id"] = uuid.uuid4().hex[:12]
+    return st.session_state["session_id"]
+
+
+def submit_job(fn, *args, kind: str, label: str = "", context: dict = None, **kwargs) -> str:
+    """
+    Run fn(*args, **kwargs) on the process job queue for this session. The
+    result is applied to the session by jobs_sidebar(), on whatever page the
+    user is when the job finishes; `context` is kept for that step.
+    """
+    job_id = JOB_QUEUE.submit(fn, *args, kind=kind, label=label, owner=_session_id(), **kwargs)
+    st.session_state["jobs"] = {
+        **(st.session_state.get("jobs") or {}),
+        job_id: {
+            "kind": kind,
+            "label": label,
+            "data_key": get_processed_key(),
+            "context": context or {},
+            "delivered": False,
+        },
+    }
+    return job_id
+
+
+def _apply_features(result: dict, entry: dict):
+    """
+    Step 4 result: the same session state as an inline split, plus a snapshot.
+    """
+    context = entry["context"]
+    st.session_state["_features"] = {
+        "key": (entry["data_key"], context["target_column"]),
+        "X": result["X"],
+        "y": result["y"],
+        "feature_columns": context["feature_columns"],
+        "train": result["split"]["train"],
+    }
+    st.session_state["preprocessor"] = result["preprocessor"]
+    st.session_state["input_schema"] = result["input_schema"]
+    st.session_state["target_column"] = context["target_column"]
+    st.session_state["feature_columns"] = context["feature_columns"]
+    for key in FEATURE_KEYS:
+        st.session_state[key] = result[key]
+    try:
+        save_session_snapshot()
+    except OSError:
+        pass
+    st.toast("✅ Train/Test split ready.")
+
+
+def _apply_training(result: dict, entry: dict):
+    """
+    Step 5 result: the model is already registered by the job; adopt it in the session.
+    """
+    artifact = result["artifact"]
+    st.session_state["model"] = result["model"]
+    st.session_state["artifact"] = artifact
+    st.session_state["evaluation"] = result["evaluation"]
+    st.session_state["training_result"] = {
+        "label": entry["label"],
+        "version": artifact["version"],
+        "metrics": result["metrics"],
+        "training_seconds": result["training_seconds"],
+        "fit": result.get("fit"),
+    }
+    st.toast(f"✅ Model trained and registered as version `{artifact['version']}`.")
+
+
+JOB_HANDLERS = {"features": _apply_features, "train": _apply_training}
+
+
+def _deliver(job_id: str, job: dict, entry: dict):
+    entry["delivered"] = True
+    entry["status"] = job["status"]
+    entry["seconds"] = (job["finished_at"] or time.time()) - (job["started_at"] or job["submitted_at"])
+    if job["status"] == DONE:
+        if get_processed_key() == entry["data_key"]:
+            JOB_HANDLERS[entry["kind"]](job["result"], entry)
+        else:
+            entry["status"] = "stale"
+            st.toast(f"{entry['label']}: the data changed since the job was submitted; result not applied.")
+    elif job["status"] == FAILED:
+        entry["error"] = job["error"]
+    # The session now holds what it needs; free the queue's copy of the result
+    JOB_QUEUE.forget(job_id)
+
+
+def _jobs_panel():
+    entries = st.session_state.get("jobs") or {}
+    delivered_now = False
+
+    for job_id, entry in list(entries.items()):
+        if entry["delivered"]:
+            continue
+        job = JOB_QUEUE.get(job_id)
+        if job is None:  # server restarted or job trimmed
+            entry.update(delivered=True, status="lost", seconds=0.0)
+        elif job["status"] in FINISHED:
+            _deliver(job_id, job, entry)
+            delivered_now = True
+        else:
+            st.progress(min(max(job["progress"], 0.0), 1.0), text=f"**{entry['label']}** – {job['message']}")
+            if st.button("Cancel", key=f"cancel_job_{job_id}"):
+                JOB_QUEUE.cancel(job_id)
+                st.rerun()
+
+    icons = {DONE: "✅", FAILED: "❌", CANCELLED: "⏹️", "stale": "⚠️", "lost": "❔"}
+    finished = [(job_id, e) for job_id, e in entries.items() if e["delivered"]][-JOB_PANEL_HISTORY:]
+    for job_id, entry in finished:
+        st.caption(f"{icons.get(entry['status'], '')} {entry['label']} – {entry['status']} "
+                   f"({entry['seconds']:.1f} s)")
+        if entry.get("error"):
+            st.code(entry["error"].strip().splitlines()[-1])
+
+    stats = JOB_QUEUE.stats()
+    st.caption(f"Queue (all sessions): {stats.get('running', 0)} running · {stats['queued']} waiting · "
+               f"{stats['max_workers']} workers")
+    if finished and st.button("Clear finished", key="clear_jobs"):
+        st.session_state["jobs"] = {job_id: e for job_id, e in entries.items() if not e["delivered"]}
+        st.rerun()
+
+    if delivered_now:
+        # Results changed the session: rerun the whole page, not only this panel
+        st.rerun()
+
+
+# Re-polls every second (without rerunning the page) while a job is active
+_jobs_panel_live = st.fragment(run_every=1.0)(_jobs_panel)
+
+
+def jobs_sidebar():
+    """
+    Sidebar panel of this session's background jobs: progress, cancel
+    buttons and delivery of finished results into the session.
+    """
+    entries = st.session_state.get("jobs") or {}
+    if not entries:
+        return
+    active = any(not e["delivered"] for e in entries.values())
+    with st.sidebar:
+        st.subheader("⚙️ Background jobs")
+        (_jobs_panel_live if active else _jobs_panel)()